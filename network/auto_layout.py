@@ -0,0 +1,34 @@
+import argparse
+import sys
+import time
+
+from network_modules.layout import ForceLayout
+from network_modules.topology import read_topology, write_topology
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Dispose automatiquement les serveurs d'une topologie (disposition par forces) dans un "
+                    "rectangle de la taille de la fenêtre, puis enregistre la topologie avec ces coordonnées.")
+    parser.add_argument("topology", help="Fichier de topologie à charger")
+    parser.add_argument("output", help="Fichier de la topologie disposée (.topo ou .json)")
+    parser.add_argument("-W", "--width", type=int, default=1300, help="Largeur de la zone de disposition")
+    parser.add_argument("-H", "--height", type=int, default=700, help="Hauteur de la zone de disposition")
+    parser.add_argument("--margin", type=int, default=35, help="Marge laissée sur les bords")
+    parser.add_argument("-i", "--iterations", type=int, default=ForceLayout.iterations, help="Nombre d'itérations")
+    parser.add_argument("--weighted", action="store_true",
+                        help="Longueur des liaisons proportionnelle à leur temps de réponse")
+    parser.add_argument("--seed", type=int, default=None, help="Graine du bruit initial")
+    args = parser.parse_args()
+
+    topology = read_topology(args.topology)
+    try:
+        layout = ForceLayout.from_topology(topology, args.width, args.height, args.margin, args.weighted, args.seed)
+    except (RuntimeError, ValueError) as e:
+        parser.error(str(e))
+
+    start = time.perf_counter()
+    layout.run(args.iterations)
+    print("{} serveurs disposés en {:.1f} s".format(len(layout), time.perf_counter() - start), file=sys.stderr)
+    topology.centers_x, topology.centers_y = layout.get_centers()
+    write_topology(topology, args.output)
@@ -0,0 +1,34 @@
+import argparse
+import sys
+
+from network_modules.batch_runner import run_queries
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Rejoue des recherches de domaines sans interface graphique. Chaque ligne d'entrée est un objet "
+                    "JSON {\"starting_ip\": ..., \"domain\": ...} ; chaque ligne de sortie contient le statut, le "
+                    "chemin (du point de départ vers le serveur hébergeur) et le temps de réponse total.")
+    parser.add_argument("topology", help="Fichier de topologie à charger")
+    parser.add_argument("queries", nargs="?", default="-", help="Fichier JSONL des requêtes (\"-\" pour stdin)")
+    parser.add_argument("-o", "--output", default="-", help="Fichier JSONL des résultats (\"-\" pour stdout)")
+    parser.add_argument("-w", "--workers", type=int, default=1, help="Nombre de processus")
+    parser.add_argument("-c", "--chunk-size", type=int, default=1000, help="Nombre de requêtes par paquet")
+    parser.add_argument("--routing-tables", action="store_true", help="Utiliser les tables de routage")
+    parser.add_argument("--compact", action="store_true",
+                        help="Charger la topologie dans le stockage compact (très grands réseaux)")
+    parser.add_argument("--hierarchy", help="Hiérarchie de contraction précalculée par contract.py")
+    parser.add_argument("--trace", help="Trace de latences (convert_trace.py) pour les requêtes qui précisent "
+                                        "\"departure_time\"")
+    args = parser.parse_args()
+
+    input_file = sys.stdin if args.queries == "-" else open(args.queries, encoding="utf-8")
+    output_file = sys.stdout if args.output == "-" else open(args.output, "w", encoding="utf-8")
+    try:
+        run_queries(args.topology, input_file, output_file, args.workers, args.chunk_size, args.routing_tables,
+                    args.compact, args.hierarchy, args.trace)
+    finally:
+        if input_file is not sys.stdin:
+            input_file.close()
+        if output_file is not sys.stdout:
+            output_file.close()
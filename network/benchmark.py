@@ -0,0 +1,203 @@
+import argparse
+import json
+import platform
+import random
+import subprocess
+import sys
+import time
+from datetime import datetime, timezone
+
+from network_modules.contraction_hierarchy import ContractionHierarchy
+from network_modules.generators import GENERATORS, generate
+from network_modules.layout import ForceLayout
+from network_modules.network import Network
+
+
+# Meilleur temps sur repeat exécutions : le moins perturbé par le reste de la machine
+def _best_time(function, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def _git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "HEAD"], capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def _create_application():
+    import tkinter as tk
+    from network_modules.app import Application
+
+    try:
+        return Application(1300, 700)
+    except tk.TclError:
+        return None  # Pas d'affichage disponible
+
+
+def run_benchmarks(generators, sizes, seed=0, queries=100, repeat=3, max_draw_size=10000, domains_count=100,
+                   max_hierarchy_size=10000, max_layout_size=100000):
+    results = []
+
+    def record(kind, n, benchmark, seconds, operations):
+        results.append({
+            "generator": kind,
+            "size": n,
+            "benchmark": benchmark,
+            "operations": operations,
+            "seconds": seconds,
+            "seconds_per_operation": seconds / operations if operations > 0 else None
+        })
+        print("{:<18} {:>9} {:<16} {:>12.6f} s".format(kind, n, benchmark, seconds), file=sys.stderr)
+
+    application = _create_application() if max_draw_size > 0 else None
+    if application is None and max_draw_size > 0:
+        print("Pas d'affichage disponible : les mesures de dessin sont ignorées", file=sys.stderr)
+
+    for kind in generators:
+        for n in sizes:
+            start = time.perf_counter()
+            topology = generate(kind, n, seed, domains_count)
+            record(kind, n, "generate", time.perf_counter() - start, n)
+
+            start = time.perf_counter()
+            network = topology.to_network(Network())
+            record(kind, n, "create_nodes", time.perf_counter() - start, n)
+
+            rng = random.Random(seed)
+            starting_points = [network.servers[rng.randrange(n)] for _ in range(queries)]
+            domains = [topology.domains[rng.randrange(len(topology.domains))] for _ in range(queries)]
+
+            record(kind, n, "domain_lookup", _best_time(
+                lambda: [network.get_hosting_servers(domain) for domain in domains], repeat), queries)
+
+            hosting_servers = [set(network.get_hosting_servers(domain)) for domain in domains]
+            record(kind, n, "dijkstra", _best_time(
+                lambda: [Network.dijkstra(s, h) for s, h in zip(starting_points, hosting_servers)], repeat), queries)
+            record(kind, n, "shortest_path", _best_time(
+                lambda: [network.shortest_path(s, h) for s, h in zip(starting_points, hosting_servers)], repeat),
+                queries)
+
+            start = time.perf_counter()
+            network.landmarks.build()
+            record(kind, n, "build_landmarks", time.perf_counter() - start, n)
+            record(kind, n, "alt_search", _best_time(
+                lambda: [network.landmarks.shortest_path(s, h) for s, h in zip(starting_points, hosting_servers)],
+                repeat), queries)
+
+            if n <= max_hierarchy_size:
+                start = time.perf_counter()
+                hierarchy = ContractionHierarchy.build(network)
+                record(kind, n, "build_hierarchy", time.perf_counter() - start, n)
+                network.contraction_hierarchy = hierarchy
+                record(kind, n, "hierarchy_search", _best_time(
+                    lambda: [network.shortest_path(s, h) for s, h in zip(starting_points, hosting_servers)],
+                    repeat), queries)
+                network.contraction_hierarchy = None
+
+            if n <= max_layout_size:
+                try:
+                    layout = ForceLayout.from_topology(topology, 1300, 700, seed=seed)
+                except RuntimeError as e:
+                    print(e, file=sys.stderr)  # Sans numpy, la disposition n'est pas mesurée
+                else:
+                    start = time.perf_counter()
+                    layout.run()
+                    record(kind, n, "force_layout", time.perf_counter() - start, n)
+
+            start = time.perf_counter()
+            graph = topology.to_compact_graph()
+            record(kind, n, "create_compact", time.perf_counter() - start, n)
+
+            starting_ids = [graph.get_id(s.ip_address) for s in starting_points]
+            record(kind, n, "compact_search", _best_time(
+                lambda: [graph.search(s, domain) for s, domain in zip(starting_ids, domains)], repeat), queries)
+
+            if application is not None and n <= max_draw_size:
+                import tkinter as tk
+
+                # Dessin de tous les serveurs, y compris ceux hors de la vue, sur un canvas à part ;
+                # update_idletasks() force Tk à traiter l'affichage en attente dans chaque mesure
+                canvas = tk.Canvas()
+                start = time.perf_counter()
+                application.show_topology(topology)
+                canvas.update_idletasks()
+                record(kind, n, "show_topology", time.perf_counter() - start, n)
+
+                start = time.perf_counter()
+                for server in application.servers:
+                    if not server.is_drawn():
+                        server.draw(canvas)
+                canvas.update_idletasks()
+                record(kind, n, "draw", time.perf_counter() - start, n)
+                canvas.destroy()
+
+    return results
+
+
+def compare(previous, current, threshold):
+    previous_results = {(r["generator"], r["size"], r["benchmark"]): r["seconds"] for r in previous["results"]}
+    regressions = 0
+    for r in current["results"]:
+        before = previous_results.get((r["generator"], r["size"], r["benchmark"]))
+        if not before:
+            continue
+
+        ratio = r["seconds"] / before
+        flag = ""
+        if ratio > 1 + threshold:
+            flag = "  <-- régression"
+            regressions += 1
+        print("{:<18} {:>9} {:<16} {:>12.6f} s -> {:>12.6f} s  x{:.2f}{}".format(
+            r["generator"], r["size"], r["benchmark"], before, r["seconds"], ratio, flag))
+    return regressions
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Mesure le passage à l'échelle du routage et de l'affichage sur des topologies synthétiques. "
+                    "Les résultats sont écrits en JSON pour être comparés d'un commit à l'autre.")
+    parser.add_argument("-g", "--generators", nargs="+", choices=list(GENERATORS), default=list(GENERATORS),
+                        help="Générateurs de topologies")
+    parser.add_argument("-n", "--sizes", nargs="+", type=int, default=[100, 1000, 10000],
+                        help="Nombres de serveurs (de 100 à 1000000)")
+    parser.add_argument("--seed", type=int, default=0, help="Graine des générateurs et des requêtes")
+    parser.add_argument("-q", "--queries", type=int, default=100, help="Nombre de recherches par mesure")
+    parser.add_argument("-r", "--repeat", type=int, default=3, help="Nombre de répétitions (meilleur temps)")
+    parser.add_argument("-d", "--domains", type=int, default=100, help="Nombre de domaines (répartition de Zipf)")
+    parser.add_argument("--max-draw-size", type=int, default=10000,
+                        help="Taille maximale des réseaux dessinés (0 pour ne rien dessiner)")
+    parser.add_argument("--max-hierarchy-size", type=int, default=10000,
+                        help="Taille maximale des réseaux contractés (0 pour ne pas mesurer la hiérarchie)")
+    parser.add_argument("--max-layout-size", type=int, default=100000,
+                        help="Taille maximale des réseaux disposés automatiquement (0 pour ne pas mesurer)")
+    parser.add_argument("-o", "--output", default="benchmark.json", help="Fichier JSON des résultats")
+    parser.add_argument("--compare", help="Résultats précédents à comparer avec ceux-ci")
+    parser.add_argument("--threshold", type=float, default=0.2,
+                        help="Ralentissement relatif au-delà duquel une mesure est signalée")
+    args = parser.parse_args()
+
+    report = {
+        "commit": _git_commit(),
+        "date": datetime.now(timezone.utc).isoformat(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "seed": args.seed,
+        "queries": args.queries,
+        "results": run_benchmarks(args.generators, args.sizes, args.seed, args.queries, args.repeat,
+                                  args.max_draw_size, args.domains, args.max_hierarchy_size,
+                                  args.max_layout_size)
+    }
+    with open(args.output, "w", encoding="utf-8") as file:
+        json.dump(report, file, indent=2)
+
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as file:
+            regressions = compare(json.load(file), report, args.threshold)
+        sys.exit(1 if regressions > 0 else 0)
@@ -0,0 +1,24 @@
+import argparse
+import sys
+import time
+
+from network_modules.contraction_hierarchy import ContractionHierarchy, write_hierarchy
+from network_modules.topology import load_topology
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Précalcule la hiérarchie de contraction d'une topologie et l'enregistre, pour accélérer les "
+                    "recherches sur de grands réseaux qui changent rarement (batch_search.py --hierarchy).")
+    parser.add_argument("topology", help="Fichier de topologie à charger")
+    parser.add_argument("-o", "--output", help="Fichier de la hiérarchie (par défaut, la topologie suffixée de .ch)")
+    parser.add_argument("--witness-limit", type=int, default=ContractionHierarchy.witness_limit,
+                        help="Nombre maximal de serveurs fixés par recherche de témoin")
+    args = parser.parse_args()
+
+    network = load_topology(args.topology)
+    start = time.perf_counter()
+    hierarchy = ContractionHierarchy.build(network, args.witness_limit)
+    print("{} serveurs contractés en {:.1f} s, {} raccourcis".format(len(hierarchy), time.perf_counter() - start,
+                                                                   hierarchy.shortcuts_count), file=sys.stderr)
+    write_hierarchy(hierarchy, args.output or args.topology + ".ch")
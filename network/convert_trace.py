@@ -0,0 +1,24 @@
+import argparse
+import os
+import sys
+import time
+
+from network_modules.latency_trace import convert_trace
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Convertit des mesures de latence (CSV \"instant,ip1,ip2,latence\", chronologique pour chaque "
+                    "liaison) en trace binaire, lue ensuite par projection en mémoire (bouton \"Latences\", "
+                    "batch_search.py --trace). Le fichier est lu deux fois sans être chargé en mémoire.")
+    parser.add_argument("source", help="Fichier CSV des mesures")
+    parser.add_argument("-o", "--output", help="Fichier de la trace (par défaut, la source suffixée de .trace)")
+    args = parser.parse_args()
+
+    output = args.output or os.path.splitext(args.source)[0] + ".trace"
+    start = time.perf_counter()
+    try:
+        convert_trace(args.source, output)
+    except ValueError as e:
+        parser.error(str(e))
+    print("Trace écrite dans {} en {:.1f} s".format(output, time.perf_counter() - start), file=sys.stderr)
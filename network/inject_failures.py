@@ -0,0 +1,54 @@
+import argparse
+import json
+import sys
+
+from network_modules.failure_injection import INDEPENDENT, REGIONAL, FailureInjection, FailureModel
+from network_modules.topology import read_topology
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Mesure, par Monte-Carlo, l'accessibilité des domaines lorsque des serveurs tombent en panne. "
+                    "Chaque ligne du fichier des requêtes est un objet JSON {\"starting_ip\": ..., \"domain\": ...} ; "
+                    "sans fichier, des requêtes sont tirées au hasard. Le rapport JSON donne la disponibilité et "
+                    "l'allongement du temps de réponse par domaine, ainsi que les serveurs les plus critiques.")
+    parser.add_argument("topology", help="Fichier de topologie à charger")
+    parser.add_argument("queries", nargs="?", help="Fichier JSONL des requêtes (\"-\" pour stdin)")
+    parser.add_argument("-s", "--scenarios", type=int, default=1000, help="Nombre de scénarios de pannes")
+    parser.add_argument("-m", "--model", choices=[INDEPENDENT, REGIONAL], default=INDEPENDENT,
+                        help="Pannes indépendantes ou par régions (serveurs proches d'un épicentre)")
+    parser.add_argument("-p", "--probability", type=float, default=0.05,
+                        help="Probabilité de panne de chaque serveur (modèle indépendant)")
+    parser.add_argument("--regions", type=int, default=1, help="Nombre de régions en panne (modèle régional)")
+    parser.add_argument("--radius", type=float, default=100.0, help="Rayon d'une région (modèle régional)")
+    parser.add_argument("-n", "--sample-queries", type=int, default=1000,
+                        help="Nombre de requêtes tirées au hasard en l'absence de fichier")
+    parser.add_argument("-w", "--workers", type=int, default=1, help="Nombre de processus")
+    parser.add_argument("-c", "--chunk-size", type=int, default=100, help="Nombre de scénarios par paquet")
+    parser.add_argument("--seed", type=int, default=None, help="Graine des scénarios et des requêtes tirées")
+    parser.add_argument("--critical-servers", type=int, default=10, help="Nombre de serveurs critiques à afficher")
+    args = parser.parse_args()
+
+    injection = FailureInjection(read_topology(args.topology),
+                                 FailureModel(args.model, args.probability, args.regions, args.radius))
+    if args.queries is None:
+        injection.sample_queries(args.sample_queries, args.seed)
+    else:
+        queries_file = sys.stdin if args.queries == "-" else open(args.queries, encoding="utf-8")
+        try:
+            for line_number, line in enumerate(queries_file, 1):
+                if not line.strip():
+                    continue
+
+                query = json.loads(line)
+                try:
+                    injection.add_query(query.get("starting_ip"), query.get("domain"))
+                except ValueError as e:
+                    parser.error("ligne {} : {}".format(line_number, e))
+        finally:
+            if queries_file is not sys.stdin:
+                queries_file.close()
+
+    report = injection.run(args.scenarios, args.seed, args.workers, args.chunk_size)
+    json.dump(report.to_dict(args.critical_servers), sys.stdout, indent=2)
+    sys.stdout.write("\n")
@@ -1,48 +1,105 @@
+import json
 import tkinter as tk
-from tkinter import ttk, messagebox
-
+from array import array
+from tkinter import ttk, messagebox, filedialog
+
+from network_modules.latency_trace import LatencyTrace
+from network_modules.layout import ForceLayout, LayoutWorker
+from network_modules.network import Network, Route
+from network_modules.replica_placement import apply_placement
+from network_modules.route_cache import RouteCache
+from network_modules.search_worker import SearchWorker
 from network_modules.server import Server
+from network_modules.spatial_index import SpatialIndex
+from network_modules.topology import read_topology, save_topology
 from network_modules.utils import FormGenerator
 
 
 class Application:
+    # Couleurs des chemins précalculés, du principal au dernier chemin de secours ; gris si le chemin est coupé
+    __backup_paths_colors = ["green", "orange", "purple", "brown", "cyan"]
+
     def __init__(self, window_width, window_height):
         self.__window = tk.Tk()
         self.__window.title("Réseau")
 
         self.window_width = window_width
         self.window_height = window_height
+        # Le "monde" est la zone du canvas où les serveurs peuvent se trouver ; il s'agrandit à l'import d'une
+        # topologie plus grande que la fenêtre, que l'on parcourt alors en la faisant glisser (bouton du milieu)
+        self.__world_width = window_width
+        self.__world_height = window_height
         self.__window.resizable(False, False)
         self.__center_window()
 
         self.__create_search_bar()
         self.__canvas = tk.Canvas(self.__window, width=window_width, height=window_height)
         self.__canvas.bind("<Button-3>", self.__handle_right_click)
+        self.__canvas.bind("<ButtonPress-1>", self.__start_selection)
+        self.__canvas.bind("<B1-Motion>", self.__update_selection)
+        self.__canvas.bind("<ButtonRelease-1>", self.__stop_selection)
+        self.__canvas.bind("<ButtonPress-2>", lambda event: self.__canvas.scan_mark(event.x, event.y))
+        self.__canvas.bind("<B2-Motion>", self.__pan)
+        self.__canvas.configure(scrollregion=(0, 0, window_width, window_height))
         self.__canvas.pack()
+        self.__draw_viewport_id = None
 
         self.__research_starting_point = None  # Le serveur qui sera le point de départ des recherches
-        self.servers = []
+        self.network = Network()  # Le modèle du réseau et son moteur de routage, indépendants de tkinter
+        self.spatial_index = SpatialIndex(Server.half_side)  # Position des serveurs sur le canvas
+
+        # Pour la sélection de serveurs au rectangle
+        self.__selection = []
+        self.__selection_start = None
+        self.__selection_tag = None
+
+        self.__colored_links = []  # Liaisons des chemins principal et de secours affichés
+
+        # Les recherches qui doivent parcourir le graphe sont faites dans un thread, relevé toutes les 50 ms
+        self.__search_worker = SearchWorker()
+        self.__search_poll_id = None
+        self.__research_start = 0.0
+
+        # La disposition automatique tourne aussi dans un thread ; ses positions sont appliquées par lots
+        self.__layout_worker = None
+        self.__layout_servers = []
+        self.__layout_poll_id = None
+
         self.__init_servers()
 
     def __init_servers(self):
         server1 = Server(self, 90, 80, "192.168.1.1")
-        self.servers.append(server1)
-        server1.draw(self.__canvas)
+        self.__register_server(server1)
         server1.sites = "wikipedia.org"
 
         server2 = Server(self, 500, 400, "192.168.1.2")
-        self.servers.append(server2)
-        server2.draw(self.__canvas)
+        self.__register_server(server2)
         server2.sites = "facebook.com;python.org"
 
         server3 = Server(self, 400, 100, "192.168.1.3")
-        self.servers.append(server3)
-        server3.draw(self.__canvas)
+        self.__register_server(server3)
         server3.sites = "facebook.com;youtube.com;yahoo.fr"
 
         server1.add_neighbour(server2, "5", self.__canvas)
         server1.add_neighbour(server3, "10", self.__canvas)
 
+    def __register_server(self, server):
+        self.network.add_server(server)
+        self.spatial_index.insert(server)
+        server.draw(self.__canvas)
+
+    @property
+    def servers(self):
+        return self.network.servers
+
+    @property
+    def world_width(self):
+        return self.__world_width
+
+    @property
+    def world_height(self):
+        return self.__world_height
+
     @property
     def window_width(self):
         return self.__window_width
@@ -89,13 +146,78 @@ class Application:
         search_button = ttk.Button(search_frame, text="Rechercher",
                                    command=lambda: self.__process_research(search_entry.get()), padding=(10, 2))
         search_button.pack(side=tk.LEFT, padx=5)
+        self.__search_progress = ttk.Progressbar(search_frame, mode="indeterminate", length=80)
+        self.__search_progress.pack(side=tk.LEFT)
+        self.__cancel_button = ttk.Button(search_frame, text="Annuler", command=self.__cancel_research,
+                                          padding=(10, 2), state=tk.DISABLED)
+        self.__cancel_button.pack(side=tk.LEFT, padx=5)
         reset_button = ttk.Button(search_frame, text="Reset", command=lambda: self.__reset(search_entry),
                                   padding=(10, 2))
         reset_button.pack(side=tk.LEFT)
 
+        # En mode "tables de routage", une recherche suit les prochains sauts précalculés sans parcourir le graphe
+        self.__routing_table_mode = tk.BooleanVar(value=False)
+        routing_table_checkbutton = ttk.Checkbutton(search_frame, text="Tables de routage",
+                                                    variable=self.__routing_table_mode)
+        routing_table_checkbutton.pack(side=tk.LEFT, padx=5)
+
+        # Chemins de secours précalculés pour les recherches effectuées, affichés en couleur sur le canvas
+        self.__backup_mode = tk.BooleanVar(value=False)
+        backup_checkbutton = ttk.Checkbutton(search_frame, text="Secours", variable=self.__backup_mode,
+                                             command=self.__toggle_backup_mode)
+        backup_checkbutton.pack(side=tk.LEFT, padx=5)
+
+        # Recherche guidée par des repères (ALT), dont les distances sont recalculées en arrière-plan
+        self.__alt_mode = tk.BooleanVar(value=False)
+        alt_checkbutton = ttk.Checkbutton(search_frame, text="ALT", variable=self.__alt_mode,
+                                          command=lambda: setattr(self.network.landmarks, "enabled",
+                                                                  self.__alt_mode.get()))
+        alt_checkbutton.pack(side=tk.LEFT, padx=5)
+
+        # Mesure de la durée de chaque phase des recherches, exportable en JSON ou au format Prometheus
+        self.__metrics_mode = tk.BooleanVar(value=False)
+        metrics_checkbutton = ttk.Checkbutton(search_frame, text="Mesures", variable=self.__metrics_mode,
+                                              command=lambda: setattr(self.network.metrics, "enabled",
+                                                                      self.__metrics_mode.get()))
+        metrics_checkbutton.pack(side=tk.LEFT, padx=5)
+
+        # Latences variables chargées d'une trace : les recherches partent à l'heure choisie et les liaisons
+        # affichent leur latence à cette heure
+        trace_button = ttk.Button(search_frame, text="Latences", command=self.__load_latency_trace, padding=(10, 2))
+        trace_button.pack(side=tk.LEFT)
+        self.__time_dependent_mode = tk.BooleanVar(value=False)
+        time_dependent_checkbutton = ttk.Checkbutton(search_frame, text="Variables",
+                                                     variable=self.__time_dependent_mode,
+                                                     command=self.__update_departure_time)
+        time_dependent_checkbutton.pack(side=tk.LEFT, padx=5)
+        self.__departure_time = tk.StringVar(value="0")
+        departure_time_spinbox = ttk.Spinbox(search_frame, from_=0, to=10 ** 12, increment=60, width=8,
+                                             textvariable=self.__departure_time, command=self.__update_departure_time)
+        departure_time_spinbox.bind("<Return>", lambda event: self.__update_departure_time())
+        departure_time_spinbox.pack(side=tk.LEFT)
+
+        export_button = ttk.Button(search_frame, text="Exporter", command=self.__export_topology, padding=(10, 2))
+        export_button.pack(side=tk.RIGHT)
+        import_button = ttk.Button(search_frame, text="Importer", command=self.__import_topology, padding=(10, 2))
+        import_button.pack(side=tk.RIGHT, padx=5)
+        metrics_button = ttk.Button(search_frame, text="Exporter les mesures", command=self.__export_metrics,
+                                    padding=(10, 2))
+        metrics_button.pack(side=tk.RIGHT)
+        # Serveurs hébergeurs choisis par place_replicas.py
+        replicas_button = ttk.Button(search_frame, text="Répliques", command=self.__load_placement, padding=(10, 2))
+        replicas_button.pack(side=tk.RIGHT, padx=5)
+
+        # Disposition automatique par forces ; pondérée, une liaison est d'autant plus longue que son temps de
+        # réponse est grand
+        layout_button = ttk.Button(search_frame, text="Disposer", command=self.__start_layout, padding=(10, 2))
+        layout_button.pack(side=tk.RIGHT, padx=5)
+        self.__weighted_layout = tk.BooleanVar(value=False)
+        weighted_layout_checkbutton = ttk.Checkbutton(search_frame, text="Pondérée", variable=self.__weighted_layout)
+        weighted_layout_checkbutton.pack(side=tk.RIGHT)
+
     def __process_research(self, researched_domain):
-        for server in self.servers:
-            server.reset(self.__canvas)
+        Server.reset_all(self.__canvas)
+        self.__reset_links()
 
         if self.__research_starting_point is None:
             messagebox.showerror("Error", "Préciser d'abord le point de départ des recherches")
@@ -107,123 +229,397 @@ class Application:
             return
 
         print(f"Domaine recherché : {researched_domain}")
-        hosting_servers = self.__get_servers_that_host_domain(researched_domain)
-        if len(hosting_servers) == 0:
-            messagebox.showwarning("Attention",
-                                   f"Aucun serveur n'hébèrge le site que vous avez recherché : {researched_domain}")
+        self.__research_start = self.network.metrics.start()
+        starting_point = self.__research_starting_point
+        protect = self.__backup_mode.get() and not self.network.backup_paths.is_up_to_date(starting_point,
+                                                                                          researched_domain)
+        # Sans calcul (chemin de secours, cache) la réponse est immédiate ; sinon la recherche part dans le thread
+        # et annule celle qui serait encore en cours. Le thread calcule aussi les chemins de secours, l'arbre du
+        # point de départ (inutile avec les tables de routage ou ALT) et les tables de routage.
+        route = RouteCache.MISSING if protect else self.network.known_route(starting_point, researched_domain, False)
+        # Mêmes compteurs que Network.search(), que l'application n'utilise pas
+        if self.network.metrics.enabled:
+            self.network.metrics.increment("searches")
+            if route is not RouteCache.MISSING:
+                self.network.metrics.increment("cache_hits")
+        if route is RouteCache.MISSING:
+            use_routing_tables = self.__routing_table_mode.get()
+            track = not use_routing_tables and not self.__alt_mode.get() and \
+                self.network.shortest_path_trees.get(starting_point) is None
+            self.__search_worker.submit(self.network, starting_point, researched_domain, use_routing_tables, track,
+                                        protect)
+            self.__search_progress.start()
+            self.__cancel_button.config(state=tk.NORMAL)
+            if self.__search_poll_id is None:
+                self.__search_poll_id = self.__window.after(50, self.__poll_research)
             return
 
-        # Résultats des recherches
-        shortest_path = self.__shortest_path(hosting_servers)
-        if shortest_path is None:
+        self.__cancel_research()
+        self.__show_route(starting_point, researched_domain, route)
+
+    def __poll_research(self):
+        self.__search_poll_id = None
+        request = self.__search_worker.poll()
+        if request is not None:
+            self.__stop_research_progress()
+            if request.route is None:
+                messagebox.showerror("Erreur", "La recherche a échoué : {}".format(request.error))
+            else:
+                self.__show_route(request.starting_point, request.domain, request.route)
+        elif self.__search_worker.is_busy():
+            self.__search_poll_id = self.__window.after(50, self.__poll_research)
+        else:
+            self.__stop_research_progress()
+
+    def __cancel_research(self):
+        self.__search_worker.cancel()
+        self.__stop_research_progress()
+
+    def __stop_research_progress(self):
+        self.__search_progress.stop()
+        self.__cancel_button.config(state=tk.DISABLED)
+
+    def __show_route(self, starting_point, researched_domain, route):
+        metrics = self.network.metrics
+
+        # La durée de la recherche s'arrête avant les avertissements, qui attendent l'utilisateur
+        if route.status == Route.NOT_HOSTED:
+            metrics.stop("research", self.__research_start)
+            messagebox.showwarning("Attention", f"Aucun serveur n'hébèrge le site que vous avez recherché : "
+                                                f"{researched_domain}")
+            return
+
+        if route.status == Route.UNREACHABLE:
+            metrics.stop("research", self.__research_start)
             messagebox.showwarning("Attention",
                                    f"Le site {researched_domain} n'est pas accessible depuis le serveur "
-                                   f"{self.__research_starting_point}")
+                                   f"{starting_point}")
             return
 
-        for sp in shortest_path:
-            sp.change_color(self.__canvas)
+        start = metrics.start()
+        for sp in route.path:
+            sp.mark_on_path(self.__canvas)
+        Server.highlight_path(self.__canvas)
+        if self.__backup_mode.get():
+            self.__show_backup_paths(starting_point, researched_domain)
+        metrics.stop("highlight", start)
+        metrics.stop("research", self.__research_start)
 
-        print(f"Bienvenue sur {researched_domain}. Vous êtes dans le serveur {shortest_path[0]}")
+        print(f"Bienvenue sur {researched_domain}. Vous êtes dans le serveur {route.path[0]}")
+
+    def __show_backup_paths(self, starting_point, domain):
+        pair = self.network.backup_paths.get(starting_point, domain)
+        if pair is None:
+            return
+
+        # Du dernier au premier, pour que le chemin principal reste visible sur les liaisons partagées
+        for i in reversed(range(len(pair.paths))):
+            color = "gray" if pair.stopped_servers[i] > 0 else \
+                Application.__backup_paths_colors[min(i, len(Application.__backup_paths_colors) - 1)]
+            for server, next_server in zip(pair.paths[i], pair.paths[i][1:]):
+                server.color_link(next_server, self.__canvas, color)
+                self.__colored_links.append((server, next_server))
+
+    def __reset_links(self):
+        for server, next_server in self.__colored_links:
+            server.color_link(next_server, self.__canvas)
+        self.__colored_links = []
+
+    def __toggle_backup_mode(self):
+        if not self.__backup_mode.get():
+            self.network.backup_paths.clear()
+            self.__reset_links()
 
     def __reset(self, search_entry):
+        self.__cancel_research()
+        Server.reset_all(self.__canvas)
         for server in self.servers:
-            server.reset(self.__canvas)
             server.start(self.__canvas)
+        self.__reset_links()
 
         search_entry.delete(0, 'end')
         search_entry.insert(0, "Entrer un nom de domaine")
         self.__research_starting_point = None
 
-    def __get_servers_that_host_domain(self, researched_domain):
-        results = []
-        for server in self.servers:
-            if server.is_active() is True and researched_domain in server.sites:
-                results.append(server)
+    def __handle_right_click(self, event):
+        x, y = self.__to_canvas_coordinates(event)
+        server = self.spatial_index.find(x, y)
+        if server is not None:
+            context_menu = tk.Menu(self.__window, tearoff=0)
+            context_menu.add_command(label="Ajoutes des sites",
+                                     command=lambda: self.__add_urls(server, event.x, event.y))
+            context_menu.add_command(label="Établir une liaison avec d'autres serveurs",
+                                     command=lambda: self.__establish_connection(server, event.x, event.y))
+
+            if self.__research_starting_point != server and server.is_active() is True:
+                context_menu.add_command(label="Marquer comme point de départ",
+                                         command=lambda: self.__mark_as_research_starting_point(server))
+
+            if server.is_active():
+                label = "Arrêter le serveur"
+                action = server.stop
+            else:
+                label = "Démarrer le serveur"
+                action = server.start
+            context_menu.add_command(label=f"{label}", command=lambda: action(self.__canvas))
+
+            context_menu.post(event.x_root, event.y_root)
+            return
 
-        return results
+        context_menu = tk.Menu(self.__window, tearoff=0)
+        context_menu.add_command(label="Créer un serveur", command=lambda: self.__add_server(x, y))
+        if len(self.__selection) > 0:
+            context_menu.add_command(label="Arrêter les serveurs sélectionnés",
+                                     command=lambda: self.__apply_to_selection(Server.stop))
+            context_menu.add_command(label="Démarrer les serveurs sélectionnés",
+                                     command=lambda: self.__apply_to_selection(Server.start))
+        context_menu.post(event.x_root, event.y_root)
 
-    def __dijkstra(self, destination_server):
-        distances = {}
-        predecessors = {}
-        for s in self.servers:
-            distances[s] = float("inf")
-            predecessors[s] = None
+    # Sélection au rectangle : un clic gauche hors de tout serveur commence un rectangle de sélection
+    def __start_selection(self, event):
+        x, y = self.__to_canvas_coordinates(event)
+        if self.spatial_index.find(x, y) is not None:
+            return  # Le clic sert à déplacer le serveur
 
-        distances[self.__research_starting_point] = 0
-        E = []
-        F = set(self.servers)
+        self.__clear_selection()
+        self.__selection_start = (x, y)
+        self.__selection_tag = self.__canvas.create_rectangle(x, y, x, y, dash=(4, 2))
 
-        while F:
-            u = min(F, key=lambda x: distances[x])
-            F.remove(u)
-            E.append(u)
+    def __update_selection(self, event):
+        if self.__selection_start is not None:
+            self.__canvas.coords(self.__selection_tag, *self.__selection_start, *self.__to_canvas_coordinates(event))
 
-            if u.is_active() is False:
-                continue
+    def __stop_selection(self, event):
+        if self.__selection_start is None:
+            return
 
-            for v, w in u.get_neighbours():
-                if distances[v] > distances[u] + w:
-                    distances[v] = distances[u] + w
-                    predecessors[v] = u
+        self.__selection = self.spatial_index.query_rectangle(*self.__selection_start,
+                                                              *self.__to_canvas_coordinates(event))
+        for server in self.__selection:
+            server.select(self.__canvas)
+
+        self.__canvas.delete(self.__selection_tag)
+        self.__selection_start = None
+        self.__selection_tag = None
+
+    def __clear_selection(self):
+        for server in self.__selection:
+            server.unselect(self.__canvas)
+        self.__selection = []
+
+    def __apply_to_selection(self, action):
+        for server in self.__selection:
+            action(server, self.__canvas)
+
+    def __to_canvas_coordinates(self, event):
+        return int(self.__canvas.canvasx(event.x)), int(self.__canvas.canvasy(event.y))
+
+    def __pan(self, event):
+        self.__canvas.scan_dragto(event.x, event.y, gain=1)
+        # Comme pour le déplacement d'un serveur, on ne dessine au plus qu'une fois par image
+        if self.__draw_viewport_id is None:
+            self.__draw_viewport_id = self.__canvas.after(16, self.__draw_viewport)
+
+    # Dessine les serveurs visibles qui ne l'ont pas encore été
+    def __draw_viewport(self):
+        self.__draw_viewport_id = None
+        x = self.__canvas.canvasx(0)
+        y = self.__canvas.canvasy(0)
+        margin = Server.half_side
+        for server in self.spatial_index.query_rectangle(x - margin, y - margin, x + self.__window_width + margin,
+                                                         y + self.__window_height + margin):
+            if not server.is_drawn():
+                server.draw(self.__canvas)
+
+    def __import_topology(self):
+        path = filedialog.askopenfilename(title="Importer une topologie",
+                                          filetypes=[("Topologies", "*.topo *.json"), ("Tous les fichiers", "*")])
+        if not path:
+            return
 
-        return E, predecessors, distances
+        try:
+            topology = read_topology(path)
+        except (OSError, ValueError, TypeError) as e:
+            messagebox.showerror("Erreur", str(e))
+            return
 
-    def __shortest_path(self, hosting_servers):
-        shortest_distance = float("inf")
-        shortest_path = None
+        self.show_topology(topology)
 
-        for s in hosting_servers:
-            E, predecessors, distances = self.__dijkstra(destination_server=s)
+    # Remplace le réseau affiché par la topologie ; seuls les serveurs visibles sont dessinés
+    def show_topology(self, topology):
+        self.__cancel_research()
+        self.__cancel_layout()
+        self.__canvas.delete("all")
+        self.__colored_links = []
+        self.__research_starting_point = None
+        self.__selection = []
+        # Les mesures et la trace des latences survivent au changement de réseau
+        previous_network = self.network
+        self.network = Network()
+        self.network.metrics = previous_network.metrics
+        self.network.latency_trace = previous_network.latency_trace
+        self.network.departure_time = previous_network.departure_time
+        self.spatial_index = SpatialIndex(Server.half_side)
+
+        extent_x, extent_y = topology.get_extent()
+        self.__world_width = max(self.__window_width, extent_x + Server.half_side)
+        self.__world_height = max(self.__window_height, extent_y + Server.half_side)
+        self.__canvas.configure(scrollregion=(0, 0, self.__world_width, self.__world_height))
+        self.__canvas.xview_moveto(0)
+        self.__canvas.yview_moveto(0)
+
+        topology.to_network(self.network, lambda network, ip_address, center_x, center_y:
+                            Server(self, center_x, center_y, ip_address))
+        for server in self.servers:
+            self.spatial_index.insert(server)
+        # Activée seulement maintenant, pour ne calculer les repères qu'une fois le réseau construit
+        self.network.landmarks.enabled = self.__alt_mode.get()
+        self.__draw_viewport()
+
+    # Texte d'une liaison : son temps de réponse, ou sa latence à l'heure de départ avec des latences variables
+    def link_label(self, server, neighbour, response_time):
+        if self.network.is_time_dependent():
+            return str(self.network.latency_trace.latency(server, neighbour, response_time,
+                                                          self.network.departure_time))
+        return str(response_time)
+
+    def __refresh_link_labels(self):
+        for server in self.servers:
+            if server.is_drawn():
+                server.refresh_link_labels(self.__canvas)
 
-            if distances[s] < shortest_distance:
-                shortest_distance = distances[s]
+    def __load_latency_trace(self):
+        path = filedialog.askopenfilename(title="Charger une trace de latences",
+                                          filetypes=[("Traces", "*.trace"), ("Tous les fichiers", "*")])
+        if not path:
+            return
 
-                shortest_path = []
-                curr_server = s
-                while predecessors[curr_server] is not None:
-                    shortest_path.append(curr_server)
-                    curr_server = predecessors[curr_server]
-                shortest_path.append(self.__research_starting_point)
+        try:
+            trace = LatencyTrace(path)
+        except (OSError, ValueError, RuntimeError) as e:
+            messagebox.showerror("Erreur", str(e))
+            return
 
-        return shortest_path
+        # L'ancienne trace n'est pas fermée : une recherche annulée peut encore la lire ; le ramasse-miettes la
+        # fermera
+        self.__cancel_research()
+        self.network.latency_trace = trace
+        self.__refresh_link_labels()
 
-    def __handle_right_click(self, event):
-        clicked_x = event.x
-        clicked_y = event.y
+    def __load_placement(self):
+        path = filedialog.askopenfilename(title="Appliquer un placement des réplicas",
+                                          filetypes=[("Placements", "*.json"), ("Tous les fichiers", "*")])
+        if not path:
+            return
 
-        for server in self.servers:
-            if server.is_within_bounds(clicked_x, clicked_y) is True:
-                context_menu = tk.Menu(self.__window, tearoff=0)
-                context_menu.add_command(label="Ajoutes des sites",
-                                         command=lambda: self.__add_urls(server, event.x, event.y))
-                context_menu.add_command(label="Établir une liaison avec d'autres serveurs",
-                                         command=lambda: self.__establish_connection(server, event.x, event.y))
-
-                if self.__research_starting_point != server and server.is_active() is True:
-                    context_menu.add_command(label="Marquer comme point de départ",
-                                             command=lambda: self.__mark_as_research_starting_point(server))
-
-                if server.is_active():
-                    label = "Arrêter le serveur"
-                    action = server.stop
-                else:
-                    label = "Démarrer le serveur"
-                    action = server.start
-                context_menu.add_command(label=f"{label}", command=lambda: action(self.__canvas))
-
-                context_menu.post(event.x_root, event.y_root)
+        try:
+            with open(path, encoding="utf-8") as file:
+                domains = json.load(file)["domains"]
+            placement = {domain: statistics["replicas"] for domain, statistics in domains.items()}
+            self.__cancel_research()
+            apply_placement(self.network, placement)
+        except (OSError, ValueError, TypeError, KeyError) as e:
+            messagebox.showerror("Erreur", "Placement invalide : {}".format(e))
+
+    def __update_departure_time(self):
+        if not self.__time_dependent_mode.get():
+            departure_time = None
+        elif self.network.latency_trace is None:
+            self.__time_dependent_mode.set(False)
+            messagebox.showerror("Erreur", "Charger d'abord une trace de latences")
+            return
+        else:
+            try:
+                departure_time = int(self.__departure_time.get())
+            except ValueError:
+                messagebox.showerror("Erreur", "L'heure de départ doit être un nombre entier")
                 return
 
-        context_menu = tk.Menu(self.__window, tearoff=0)
-        context_menu.add_command(label="Créer un serveur", command=lambda: self.__add_server(event.x, event.y))
-        context_menu.post(event.x_root, event.y_root)
+        if departure_time != self.network.departure_time:
+            self.network.departure_time = departure_time
+            self.__refresh_link_labels()
+
+    def __start_layout(self):
+        self.__cancel_layout()
+
+        servers = list(self.servers)
+        indexes = {server: i for i, server in enumerate(servers)}
+        links_sources, links_targets, links_response_times = array("I"), array("I"), array("i")
+        for i, server in enumerate(servers):
+            for neighbour, response_time in server.get_neighbours():
+                # Chaque liaison est stockée des deux côtés : on ne la garde qu'une fois
+                if i < indexes[neighbour]:
+                    links_sources.append(i)
+                    links_targets.append(indexes[neighbour])
+                    links_response_times.append(response_time)
+
+        try:
+            layout = ForceLayout([server.center_x for server in servers], [server.center_y for server in servers],
+                                 links_sources, links_targets, self.__world_width, self.__world_height,
+                                 Server.half_side, links_response_times if self.__weighted_layout.get() else None)
+        except (RuntimeError, ValueError) as e:
+            messagebox.showerror("Erreur", str(e))
+            return
+
+        self.__layout_servers = servers
+        self.__layout_worker = LayoutWorker(layout)
+        self.__layout_worker.start()
+        self.__layout_poll_id = self.__window.after(50, self.__poll_layout)
+
+    def __poll_layout(self):
+        self.__layout_poll_id = None
+        # Lu avant poll() : une fois le thread terminé, ses dernières positions sont forcément publiées
+        is_running = self.__layout_worker.is_running()
+        centers = self.__layout_worker.poll()
+        if centers is not None:
+            for server, center_x, center_y in zip(self.__layout_servers, *centers):
+                server.place(center_x, center_y, self.__canvas)
+            self.__draw_viewport()
+
+        if is_running:
+            self.__layout_poll_id = self.__window.after(50, self.__poll_layout)
+        else:
+            self.__layout_worker = None
+            self.__layout_servers = []
+
+    def __cancel_layout(self):
+        if self.__layout_worker is not None:
+            self.__layout_worker.cancel()
+            self.__layout_worker = None
+            self.__layout_servers = []
+        if self.__layout_poll_id is not None:
+            self.__window.after_cancel(self.__layout_poll_id)
+            self.__layout_poll_id = None
+
+    def __export_metrics(self):
+        path = filedialog.asksaveasfilename(title="Exporter les mesures", defaultextension=".prom",
+                                            filetypes=[("Prometheus", "*.prom"), ("JSON", "*.json")])
+        if not path:
+            return
+
+        try:
+            self.network.metrics.dump(path)
+        except OSError as e:
+            messagebox.showerror("Erreur", str(e))
+
+    def __export_topology(self):
+        path = filedialog.asksaveasfilename(title="Exporter la topologie", defaultextension=".topo",
+                                            filetypes=[("Topologie binaire", "*.topo"), ("JSON", "*.json")])
+        if not path:
+            return
+
+        try:
+            save_topology(self.network, path)
+        except (OSError, ValueError) as e:
+            messagebox.showerror("Erreur", str(e))
 
     def __add_server(self, center_x, center_y):
         def validate(form_controls):
+            if self.spatial_index.overlaps(center_x, center_y):
+                raise ValueError("Un serveur occupe déjà cet emplacement")
+
             server = Server(self, center_x, center_y, form_controls["Adresse IP"].get())
-            self.servers.append(server)
-            server.draw(self.__canvas)
+            self.__register_server(server)
 
         (FormGenerator(self.__window, center_x, center_y, "Création d'un serveur",
                        [("Adresse IP", "entry")])
@@ -262,6 +658,7 @@ class Application:
          .build_form(validate, combobox_options=[s.ip_address for s in available_servers]))
 
     def __mark_as_research_starting_point(self, server):
+        # Son arbre des plus courts chemins est construit par le thread de recherche, à la première recherche
         self.__research_starting_point = server
 
     def run(self):
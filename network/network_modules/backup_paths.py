@@ -0,0 +1,238 @@
+import heapq
+import itertools
+
+from network_modules.domain_index import DomainTrie
+from network_modules.route_cache import RouteCache
+
+
+# Chemins précalculés pour un couple (point de départ, domaine) protégé
+class ProtectedPair:
+    __slots__ = ("k", "method", "paths", "costs", "stopped_servers", "is_stale")
+
+    def __init__(self, k, method):
+        self.k = k
+        self.method = method
+        self.paths = []  # Du serveur hébergeur jusqu'au point de départ, comme dans Route
+        self.costs = []
+        self.stopped_servers = []  # Nombre de serveurs arrêtés sur chaque chemin
+        self.is_stale = True
+
+
+# Chemins de secours pour des couples (point de départ, domaine) : les k plus courts chemins sans boucle (Yen) ou
+# des chemins disjoints en serveurs, calculés comme si tous les serveurs étaient actifs. Chaque chemin tient le
+# compte de ses serveurs arrêtés : quand un serveur s'arrête ou redémarre, la recherche bascule sur le meilleur
+# chemin intact en O(k), sans rien recalculer. Seuls un nouveau site ou une nouvelle liaison imposent de
+# recalculer les chemins, ce qui est fait à la demande.
+class BackupPaths:
+    YEN = "yen"
+    DISJOINT = "disjoint"
+
+    def __init__(self):
+        self.__hosting_servers = DomainTrie()  # Motif -> serveurs qui l'hébergent, y compris ceux qui sont arrêtés
+        self.__pairs = {}  # (point de départ, domaine) -> ProtectedPair
+        self.__paths_by_server = {}  # Serveur -> [(paire, indice du chemin), ...]
+
+    def __contains__(self, key):
+        return key in self.__pairs
+
+    def __len__(self):
+        return len(self.__pairs)
+
+    # paths, calculés au préalable par compute_paths() (dans le thread de recherche), évitent de les recalculer
+    def protect(self, starting_point, domain, k=3, method=YEN, paths=None):
+        if not isinstance(k, int) or k <= 0:
+            raise ValueError("Le nombre de chemins doit être un entier strictement positif")
+
+        if method not in [BackupPaths.YEN, BackupPaths.DISJOINT]:
+            raise ValueError("Méthode inconnue \"{}\"".format(method))
+
+        if paths is None:
+            paths = self.compute_paths(starting_point, domain, k, method)
+        self.unprotect(starting_point, domain)
+        pair = self.__pairs[(starting_point, domain)] = ProtectedPair(k, method)
+        self.__store(pair, paths)
+        return pair
+
+    def unprotect(self, starting_point, domain):
+        pair = self.__pairs.pop((starting_point, domain), None)
+        if pair is not None:
+            self.__forget_paths(pair)
+
+    # Couple protégé dont les chemins n'ont pas à être recalculés
+    def is_up_to_date(self, starting_point, domain):
+        pair = self.__pairs.get((starting_point, domain))
+        return pair is not None and not pair.is_stale
+
+    def get(self, starting_point, domain):
+        pair = self.__pairs.get((starting_point, domain))
+        if pair is not None and pair.is_stale:
+            self.__compute(starting_point, domain, pair)
+        return pair
+
+    # Meilleur chemin intact sous la forme (chemin, temps de réponse), RouteCache.MISSING si le couple n'est pas
+    # protégé ou si tous ses chemins sont coupés. Sans recompute, des chemins à recalculer ne sont pas utilisés.
+    def best_path(self, starting_point, domain, recompute=True):
+        pair = self.get(starting_point, domain) if recompute else self.__pairs.get((starting_point, domain))
+        if pair is None or pair.is_stale:
+            return RouteCache.MISSING
+
+        for path, cost, stopped_servers in zip(pair.paths, pair.costs, pair.stopped_servers):
+            if stopped_servers == 0:
+                return path, cost
+        return RouteCache.MISSING
+
+    # Chemins (du point de départ au serveur hébergeur) et leurs coûts, calculés sans rien modifier : l'appel peut
+    # se faire depuis le thread de recherche
+    def compute_paths(self, starting_point, domain, k=3, method=YEN):
+        # Tous les serveurs du motif le plus spécifique qui couvre le domaine, y compris ceux qui sont arrêtés
+        hosting_servers = set(next(self.__hosting_servers.matches(domain), ()))
+        if method == BackupPaths.YEN:
+            return BackupPaths.k_shortest_paths(starting_point, hosting_servers, k)
+        return BackupPaths.disjoint_paths(starting_point, hosting_servers, k)
+
+    def __compute(self, starting_point, domain, pair):
+        self.__store(pair, self.compute_paths(starting_point, domain, pair.k, pair.method))
+
+    def __store(self, pair, paths):
+        self.__forget_paths(pair)
+        pair.paths = [path[::-1] for path, _ in paths]
+        pair.costs = [cost for _, cost in paths]
+        pair.stopped_servers = [sum(1 for server in path if server.is_active() is False) for path, _ in paths]
+        pair.is_stale = False
+        for i, path in enumerate(pair.paths):
+            for server in path:
+                self.__paths_by_server.setdefault(server, []).append((pair, i))
+
+    def __forget_paths(self, pair):
+        for path in pair.paths:
+            for server in path:
+                references = self.__paths_by_server.get(server)
+                if references is not None:
+                    references[:] = [(p, i) for p, i in references if p is not pair]
+                    if len(references) == 0:
+                        del self.__paths_by_server[server]
+        pair.paths, pair.costs, pair.stopped_servers = [], [], []
+
+    def clear(self):
+        self.__pairs.clear()
+        self.__paths_by_server.clear()
+
+    # Notifications transmises par Network
+    def server_stopped(self, server):
+        for pair, i in self.__paths_by_server.get(server, ()):
+            pair.stopped_servers[i] += 1
+
+    def server_started(self, server):
+        for pair, i in self.__paths_by_server.get(server, ()):
+            pair.stopped_servers[i] -= 1
+
+    def sites_added(self, server, sites):
+        for site in sites:
+            self.__hosting_servers.setdefault(site, set()).add(server)
+        self.topology_changed()
+
+    def sites_removed(self, server, sites):
+        for site in sites:
+            servers = self.__hosting_servers.get(site)
+            if servers is not None:
+                servers.discard(server)
+                if len(servers) == 0:
+                    self.__hosting_servers.pop(site)
+        self.topology_changed()
+
+    def topology_changed(self):
+        for pair in self.__pairs.values():
+            pair.is_stale = True
+
+    # Dijkstra vers le plus proche des serveurs hébergeurs en évitant des serveurs et des liaisons ; renvoie le
+    # chemin (du point de départ au serveur hébergeur) et sa longueur, ou (None, None)
+    @staticmethod
+    def __shortest_path(starting_point, hosting_servers, removed_servers=(), removed_links=()):
+        distances = {starting_point: 0}
+        predecessors = {starting_point: None}
+        settled = set()
+        counter = itertools.count()
+        heap = [(0, next(counter), starting_point)]
+        while heap:
+            distance, _, u = heapq.heappop(heap)
+            if u in settled:
+                continue
+            settled.add(u)
+
+            if u in hosting_servers:
+                path = []
+                while u is not None:
+                    path.append(u)
+                    u = predecessors[u]
+                return path[::-1], distance
+
+            for v, w in u.get_neighbours():
+                if v in settled or v in removed_servers or (u, v) in removed_links:
+                    continue
+                if distance + w < distances.get(v, float("inf")):
+                    distances[v] = distance + w
+                    predecessors[v] = u
+                    heapq.heappush(heap, (distance + w, next(counter), v))
+
+        return None, None
+
+    @staticmethod
+    def __path_cost(path):
+        return sum(min(w for v, w in u.get_neighbours() if v is next_server) for u, next_server in zip(path, path[1:]))
+
+    # Algorithme de Yen : chaque nouveau chemin dévie d'un chemin déjà trouvé à partir d'un de ses serveurs
+    # (le "spur"), en interdisant les liaisons empruntées par les chemins qui partagent le même préfixe
+    @staticmethod
+    def k_shortest_paths(starting_point, hosting_servers, k):
+        path, cost = BackupPaths.__shortest_path(starting_point, hosting_servers)
+        if path is None:
+            return []
+
+        paths = [(path, cost)]
+        candidates = []
+        seen = {tuple(path)}
+        counter = itertools.count()
+        while len(paths) < k:
+            previous_path = paths[-1][0]
+            for i in range(len(previous_path) - 1):
+                spur_server = previous_path[i]
+                root = previous_path[:i + 1]
+                removed_links = set()
+                for p, _ in paths:
+                    if p[:i + 1] == root:
+                        removed_links.add((p[i], p[i + 1]))
+
+                spur_path, _ = BackupPaths.__shortest_path(spur_server, hosting_servers - set(root), set(root[:-1]),
+                                                           removed_links)
+                if spur_path is None:
+                    continue
+
+                candidate = root[:-1] + spur_path
+                if tuple(candidate) not in seen:
+                    seen.add(tuple(candidate))
+                    heapq.heappush(candidates, (BackupPaths.__path_cost(candidate), next(counter), candidate))
+
+            if len(candidates) == 0:
+                break
+            cost, _, path = heapq.heappop(candidates)
+            paths.append((path, cost))
+
+        return paths
+
+    # Chemins disjoints en serveurs (hormis le point de départ), obtenus en retirant à chaque fois les serveurs du
+    # chemin précédent ; l'approche gloutonne peut en trouver moins que le maximum possible
+    @staticmethod
+    def disjoint_paths(starting_point, hosting_servers, k):
+        paths = []
+        removed_servers = set()
+        hosting_servers = set(hosting_servers)
+        while len(paths) < k:
+            path, cost = BackupPaths.__shortest_path(starting_point, hosting_servers, removed_servers)
+            if path is None:
+                break
+
+            paths.append((path, cost))
+            removed_servers.update(path[1:])
+            hosting_servers.discard(path[-1])
+
+        return paths
@@ -0,0 +1,139 @@
+import itertools
+import json
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+from network_modules.compact_graph import CompactGraph
+from network_modules.contraction_hierarchy import read_hierarchy
+from network_modules.latency_trace import LatencyTrace
+from network_modules.network import Route
+from network_modules.topology import load_compact_topology, load_topology
+
+UNKNOWN_STARTING_POINT = "unknown-starting-point"
+INVALID_QUERY = "invalid-query"
+
+_network = None  # Réseau chargé une seule fois par processus (Network ou CompactGraph)
+_use_routing_tables = False
+
+
+def init_worker(topology_path, use_routing_tables=False, compact=False, hierarchy_path=None, trace_path=None):
+    global _network, _use_routing_tables
+
+    _network = load_compact_topology(topology_path) if compact else load_topology(topology_path)
+    _use_routing_tables = use_routing_tables
+    if hierarchy_path is not None:
+        hierarchy = read_hierarchy(hierarchy_path)
+        hierarchy.bind(_network)
+        _network.contraction_hierarchy = hierarchy
+    if trace_path is not None:
+        # Chaque processus projette la même trace : les pages lues sont partagées par le système
+        _network.latency_trace = LatencyTrace(trace_path)
+
+
+def _parse_query(line):
+    query = json.loads(line)
+    if not isinstance(query, dict):
+        raise ValueError("Une requête doit être un objet JSON")
+
+    starting_ip = query.get("starting_ip")
+    domain = query.get("domain")
+    if not isinstance(starting_ip, str) or not isinstance(domain, str) or not domain.strip():
+        raise ValueError("Une requête doit préciser \"starting_ip\" et \"domain\"")
+
+    # Heure de départ facultative : le chemin le plus rapide en partant à cette heure, selon la trace des latences
+    departure_time = query.get("departure_time")
+    if departure_time is not None:
+        if not isinstance(departure_time, int) or isinstance(departure_time, bool):
+            raise ValueError("\"departure_time\" doit être un nombre entier")
+        if isinstance(_network, CompactGraph) or _network.latency_trace is None:
+            raise ValueError("\"departure_time\" nécessite une trace de latences (--trace)")
+
+    return starting_ip.strip(), domain.strip(), departure_time
+
+
+# Même enchaînement que Application.__process_research, le résultat étant renvoyé au lieu d'être affiché
+def process_query(line):
+    try:
+        starting_ip, domain, departure_time = _parse_query(line)
+    except ValueError as e:  # json.JSONDecodeError en hérite
+        return {"status": INVALID_QUERY, "error": str(e)}
+
+    result = {"starting_ip": starting_ip, "domain": domain}
+    if isinstance(_network, CompactGraph):
+        starting_point = _network.get_id(starting_ip)
+    else:
+        starting_point = _network.get_server(starting_ip)
+    if starting_point is None:
+        result["status"] = UNKNOWN_STARTING_POINT
+        return result
+
+    if isinstance(_network, CompactGraph):
+        route = _network.search(starting_point, domain)
+        path = [_network.ip_address(node_id) for node_id in route.path or []]
+    else:
+        _network.departure_time = departure_time
+        route = _network.search(starting_point, domain, _use_routing_tables)
+        path = [server.ip_address for server in route.path or []]
+
+    result["status"] = route.status
+    if route.status == Route.FOUND:
+        # Le chemin est donné dans le sens du parcours : du point de départ vers le serveur hébergeur
+        result["path"] = path[::-1]
+        result["response_time"] = route.response_time
+
+    return result
+
+
+def process_chunk(lines):
+    return [json.dumps(process_query(line), ensure_ascii=False) for line in lines]
+
+
+def _chunks(lines, chunk_size):
+    lines = (line for line in lines if line.strip())
+    while True:
+        chunk = list(itertools.islice(lines, chunk_size))
+        if not chunk:
+            return
+        yield chunk
+
+
+# Lit les requêtes JSONL de input_file et écrit les résultats dans output_file, dans le même ordre
+def run_queries(topology_path, input_file, output_file, workers=1, chunk_size=1000, use_routing_tables=False,
+                compact=False, hierarchy_path=None, trace_path=None):
+    if not isinstance(workers, int) or workers <= 0:
+        raise ValueError("Le nombre de processus doit être un entier strictement positif")
+
+    if not isinstance(chunk_size, int) or chunk_size <= 0:
+        raise ValueError("La taille des paquets doit être un entier strictement positif")
+
+    if compact is True and hierarchy_path is not None:
+        raise ValueError("La hiérarchie de contraction ne s'applique pas au stockage compact")
+
+    if compact is True and trace_path is not None:
+        raise ValueError("Les latences variables ne s'appliquent pas au stockage compact")
+
+    chunks = _chunks(input_file, chunk_size)
+    if workers == 1:
+        init_worker(topology_path, use_routing_tables, compact, hierarchy_path, trace_path)
+        results = map(process_chunk, chunks)
+        _write_results(results, output_file)
+        return
+
+    with ProcessPoolExecutor(max_workers=workers, initializer=init_worker,
+                             initargs=(topology_path, use_routing_tables, compact, hierarchy_path,
+                                       trace_path)) as executor:
+        # Executor.map soumet tous les paquets d'emblée : on n'en garde qu'un nombre borné en vol
+        pending = deque()
+        for chunk in chunks:
+            pending.append(executor.submit(process_chunk, chunk))
+            if len(pending) >= 2 * workers:
+                _write_results([pending.popleft().result()], output_file)
+        _write_results((future.result() for future in pending), output_file)
+
+
+def _write_results(results, output_file):
+    for lines in results:
+        for line in lines:
+            output_file.write(line)
+            output_file.write("\n")
+        output_file.flush()
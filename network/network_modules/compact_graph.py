@@ -0,0 +1,189 @@
+import bisect
+import heapq
+import ipaddress
+from array import array
+
+from network_modules.domain_index import DomainTrie
+from network_modules.network import Route
+
+
+# Stockage compact du réseau pour les très grands graphes (de l'ordre du million de serveurs) : les liaisons
+# sont rangées au format CSR (offsets / cibles / poids) dans des tableaux typés et chaque serveur n'est plus
+# qu'un identifiant entier. Les identifiants suivent l'ordre croissant des adresses IP, ce qui permet de
+# retrouver un serveur par recherche dichotomique sans dictionnaire.
+class CompactGraph:
+    def __init__(self, packed_ip_addresses, links_sources, links_targets, links_response_times, sites=(),
+                 active=None):
+        # Les serveurs d'entrée sont désignés par leur indice dans packed_ip_addresses (adresses IPv4 sous forme
+        # d'entiers) ; sites : couples (indice, domaines hébergés) ; active : 1 octet par serveur
+        n = len(packed_ip_addresses)
+        order = sorted(range(n), key=packed_ip_addresses.__getitem__)
+        ranks = array("i", bytes(4 * n))  # Indice d'entrée -> identifiant
+        for node_id, index in enumerate(order):
+            ranks[index] = node_id
+
+        self.__ip_addresses = array("I", (packed_ip_addresses[index] for index in order))
+        for i in range(1, n):
+            if self.__ip_addresses[i] == self.__ip_addresses[i - 1]:
+                raise ValueError("Un serveur possède déjà l'adresse IP {}".format(self.ip_address(i)))
+
+        if active is None:
+            self.__active = bytearray(b"\x01") * n
+        else:
+            self.__active = bytearray(active[index] for index in order)
+
+        self.__build_adjacency([ranks[u] for u in links_sources], [ranks[v] for v in links_targets],
+                               links_response_times)
+
+        self.__hosting_servers = DomainTrie()  # Motif -> identifiants des serveurs qui l'hébergent (actifs ou non)
+        for index, domains in sites:
+            for domain in domains:
+                self.__hosting_servers.setdefault(domain, array("i")).append(ranks[index])
+
+    def __build_adjacency(self, sources, targets, weights):
+        if len(weights) > 0 and min(weights) <= 0:
+            raise ValueError("Le temps de réponse ne peut pas être négatif ou nul")
+
+        # Tri par dénombrement : chaque liaison apparaît dans la liste de ses deux extrémités
+        n = len(self.__ip_addresses)
+        offsets = array("q", bytes(8 * (n + 1)))
+        for node_id in sources:
+            offsets[node_id + 1] += 1
+        for node_id in targets:
+            offsets[node_id + 1] += 1
+        for i in range(n):
+            offsets[i + 1] += offsets[i]
+
+        cursors = offsets[:-1]
+        self.__targets = array("i", bytes(4 * offsets[n]))
+        self.__weights = array("i", bytes(4 * offsets[n]))
+        for u, v, w in zip(sources, targets, weights):
+            self.__targets[cursors[u]] = v
+            self.__weights[cursors[u]] = w
+            cursors[u] += 1
+            self.__targets[cursors[v]] = u
+            self.__weights[cursors[v]] = w
+            cursors[v] += 1
+
+        self.__offsets = offsets
+
+    # ip_addresses : adresses des serveurs ; links : triplets (ip1, ip2, temps de réponse) ;
+    # sites : dictionnaire ip -> domaines hébergés
+    @classmethod
+    def from_ip_addresses(cls, ip_addresses, links, sites=None, stopped_ip_addresses=()):
+        ip_addresses = list(ip_addresses)
+        indexes = {ip_address: i for i, ip_address in enumerate(ip_addresses)}
+
+        def require_index(ip_address):
+            if ip_address not in indexes:
+                raise ValueError("Le serveur {} est inconnu".format(ip_address))
+            return indexes[ip_address]
+
+        links_sources, links_targets, links_response_times = array("i"), array("i"), array("i")
+        for ip_address1, ip_address2, response_time in links:
+            links_sources.append(require_index(ip_address1))
+            links_targets.append(require_index(ip_address2))
+            links_response_times.append(response_time)
+
+        active = bytearray(b"\x01") * len(ip_addresses)
+        for ip_address in stopped_ip_addresses:
+            active[require_index(ip_address)] = 0
+
+        return cls([CompactGraph.pack_ip_address(ip_address) for ip_address in ip_addresses], links_sources,
+                   links_targets, links_response_times,
+                   [(require_index(ip_address), domains) for ip_address, domains in (sites or {}).items()], active)
+
+    @classmethod
+    def from_network(cls, network):
+        links = []
+        for server in network.servers:
+            for neighbour, response_time in server.get_neighbours():
+                # Chaque liaison est stockée des deux côtés : on ne la garde qu'une fois
+                if id(server) < id(neighbour):
+                    links.append((server.ip_address, neighbour.ip_address, response_time))
+
+        return cls.from_ip_addresses([server.ip_address for server in network.servers], links,
+                                     {server.ip_address: server.sites for server in network.servers},
+                                     [server.ip_address for server in network.servers if server.is_active() is False])
+
+    @staticmethod
+    def pack_ip_address(ip_address):
+        return int(ipaddress.IPv4Address(ip_address.strip()))
+
+    def __len__(self):
+        return len(self.__ip_addresses)
+
+    @property
+    def links_count(self):
+        return len(self.__targets) // 2
+
+    def get_id(self, ip_address):
+        try:
+            packed_ip_address = CompactGraph.pack_ip_address(ip_address)
+        except ValueError:
+            return None
+
+        i = bisect.bisect_left(self.__ip_addresses, packed_ip_address)
+        if i == len(self.__ip_addresses) or self.__ip_addresses[i] != packed_ip_address:
+            return None
+
+        return i
+
+    def ip_address(self, node_id):
+        return str(ipaddress.IPv4Address(self.__ip_addresses[node_id]))
+
+    def get_neighbours(self, node_id):
+        start, end = self.__offsets[node_id], self.__offsets[node_id + 1]
+        return zip(self.__targets[start:end], self.__weights[start:end])
+
+    def is_active(self, node_id):
+        return self.__active[node_id] == 1
+
+    def start(self, node_id):
+        self.__active[node_id] = 1
+
+    def stop(self, node_id):
+        self.__active[node_id] = 0
+
+    # Comme Network : les serveurs actifs du motif le plus spécifique qui couvre le domaine
+    def get_hosting_servers(self, domain):
+        for hosting_servers in self.__hosting_servers.matches(domain):
+            hosting_servers = [node_id for node_id in hosting_servers if self.__active[node_id] == 1]
+            if len(hosting_servers) > 0:
+                return hosting_servers
+        return []
+
+    # Dijkstra avec arrêt anticipé directement sur les tableaux CSR ; le chemin de la Route renvoyée contient
+    # des identifiants, du serveur hébergeur jusqu'au point de départ
+    def search(self, starting_point, domain):
+        hosting_servers = set(self.get_hosting_servers(domain))
+        if len(hosting_servers) == 0:
+            return Route(Route.NOT_HOSTED)
+
+        offsets, targets, weights, active = self.__offsets, self.__targets, self.__weights, self.__active
+        distances = {starting_point: 0}
+        predecessors = {starting_point: -1}
+        heap = [(0, starting_point)]
+        while heap:
+            distance, u = heapq.heappop(heap)
+            if distance > distances[u]:
+                continue
+
+            if u in hosting_servers:
+                shortest_path = []
+                while u != -1:
+                    shortest_path.append(u)
+                    u = predecessors[u]
+                return Route(Route.FOUND, shortest_path, distance)
+
+            if active[u] == 0:
+                continue
+
+            for i in range(offsets[u], offsets[u + 1]):
+                v = targets[i]
+                if distance + weights[i] < distances.get(v, float("inf")):
+                    distances[v] = distance + weights[i]
+                    predecessors[v] = u
+                    heapq.heappush(heap, (distance + weights[i], v))
+
+        return Route(Route.UNREACHABLE)
@@ -0,0 +1,100 @@
+import threading
+
+
+# Composantes connexes des serveurs actifs, dans un union-find : un serveur hébergeur hors de la composante du point
+# de départ ne peut pas être atteint, ce qui se sait sans parcourir le graphe. L'ajout d'un serveur, d'une liaison
+# ou le redémarrage d'un serveur ne font que fusionner des composantes. Arrêter un serveur peut en couper une en
+# plusieurs : l'union-find est alors reconstruit à la question suivante, sauf si le serveur n'avait qu'un voisin
+# actif (le retirer ne sépare rien). Un serveur arrêté peut rester dans l'union-find ; il est ignoré.
+class ConnectivityIndex:
+    def __init__(self, servers):
+        self.__servers = servers  # Liste des serveurs du réseau (tenue à jour par Network)
+        self.__parents = {}
+        self.__sizes = {}  # Racine -> nombre de serveurs de la composante
+        self.__is_stale = True
+        # Les recherches lancées dans un thread lisent l'index pendant que l'interface le modifie
+        self.__lock = threading.Lock()
+
+    def __find(self, server):
+        parents = self.__parents
+        root = server
+        while parents[root] is not root:
+            root = parents[root]
+        while server is not root:
+            parents[server], server = root, parents[server]
+        return root
+
+    def __union(self, server1, server2):
+        root1, root2 = self.__find(server1), self.__find(server2)
+        if root1 is root2:
+            return
+
+        if self.__sizes[root1] < self.__sizes[root2]:
+            root1, root2 = root2, root1
+        self.__parents[root2] = root1
+        self.__sizes[root1] += self.__sizes.pop(root2)
+
+    def __add(self, server):
+        if server not in self.__parents:
+            self.__parents[server] = server
+            self.__sizes[server] = 1
+
+    def __rebuild(self):
+        self.__parents = {}
+        self.__sizes = {}
+        for server in self.__servers:
+            if server.is_active() is True:
+                self.__add(server)
+        for server in list(self.__parents):
+            for neighbour, _ in server.get_neighbours():
+                if neighbour in self.__parents:
+                    self.__union(server, neighbour)
+        self.__is_stale = False
+
+    # Notifications transmises par Network
+    def server_added(self, server):
+        with self.__lock:
+            if not self.__is_stale and server.is_active() is True:
+                self.__add(server)
+
+    def link_added(self, server1, server2):
+        with self.__lock:
+            if not self.__is_stale and server1.is_active() is True and server2.is_active() is True:
+                self.__union(server1, server2)
+
+    def server_started(self, server):
+        with self.__lock:
+            if self.__is_stale:
+                return
+
+            self.__add(server)
+            for neighbour, _ in server.get_neighbours():
+                if neighbour.is_active() is True:
+                    self.__union(server, neighbour)
+
+    def server_stopped(self, server):
+        with self.__lock:
+            if sum(1 for neighbour, _ in server.get_neighbours() if neighbour.is_active() is True) > 1:
+                self.__is_stale = True
+
+    # Serveurs de servers qui sont dans la composante du point de départ (aucun si celui-ci est arrêté)
+    def reachable_servers(self, starting_point, servers):
+        with self.__lock:
+            root = self.__root(starting_point)
+            if root is None:
+                return []
+            return [server for server in servers if self.__root(server) is root]
+
+    # Comme reachable_servers, en s'arrêtant au premier serveur accessible
+    def reaches_any(self, starting_point, servers):
+        with self.__lock:
+            root = self.__root(starting_point)
+            return root is not None and any(self.__root(server) is root for server in servers)
+
+    def __root(self, server):
+        if self.__is_stale:
+            self.__rebuild()
+
+        if server.is_active() is False or server not in self.__parents:
+            return None
+        return self.__find(server)
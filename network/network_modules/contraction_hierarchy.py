@@ -0,0 +1,350 @@
+import heapq
+import ipaddress
+import struct
+import sys
+from array import array
+
+# Format binaire (petit-boutiste) :
+#   en-tête : MAGIC, puis nombre de serveurs, d'arcs montants, de liaisons et somme des temps de réponse (4 x uint64)
+#   serveurs : adresses IP (uint32) dans l'ordre des indices
+#   arcs montants au format CSR : offsets (uint64, un de plus que de serveurs), serveur d'arrivée (uint32), temps de
+#   réponse (int64) et serveur contourné par le raccourci (int32, -1 pour une liaison du réseau)
+MAGIC = b"NETCH\x00\x00\x01"
+_HEADER = struct.Struct("<QQQQ")
+
+
+def _to_little_endian(values):
+    if sys.byteorder == "big":
+        values = array(values.typecode, values)
+        values.byteswap()
+    return values
+
+
+def _read_array(file, typecode, count):
+    values = array(typecode)
+    values.frombytes(file.read(values.itemsize * count))
+    if len(values) != count:
+        raise ValueError("Le fichier de hiérarchie est tronqué")
+
+    if sys.byteorder == "big":
+        values.byteswap()
+    return values
+
+
+# Contraction Hierarchies : les serveurs sont contractés un à un, du moins important au plus important. Contracter
+# un serveur le retire du graphe restant et ajoute, entre chaque paire de ses voisins, un raccourci qui le contourne
+# lorsqu'aucun autre chemin aussi court n'existe (recherche de témoin). Une recherche ne suit ensuite que des arcs
+# montants (vers des serveurs contractés plus tard) depuis le point de départ et depuis les serveurs hébergeurs, et
+# s'arrête là où les deux recherches se rejoignent : quelques centaines de serveurs fixés même sur de très grands
+# réseaux. Les raccourcis sont ensuite dépliés pour rendre le chemin complet.
+#
+# La hiérarchie est calculée sur tous les serveurs, actifs ou non. Arrêter un serveur ne fait qu'allonger les
+# chemins : si le chemin trouvé ne traverse aucun serveur arrêté, il reste le plus court. Sinon, shortest_path()
+# renvoie None et Network se rabat sur Dijkstra. Ajouter un serveur ou une liaison rend la hiérarchie caduque.
+class ContractionHierarchy:
+    witness_limit = 100  # Nombre maximal de serveurs fixés par une recherche de témoin
+    # Au-delà, la recherche arrière part de trop de serveurs hébergeurs : Dijkstra, qui s'arrête au plus proche
+    # d'entre eux, est plus rapide
+    hosting_servers_limit = 16
+
+    def __init__(self, ip_addresses, offsets, targets, response_times, middles, links_count, response_times_sum):
+        self.ip_addresses = ip_addresses  # array("I") d'adresses IPv4 empaquetées, une par indice
+        self.offsets = offsets  # Les arcs montants du serveur i sont aux positions offsets[i]:offsets[i + 1]
+        self.targets = targets
+        self.response_times = response_times
+        self.middles = middles  # Serveur contourné par chaque raccourci, -1 pour une liaison du réseau
+        # Empreinte du graphe, pour vérifier qu'une hiérarchie chargée correspond bien au réseau
+        self.links_count = links_count
+        self.response_times_sum = response_times_sum
+        self.__servers = None  # Indice -> serveur, une fois associée à un réseau par bind()
+        self.__indices = None
+
+    def __len__(self):
+        return len(self.ip_addresses)
+
+    @property
+    def shortcuts_count(self):
+        return sum(1 for middle in self.middles if middle >= 0)
+
+    # Empreinte d'un réseau : nombre de liaisons distinctes et somme de leurs temps de réponse
+    @staticmethod
+    def __fingerprint(servers):
+        links_count, response_times_sum = 0, 0
+        for server in servers:
+            for neighbour, response_time in server.get_neighbours():
+                if server.ip_address < neighbour.ip_address:
+                    links_count += 1
+                    response_times_sum += response_time
+        return links_count, response_times_sum
+
+    @staticmethod
+    def build(network, witness_limit=None):
+        if witness_limit is None:
+            witness_limit = ContractionHierarchy.witness_limit
+        servers = list(network.servers)
+        indices = {server: i for i, server in enumerate(servers)}
+
+        # Graphe restant : pour chaque serveur, voisin -> temps de réponse de la plus rapide des liaisons
+        adjacency = [{} for _ in servers]
+        for i, server in enumerate(servers):
+            neighbours = adjacency[i]
+            for neighbour, response_time in server.get_neighbours():
+                j = indices[neighbour]
+                if j != i and response_time < neighbours.get(j, float("inf")):
+                    neighbours[j] = response_time
+
+        upward = ContractionHierarchy.__contract(adjacency, witness_limit)
+
+        hierarchy = ContractionHierarchy.__from_upward_links(
+            array("I", [int(ipaddress.IPv4Address(server.ip_address)) for server in servers]), upward,
+            *ContractionHierarchy.__fingerprint(servers))
+        hierarchy.bind(network)
+        return hierarchy
+
+    # Contraction avec mise à jour paresseuse des priorités : la priorité d'un serveur (raccourcis nécessaires moins
+    # liaisons retirées, plus voisins déjà contractés) est recalculée au moment de le contracter ; s'il n'est plus
+    # le moins important, il retourne dans le tas. Les liaisons qui restent à un serveur au moment de sa
+    # contraction sont ses arcs montants, avec le serveur contourné par chaque raccourci.
+    @staticmethod
+    def __contract(adjacency, witness_limit):
+        n = len(adjacency)
+        contracted_neighbours = [0] * n
+        levels = [0] * n  # Hauteur dans la hiérarchie : favorise une contraction uniforme du graphe
+        middles = {}  # (indice le plus petit, indice le plus grand) -> serveur contourné par le raccourci
+        upward = [None] * n  # Arcs montants de chaque serveur contracté : [(voisin, temps de réponse, contourné)]
+        inf = float("inf")
+
+        def shortcuts(v):
+            neighbours = list(adjacency[v].items())
+            result = []
+            for a, (u, to_u) in enumerate(neighbours):
+                targets = {x: to_u + to_x for x, to_x in neighbours[a + 1:]}
+                if len(targets) == 0:
+                    continue
+
+                # Recherche de témoin depuis u sans passer par v, limitée en distance et en serveurs fixés
+                limit = max(targets.values())
+                distances = {u: 0}
+                heap = [(0, u)]
+                settled = 0
+                remaining = len(targets)
+                while heap and settled < witness_limit:
+                    distance, w = heapq.heappop(heap)
+                    if distance > distances[w]:
+                        continue
+
+                    settled += 1
+                    if w in targets:
+                        remaining -= 1
+                        if remaining == 0:
+                            break
+                    for x, response_time in adjacency[w].items():
+                        x_distance = distance + response_time
+                        if x_distance <= limit and x_distance < distances.get(x, inf) and x != v:
+                            distances[x] = x_distance
+                            heapq.heappush(heap, (x_distance, x))
+
+                for x, distance in targets.items():
+                    if distances.get(x, inf) > distance:
+                        result.append((u, x, distance))
+            return result
+
+        def priority(v, v_shortcuts):
+            return len(v_shortcuts) - len(adjacency[v]) + contracted_neighbours[v] + levels[v]
+
+        heap = [(priority(v, shortcuts(v)), v) for v in range(n)]
+        heapq.heapify(heap)
+        while heap:
+            _, v = heapq.heappop(heap)
+            v_shortcuts = shortcuts(v)
+            v_priority = priority(v, v_shortcuts)
+            if heap and v_priority > heap[0][0]:
+                heapq.heappush(heap, (v_priority, v))
+                continue
+
+            neighbours = adjacency[v]
+            upward[v] = [(u, response_time, middles.pop((min(u, v), max(u, v)), -1))
+                         for u, response_time in neighbours.items()]
+            for u in neighbours:
+                del adjacency[u][v]
+                contracted_neighbours[u] += 1
+                levels[u] = max(levels[u], levels[v] + 1)
+            for u, x, response_time in v_shortcuts:
+                if response_time < adjacency[u].get(x, float("inf")):
+                    adjacency[u][x] = adjacency[x][u] = response_time
+                    middles[(min(u, x), max(u, x))] = v
+            adjacency[v] = {}
+
+        return upward
+
+    @staticmethod
+    def __from_upward_links(ip_addresses, upward, links_count, response_times_sum):
+        offsets = array("Q", [0])
+        targets = array("I")
+        response_times = array("q")
+        middles = array("i")
+        for links in upward:
+            for u, response_time, middle in links:
+                targets.append(u)
+                response_times.append(response_time)
+                middles.append(middle)
+            offsets.append(len(targets))
+        return ContractionHierarchy(ip_addresses, offsets, targets, response_times, middles, links_count,
+                                    response_times_sum)
+
+    # Associe la hiérarchie aux serveurs d'un réseau, après avoir vérifié qu'elle a été calculée sur ce graphe
+    def bind(self, network):
+        servers = [network.get_server(str(ipaddress.IPv4Address(ip_address))) for ip_address in self.ip_addresses]
+        if len(servers) != len(network.servers) or any(server is None for server in servers):
+            raise ValueError("La hiérarchie ne correspond pas aux serveurs du réseau")
+
+        if ContractionHierarchy.__fingerprint(servers) != (self.links_count, self.response_times_sum):
+            raise ValueError("La hiérarchie ne correspond pas aux liaisons du réseau")
+
+        self.__servers = servers
+        self.__indices = {server: i for i, server in enumerate(servers)}
+
+    # Renvoie le chemin (du serveur hébergeur jusqu'au point de départ) et sa longueur, (None, None) si aucun
+    # serveur hébergeur n'est accessible, ou None lorsque Dijkstra doit prendre le relais : chemin traversant un
+    # serveur arrêté ou domaine hébergé par trop de serveurs
+    def shortest_path(self, starting_point, hosting_servers, metrics=None):
+        hosting_servers = set(hosting_servers)
+        if starting_point in hosting_servers:
+            return [starting_point], 0
+
+        if len(hosting_servers) > self.hosting_servers_limit:
+            return None
+
+        if starting_point.is_active() is False or len(hosting_servers) == 0:
+            return None, None
+
+        indices = self.__indices
+        path, distance = self.query(indices[starting_point], [indices[server] for server in hosting_servers],
+                                    metrics)
+        if path is None:
+            return None, None
+
+        servers = [self.__servers[i] for i in reversed(path)]
+        if any(server.is_active() is False for server in servers):
+            return None
+        return servers, distance
+
+    # Recherche bidirectionnelle sur les arcs montants, entre indices de serveurs. Un serveur atteint plus vite
+    # par un arc descendant que par la recherche n'est pas développé (stall-on-demand) : il ne peut pas être le
+    # sommet d'un plus court chemin. Renvoie le chemin (du départ vers la cible) et sa longueur, ou (None, None).
+    def query(self, source, targets, metrics=None):
+        offsets, arc_targets, response_times = self.offsets, self.targets, self.response_times
+        forward_distances = {source: 0}
+        backward_distances = dict.fromkeys(targets, 0)
+        forward_predecessors = {source: -1}
+        backward_predecessors = dict.fromkeys(targets, -1)
+        forward_heap = [(0, source)]
+        backward_heap = [(0, target) for target in backward_distances]
+        settled = 0
+        inf = float("inf")
+        best, meeting_point = inf, -1
+
+        while forward_heap or backward_heap:
+            forward = len(backward_heap) == 0 or (len(forward_heap) > 0 and forward_heap[0][0] <= backward_heap[0][0])
+            heap = forward_heap if forward else backward_heap
+            if heap[0][0] >= best:
+                heap.clear()  # Cette recherche ne peut plus trouver de chemin plus court
+                continue
+
+            distances, other_distances = ((forward_distances, backward_distances) if forward else
+                                          (backward_distances, forward_distances))
+            predecessors = forward_predecessors if forward else backward_predecessors
+            distance, u = heapq.heappop(heap)
+            if distance > distances[u]:
+                continue
+            settled += 1
+
+            if u in other_distances and distance + other_distances[u] < best:
+                best, meeting_point = distance + other_distances[u], u
+
+            first, last = offsets[u], offsets[u + 1]
+            arcs = list(zip(arc_targets[first:last], response_times[first:last]))
+            if any(distances.get(v, inf) + response_time < distance for v, response_time in arcs):
+                continue
+            for v, response_time in arcs:
+                if distance + response_time < distances.get(v, inf):
+                    distances[v] = distance + response_time
+                    predecessors[v] = u
+                    heapq.heappush(heap, (distance + response_time, v))
+
+        if metrics is not None and metrics.enabled:
+            metrics.observe("nodes_settled", settled)
+
+        if meeting_point < 0:
+            return None, None
+
+        # Sommets de la hiérarchie : du départ jusqu'au point de rencontre, puis jusqu'à la cible
+        hierarchy_path = []
+        u = meeting_point
+        while u >= 0:
+            hierarchy_path.append(u)
+            u = forward_predecessors[u]
+        hierarchy_path.reverse()
+        u = backward_predecessors[meeting_point]
+        while u >= 0:
+            hierarchy_path.append(u)
+            u = backward_predecessors[u]
+
+        path = [hierarchy_path[0]]
+        for u, v in zip(hierarchy_path, hierarchy_path[1:]):
+            self.__unpack(u, v, path)
+        return path, best
+
+    # Serveur contourné par l'arc entre u et v, -1 s'il s'agit d'une liaison du réseau. L'arc est rangé chez le
+    # moins important des deux serveurs, contracté en premier.
+    def __middle(self, u, v):
+        for first, second in [(u, v), (v, u)]:
+            for i in range(self.offsets[first], self.offsets[first + 1]):
+                if self.targets[i] == second:
+                    return self.middles[i]
+        raise ValueError("Aucun arc entre {} et {}".format(u, v))
+
+    # Ajoute à path les serveurs après u jusqu'à v, en dépliant récursivement les raccourcis
+    def __unpack(self, u, v, path):
+        stack = [(u, v)]
+        while stack:
+            u, v = stack.pop()
+            middle = self.__middle(u, v)
+            if middle < 0:
+                path.append(v)
+            else:
+                stack.append((middle, v))
+                stack.append((u, middle))
+
+
+def write_hierarchy(hierarchy, path):
+    with open(path, "wb") as file:
+        file.write(MAGIC)
+        file.write(_HEADER.pack(len(hierarchy), len(hierarchy.targets), hierarchy.links_count,
+                                hierarchy.response_times_sum))
+        for values in [hierarchy.ip_addresses, hierarchy.offsets, hierarchy.targets, hierarchy.response_times,
+                       hierarchy.middles]:
+            file.write(_to_little_endian(values).tobytes())
+
+
+def read_hierarchy(path):
+    with open(path, "rb") as file:
+        if file.read(len(MAGIC)) != MAGIC:
+            raise ValueError("Le fichier n'est pas une hiérarchie de contraction")
+
+        header = file.read(_HEADER.size)
+        if len(header) != _HEADER.size:
+            raise ValueError("Le fichier de hiérarchie est tronqué")
+        n, m, links_count, response_times_sum = _HEADER.unpack(header)
+
+        ip_addresses = _read_array(file, "I", n)
+        offsets = _read_array(file, "Q", n + 1)
+        targets = _read_array(file, "I", m)
+        response_times = _read_array(file, "q", m)
+        middles = _read_array(file, "i", m)
+
+    if offsets[n] != m or any(target >= n for target in targets):
+        raise ValueError("Le fichier de hiérarchie est incohérent")
+
+    return ContractionHierarchy(ip_addresses, offsets, targets, response_times, middles, links_count,
+                                response_times_sum)
@@ -0,0 +1,155 @@
+import sys
+
+
+class _Label:
+    __slots__ = ("children", "value", "wildcard_value")
+
+    def __init__(self):
+        self.children = None  # Étiquette suivante -> _Label, créé au premier enfant (les feuilles sont nombreuses)
+        self.value = None  # Valeur du nom exact
+        self.wildcard_value = None  # Valeur de "*.nom", qui couvre tous les sous-domaines du nom
+
+
+# Trie des motifs de domaines, indexé par étiquettes DNS lues de droite à gauche ("fr.wikipedia.org" est rangé
+# sous org -> wikipedia -> fr). Un motif est un nom exact ou une zone "*.wikipedia.org", qui couvre tous les
+# sous-domaines de wikipedia.org (mais pas wikipedia.org lui-même). Une recherche parcourt autant de nœuds que le
+# domaine a d'étiquettes, quel que soit le nombre de motifs : des millions de sous-domaines d'une centaine de zones
+# ne coûtent que ces zones. Les étiquettes sont partagées (sys.intern) et la casse est ignorée, comme en DNS.
+class DomainTrie:
+    def __init__(self):
+        self.__root = _Label()
+        self.__len = 0
+
+    # Étiquettes du motif, de la plus générale à la plus spécifique, et s'il s'agit d'une zone "*."
+    @staticmethod
+    def labels(pattern):
+        if not isinstance(pattern, str):
+            raise TypeError("Un domaine doit être une chaîne de caractères")
+
+        labels = pattern.strip().lower().rstrip(".").split(".")
+        is_wildcard = labels[0] == "*"
+        if is_wildcard:
+            labels = labels[1:]
+        if any("*" in label for label in labels):
+            raise ValueError("Le domaine {} est invalide : \"*\" ne peut être que la première étiquette".format(
+                pattern))
+
+        labels.reverse()
+        return labels, is_wildcard
+
+    def __node(self, pattern, create=False):
+        labels, is_wildcard = DomainTrie.labels(pattern)
+        node = self.__root
+        for label in labels:
+            children = node.children
+            child = None if children is None else children.get(label)
+            if child is None:
+                if not create:
+                    return None, is_wildcard
+                if children is None:
+                    children = node.children = {}
+                child = children[sys.intern(label)] = _Label()
+            node = child
+        return node, is_wildcard
+
+    def get(self, pattern, default=None):
+        node, is_wildcard = self.__node(pattern)
+        value = None if node is None else node.wildcard_value if is_wildcard else node.value
+        return default if value is None else value
+
+    def setdefault(self, pattern, default):
+        node, is_wildcard = self.__node(pattern, True)
+        value = node.wildcard_value if is_wildcard else node.value
+        if value is None:
+            self.__len += 1
+            value = default
+            if is_wildcard:
+                node.wildcard_value = value
+            else:
+                node.value = value
+        return value
+
+    # Les nœuds devenus vides ne sont pas élagués : ils resservent si le motif est de nouveau hébergé
+    def pop(self, pattern, default=None):
+        node, is_wildcard = self.__node(pattern)
+        value = None if node is None else node.wildcard_value if is_wildcard else node.value
+        if value is None:
+            return default
+
+        self.__len -= 1
+        if is_wildcard:
+            node.wildcard_value = None
+        else:
+            node.value = None
+        return value
+
+    # Valeurs des motifs qui couvrent le domaine, du plus spécifique au plus général : le nom exact, puis les zones
+    # de la plus longue à la plus courte
+    def matches(self, domain):
+        try:
+            labels, is_wildcard = DomainTrie.labels(domain)
+        except ValueError:
+            return  # Aucun motif ne peut couvrir un domaine invalide
+        wildcard_values = []
+        node = self.__root
+        for label in labels:
+            if node.wildcard_value is not None:
+                wildcard_values.append(node.wildcard_value)
+            node = None if node.children is None else node.children.get(label)
+            if node is None:
+                break
+        else:
+            # "*.wikipedia.org" demandé tel quel désigne la zone ; un nom exact est prioritaire sur ses zones
+            if is_wildcard:
+                if node.wildcard_value is not None:
+                    yield node.wildcard_value
+            elif node.value is not None:
+                yield node.value
+
+        yield from reversed(wildcard_values)
+
+    def __contains__(self, pattern):
+        return self.get(pattern) is not None
+
+    def __len__(self):
+        return self.__len
+
+
+# Index inversé des domaines hébergés par les serveurs actifs. Un domaine est hébergé par les serveurs du motif
+# le plus spécifique qui le couvre : un site "*.wikipedia.org" suffit pour tous les sous-domaines, mais un serveur
+# qui héberge "fr.wikipedia.org" exactement passe avant la zone (tant qu'il est actif).
+class DomainIndex:
+    def __init__(self):
+        self.__hosting_servers = DomainTrie()  # Motif -> ensemble des serveurs actifs qui l'hébergent
+
+    def add(self, domain, server):
+        self.__hosting_servers.setdefault(domain, set()).add(server)
+
+    def remove(self, domain, server):
+        servers = self.__hosting_servers.get(domain)
+        if servers is None:
+            return
+
+        servers.discard(server)
+        if len(servers) == 0:
+            self.__hosting_servers.pop(domain)
+
+    def add_server(self, server):
+        for site in server.sites:
+            self.add(site, server)
+
+    def remove_server(self, server):
+        for site in server.sites:
+            self.remove(site, server)
+
+    def get_servers(self, domain):
+        # Les motifs sans serveur actif sont retirés du trie : le premier trouvé est le bon
+        for servers in self.__hosting_servers.matches(domain):
+            return servers
+        return set()
+
+    def __contains__(self, domain):
+        return len(self.get_servers(domain)) > 0
+
+    def __len__(self):
+        return len(self.__hosting_servers)
@@ -0,0 +1,438 @@
+import heapq
+import math
+import random
+from array import array
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+
+from network_modules.domain_index import DomainTrie
+
+INDEPENDENT = "independent"
+REGIONAL = "regional"
+
+# Tableaux lus par les processus, placés en mémoire partagée : nom -> code de type
+#   offsets, targets, weights : liaisons au format CSR (chacune des deux côtés)
+#   active, centers_x, centers_y : état et coordonnées des serveurs
+#   hosts_offsets, hosts : serveurs qui hébergent chaque domaine, au format CSR
+#   query_starts, query_domains, baseline : requêtes, domaine auquel les rapporter (le motif le plus spécifique)
+#   et leur temps de réponse sans panne
+#   candidates_offsets, candidates : motifs qui couvrent le domaine de chaque requête, du plus spécifique au plus
+#   général, au format CSR
+#   queries_offsets, queries_by_server : requêtes dont le chemin sans panne traverse chaque serveur, au format CSR
+_ARRAYS = {
+    "offsets": "q", "targets": "i", "weights": "i",
+    "active": "B", "centers_x": "i", "centers_y": "i",
+    "hosts_offsets": "q", "hosts": "i",
+    "query_starts": "i", "query_domains": "i", "baseline": "q",
+    "candidates_offsets": "q", "candidates": "i",
+    "queries_offsets": "q", "queries_by_server": "i"
+}
+
+_arrays = None  # Tableaux du processus courant (array.array, ou memoryview sur la mémoire partagée)
+_model = None
+_cells = None  # (tableaux, rayon, grille des serveurs) pour le modèle régional, construite une fois par processus
+_blocks = []  # Blocs de mémoire partagée ouverts par le processus, gardés ouverts jusqu'à sa fin
+
+
+class _Arrays:
+    pass
+
+
+def _csr(lists, typecode):
+    offsets, values = array("q", [0]), array(typecode)
+    for items in lists:
+        values.extend(items)
+        offsets.append(len(values))
+    return offsets, values
+
+
+def _share(arrays):
+    descriptor, blocks = {}, []
+    for name in _ARRAYS:
+        data = getattr(arrays, name).tobytes()
+        block = shared_memory.SharedMemory(create=True, size=max(1, len(data)))
+        block.buf[:len(data)] = data
+        blocks.append(block)
+        descriptor[name] = (block.name, len(data))
+    return descriptor, blocks
+
+
+def _attach(descriptor):
+    arrays = _Arrays()
+    for name, typecode in _ARRAYS.items():
+        block_name, size = descriptor[name]
+        block = shared_memory.SharedMemory(name=block_name)
+        _blocks.append(block)
+        setattr(arrays, name, block.buf[:size].cast(typecode))
+    return arrays
+
+
+def _init_worker(descriptor, model):
+    global _arrays, _model
+    _arrays = _attach(descriptor)
+    _model = model
+
+
+# Dijkstra avec arrêt anticipé sur les tableaux CSR, les serveurs arrêtés ou en panne ne transmettant rien et
+# n'hébergeant rien, comme avec Server.stop(). Comme DomainIndex, la requête est servie par les hôtes du premier
+# motif (domains, du plus spécifique au plus général) qui a encore un hôte actif et pas en panne. Renvoie le temps
+# de réponse (-1 si aucun serveur hébergeur n'est accessible) et le chemin, du point de départ au serveur hébergeur.
+def _shortest_path(arrays, starting_point, domains, failed):
+    active = arrays.active
+    hosting_servers = set()
+    for domain in domains:
+        hosting_servers = {server for server in arrays.hosts[arrays.hosts_offsets[domain]:
+                                                             arrays.hosts_offsets[domain + 1]]
+                           if active[server] == 1 and server not in failed}
+        if len(hosting_servers) > 0:
+            break
+    if len(hosting_servers) == 0:
+        return -1, None
+
+    offsets, targets, weights = arrays.offsets, arrays.targets, arrays.weights
+    distances = {starting_point: 0}
+    predecessors = {starting_point: -1}
+    heap = [(0, starting_point)]
+    while heap:
+        distance, u = heapq.heappop(heap)
+        if distance > distances[u]:
+            continue
+
+        if u in hosting_servers:
+            path = []
+            while u != -1:
+                path.append(u)
+                u = predecessors[u]
+            return distance, path[::-1]
+
+        if active[u] == 0 or u in failed:
+            continue
+
+        for i in range(offsets[u], offsets[u + 1]):
+            v = targets[i]
+            if distance + weights[i] < distances.get(v, float("inf")):
+                distances[v] = distance + weights[i]
+                predecessors[v] = u
+                heapq.heappush(heap, (distance + weights[i], v))
+
+    return -1, None
+
+
+class FailureModel:
+    def __init__(self, kind=INDEPENDENT, probability=0.05, regions=1, radius=100.0):
+        if kind not in [INDEPENDENT, REGIONAL]:
+            raise ValueError("Modèle de pannes inconnu \"{}\"".format(kind))
+
+        if not isinstance(probability, (int, float)) or not 0 <= probability <= 1:
+            raise ValueError("La probabilité de panne doit être comprise entre 0 et 1")
+
+        if not isinstance(regions, int) or regions <= 0:
+            raise ValueError("Le nombre de régions doit être un entier strictement positif")
+
+        if not isinstance(radius, (int, float)) or radius <= 0:
+            raise ValueError("Le rayon d'une région doit être strictement positif")
+
+        self.kind = kind
+        self.probability = probability  # Modèle indépendant : chaque serveur tombe en panne avec cette probabilité
+        self.regions = regions  # Modèle régional : nombre d'épicentres et rayon autour de chacun
+        self.radius = radius
+
+    def to_dict(self):
+        if self.kind == INDEPENDENT:
+            return {"kind": self.kind, "probability": self.probability}
+        return {"kind": self.kind, "regions": self.regions, "radius": self.radius}
+
+    # Serveurs actifs mis en panne par un scénario
+    def sample(self, arrays, rng):
+        active = arrays.active
+        n = len(active)
+        failed = set()
+        if n == 0:
+            return failed
+
+        if self.kind == INDEPENDENT:
+            if self.probability == 0:
+                return failed
+            if self.probability == 1:
+                return {i for i in range(n) if active[i] == 1}
+
+            # Écarts géométriques entre deux pannes : on ne tire qu'un nombre par serveur en panne
+            log_survival = math.log(1 - self.probability)
+            i = int(math.log(1.0 - rng.random()) / log_survival)
+            while i < n:
+                if active[i] == 1:
+                    failed.add(i)
+                i += int(math.log(1.0 - rng.random()) / log_survival) + 1
+            return failed
+
+        # Pannes corrélées : tous les serveurs à moins de radius d'un épicentre tiré au hasard
+        cells = self.__cells(arrays)
+        centers_x, centers_y = arrays.centers_x, arrays.centers_y
+        squared_radius = self.radius ** 2
+        for _ in range(self.regions):
+            epicenter = rng.randrange(n)
+            x, y = centers_x[epicenter], centers_y[epicenter]
+            cell_x, cell_y = int(x // self.radius), int(y // self.radius)
+            for i in range(cell_x - 1, cell_x + 2):
+                for j in range(cell_y - 1, cell_y + 2):
+                    for server in cells.get((i, j), ()):
+                        distance = (centers_x[server] - x) ** 2 + (centers_y[server] - y) ** 2
+                        if active[server] == 1 and distance <= squared_radius:
+                            failed.add(server)
+        return failed
+
+    def __cells(self, arrays):
+        global _cells
+        if _cells is None or _cells[0] is not arrays or _cells[1] != self.radius:
+            cells = {}
+            for server, (x, y) in enumerate(zip(arrays.centers_x, arrays.centers_y)):
+                cells.setdefault((int(x // self.radius), int(y // self.radius)), []).append(server)
+            _cells = (arrays, self.radius, cells)
+        return _cells[2]
+
+
+# Totaux d'un ensemble de scénarios ; seuls les couples (scénario, requête) dont le chemin sans panne traverse un
+# serveur en panne sont comptés, les autres gardent leur temps de réponse
+class _Totals:
+    def __init__(self):
+        self.scenarios = 0
+        self.lost = {}  # Domaine -> requêtes devenues inaccessibles
+        self.inflation = {}  # Domaine -> somme des (temps de réponse / temps sans panne - 1)
+        self.max_inflation = {}  # Domaine -> plus grand rapport temps de réponse / temps sans panne
+        self.server_failures = {}  # Serveur -> nombre de scénarios où il est en panne
+        self.server_lost = {}  # Serveur -> requêtes perdues alors qu'il était en panne sur leur chemin
+        self.server_extra_latency = {}  # Serveur -> temps de réponse ajouté alors qu'il était en panne sur le chemin
+
+    def merge(self, other):
+        self.scenarios += other.scenarios
+        for name in ["lost", "inflation", "server_failures", "server_lost", "server_extra_latency"]:
+            totals = getattr(self, name)
+            for key, value in getattr(other, name).items():
+                totals[key] = totals.get(key, 0) + value
+        for key, value in other.max_inflation.items():
+            self.max_inflation[key] = max(self.max_inflation.get(key, 1.0), value)
+
+
+def _run_scenarios(seed, first, count, arrays=None, model=None):
+    arrays = _arrays if arrays is None else arrays
+    model = _model if model is None else model
+    offsets, queries_by_server = arrays.queries_offsets, arrays.queries_by_server
+    starts, domains, baseline = arrays.query_starts, arrays.query_domains, arrays.baseline
+    candidates_offsets, candidates = arrays.candidates_offsets, arrays.candidates
+    totals = _Totals()
+    for scenario in range(first, first + count):
+        # Chaque scénario a son propre générateur, tiré de la graine et de son numéro
+        failed = model.sample(arrays, random.Random(seed * 1000003 + scenario))
+        totals.scenarios += 1
+
+        affected = {}  # Requête -> serveurs en panne sur son chemin sans panne
+        for server in failed:
+            totals.server_failures[server] = totals.server_failures.get(server, 0) + 1
+            for query in queries_by_server[offsets[server]:offsets[server + 1]]:
+                affected.setdefault(query, []).append(server)
+
+        for query, servers in affected.items():
+            domain = domains[query]
+            distance, _ = _shortest_path(arrays, starts[query],
+                                         candidates[candidates_offsets[query]:candidates_offsets[query + 1]], failed)
+            if distance < 0:
+                totals.lost[domain] = totals.lost.get(domain, 0) + 1
+                for server in servers:
+                    totals.server_lost[server] = totals.server_lost.get(server, 0) + 1
+                continue
+
+            extra_latency = distance - baseline[query]
+            if extra_latency > 0:
+                ratio = distance / baseline[query]
+                totals.inflation[domain] = totals.inflation.get(domain, 0) + ratio - 1
+                totals.max_inflation[domain] = max(totals.max_inflation.get(domain, 1.0), ratio)
+                for server in servers:
+                    totals.server_extra_latency[server] = totals.server_extra_latency.get(server, 0) + extra_latency
+
+    return totals
+
+
+class FailureReport:
+    def __init__(self, topology, model, seed, queries, baseline_by_domain, unreachable, totals):
+        self.__topology = topology
+        self.model = model
+        self.seed = seed
+        self.scenarios = totals.scenarios
+        self.queries = queries
+        self.unreachable = unreachable  # Requêtes déjà inaccessibles sans panne, ignorées
+        self.__baseline_by_domain = baseline_by_domain  # Domaine -> requêtes accessibles sans panne
+        self.__totals = totals
+
+    # Part des requêtes accessibles sans panne qui le restent, tous scénarios confondus
+    @property
+    def availability(self):
+        evaluations = sum(self.__baseline_by_domain.values()) * self.scenarios
+        if evaluations == 0:
+            return None
+        return 1 - sum(self.__totals.lost.values()) / evaluations
+
+    def domain_statistics(self, domain):
+        evaluations = self.__baseline_by_domain.get(domain, 0) * self.scenarios
+        if evaluations == 0:
+            return None
+
+        lost = self.__totals.lost.get(domain, 0)
+        reachable = evaluations - lost
+        return {
+            "queries": self.__baseline_by_domain[domain],
+            "availability": reachable / evaluations,
+            "mean_inflation": 1 + self.__totals.inflation.get(domain, 0) / reachable if reachable > 0 else None,
+            "max_inflation": self.__totals.max_inflation.get(domain, 1.0) if reachable > 0 else None
+        }
+
+    # Serveurs dont la panne a coûté le plus de requêtes, puis le plus de temps de réponse
+    def critical_servers(self, count=10):
+        totals = self.__totals
+        servers = sorted(totals.server_failures, key=lambda server: (-totals.server_lost.get(server, 0),
+                                                                     -totals.server_extra_latency.get(server, 0),
+                                                                     server))
+        return [{
+            "ip_address": self.__topology.ip_address(server),
+            "failures": totals.server_failures[server],
+            "lost_queries": totals.server_lost.get(server, 0),
+            "extra_latency": totals.server_extra_latency.get(server, 0)
+        } for server in servers[:count] if server in totals.server_lost or server in totals.server_extra_latency]
+
+    def to_dict(self, critical_servers_count=10):
+        domains = self.__topology.domains
+        return {
+            "model": self.model.to_dict(),
+            "seed": self.seed,
+            "scenarios": self.scenarios,
+            "queries": self.queries,
+            "unreachable_without_failures": self.unreachable,
+            "availability": self.availability,
+            "domains": {domains[domain]: self.domain_statistics(domain) for domain in sorted(
+                self.__baseline_by_domain, key=lambda domain: domains[domain])},
+            "critical_servers": self.critical_servers(critical_servers_count)
+        }
+
+
+# Injection de pannes par Monte-Carlo : chaque scénario met en panne un ensemble aléatoire de serveurs et mesure,
+# pour une charge de requêtes (point de départ, domaine), la part des requêtes qui restent accessibles et
+# l'allongement de leur temps de réponse. Seules les requêtes dont le chemin sans panne traverse un serveur en panne
+# sont recalculées. Le scénario i est tiré à partir de la graine et de i seulement : le résultat ne dépend pas du
+# nombre de processus. Avec plusieurs processus, le graphe est placé une fois en mémoire partagée et chaque
+# processus le lit sans le copier.
+class FailureInjection:
+    def __init__(self, topology, model=None):
+        self.topology = topology
+        self.model = FailureModel() if model is None else model
+        self.__queries = []  # (indice du point de départ, indices des motifs qui couvrent le domaine)
+        self.__indexes = {topology.ip_address(i): i for i in range(len(topology))}
+        self.__domain_ids = DomainTrie()  # Motif -> indice du domaine dans la topologie
+        for i, domain in enumerate(topology.domains):
+            self.__domain_ids.setdefault(domain, i)
+
+    def __len__(self):
+        return len(self.__queries)
+
+    def add_query(self, starting_ip, domain):
+        starting_point = self.__indexes.get(starting_ip.strip() if isinstance(starting_ip, str) else starting_ip)
+        if starting_point is None:
+            raise ValueError("Le serveur {} est inconnu".format(starting_ip))
+
+        if not isinstance(domain, str) or not domain.strip():
+            raise ValueError("Le domaine d'une requête ne peut pas être vide")
+
+        # Tous les motifs qui couvrent le domaine, du plus spécifique au plus général : un scénario qui arrête les
+        # hôtes du nom exact se rabat sur ceux de la zone. Un domaine hébergé nulle part reste inaccessible.
+        self.__queries.append((starting_point, tuple(self.__domain_ids.matches(domain))))
+
+    # Requêtes tirées uniformément parmi les serveurs et les domaines
+    def sample_queries(self, count, seed=None):
+        if len(self.topology) == 0 or len(self.topology.domains) == 0:
+            return
+
+        rng = random.Random(seed)
+        for _ in range(count):
+            self.__queries.append((rng.randrange(len(self.topology)), (rng.randrange(len(self.topology.domains)),)))
+
+    def __build_arrays(self):
+        topology = self.topology
+        n = len(topology)
+        arrays = _Arrays()
+
+        adjacency = [[] for _ in range(n)]
+        for u, v, response_time in topology.get_links():
+            adjacency[u].append((v, response_time))
+            adjacency[v].append((u, response_time))
+        arrays.offsets, arrays.targets = _csr(([v for v, _ in links] for links in adjacency), "i")
+        arrays.weights = array("i", (response_time for links in adjacency for _, response_time in links))
+
+        arrays.active = array("B", topology.active)
+        arrays.centers_x = array("i", topology.centers_x)
+        arrays.centers_y = array("i", topology.centers_y)
+
+        hosts = [[] for _ in topology.domains]
+        for server in range(n):
+            for domain in topology.sites_domains[topology.sites_offsets[server]:topology.sites_offsets[server + 1]]:
+                hosts[domain].append(server)
+        arrays.hosts_offsets, arrays.hosts = _csr(hosts, "i")
+
+        # Requêtes accessibles sans panne, avec leur temps de réponse et leur chemin
+        arrays.query_starts, arrays.query_domains, arrays.baseline = array("i"), array("i"), array("q")
+        query_candidates = []
+        queries_by_server = [[] for _ in range(n)]
+        baseline_by_domain = {}
+        unreachable = 0
+        for starting_point, domains in self.__queries:
+            distance, path = _shortest_path(arrays, starting_point, domains, ())
+            if distance < 0:
+                unreachable += 1
+                continue
+
+            query = len(arrays.baseline)
+            domain = domains[0]
+            arrays.query_starts.append(starting_point)
+            arrays.query_domains.append(domain)
+            query_candidates.append(domains)
+            arrays.baseline.append(distance)
+            baseline_by_domain[domain] = baseline_by_domain.get(domain, 0) + 1
+            for server in path:
+                queries_by_server[server].append(query)
+        arrays.queries_offsets, arrays.queries_by_server = _csr(queries_by_server, "i")
+        arrays.candidates_offsets, arrays.candidates = _csr(query_candidates, "i")
+
+        return arrays, baseline_by_domain, unreachable
+
+    def run(self, scenarios, seed=None, workers=1, chunk_size=100):
+        if not isinstance(scenarios, int) or scenarios < 0:
+            raise ValueError("Le nombre de scénarios doit être un entier positif")
+
+        if not isinstance(workers, int) or workers <= 0:
+            raise ValueError("Le nombre de processus doit être un entier strictement positif")
+
+        if not isinstance(chunk_size, int) or chunk_size <= 0:
+            raise ValueError("La taille des paquets doit être un entier strictement positif")
+
+        # Sans graine, on en tire une et on la donne dans le rapport pour pouvoir rejouer les scénarios
+        if seed is None:
+            seed = random.getrandbits(32)
+
+        arrays, baseline_by_domain, unreachable = self.__build_arrays()
+        chunks = [(seed, first, min(chunk_size, scenarios - first)) for first in range(0, scenarios, chunk_size)]
+        totals = _Totals()
+        if workers == 1:
+            for seed, first, count in chunks:
+                totals.merge(_run_scenarios(seed, first, count, arrays, self.model))
+        else:
+            descriptor, blocks = _share(arrays)
+            try:
+                with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                         initargs=(descriptor, self.model)) as executor:
+                    # Les totaux sont fusionnés dans l'ordre des paquets : même résultat quel que soit le partage
+                    for chunk_totals in executor.map(_run_scenarios, *zip(*chunks)):
+                        totals.merge(chunk_totals)
+            finally:
+                for block in blocks:
+                    block.close()
+                    block.unlink()
+
+        return FailureReport(self.topology, self.model, seed, len(self.__queries), baseline_by_domain, unreachable,
+                             totals)
@@ -0,0 +1,139 @@
+import math
+import random
+from array import array
+
+from network_modules.topology import Topology
+
+_FIRST_IP_ADDRESS = 10 << 24  # Les serveurs générés ont les adresses 10.0.0.1, 10.0.0.2, ...
+
+
+# Générateurs de topologies synthétiques, tous déterministes pour une graine donnée. Les serveurs sont espacés de
+# spacing pixels pour pouvoir être affichés sans se chevaucher, les sites sont répartis par zipf_sites.
+
+def random_geometric(n, seed=0, degree=8, spacing=100):
+    # Serveurs tirés uniformément dans un carré, reliés s'ils sont à moins de radius l'un de l'autre ; le rayon
+    # est choisi pour obtenir le degré moyen demandé. Le temps de réponse est proportionnel à la distance.
+    rng = random.Random(seed)
+    side = max(1, int(math.sqrt(n) * spacing))
+    radius = side * math.sqrt(degree / (math.pi * max(n, 1)))
+    centers_x = array("i", (rng.randrange(side) for _ in range(n)))
+    centers_y = array("i", (rng.randrange(side) for _ in range(n)))
+
+    # Grille de cellules de la taille du rayon : seules les cellules voisines peuvent contenir des serveurs reliés
+    cells = {}
+    for i in range(n):
+        cells.setdefault((int(centers_x[i] // radius), int(centers_y[i] // radius)), []).append(i)
+
+    links = []
+    for (column, row), servers in cells.items():
+        for dx, dy in [(0, 0), (1, -1), (1, 0), (1, 1), (0, 1)]:  # Chaque paire de cellules n'est vue qu'une fois
+            others = cells.get((column + dx, row + dy))
+            if others is None:
+                continue
+            for a, u in enumerate(servers):
+                for v in (others[a + 1:] if dx == 0 and dy == 0 else others):
+                    distance = math.hypot(centers_x[u] - centers_x[v], centers_y[u] - centers_y[v])
+                    if distance <= radius:
+                        links.append((u, v, max(1, round(10 * distance / spacing))))
+
+    return _build(centers_x, centers_y, links)
+
+
+def barabasi_albert(n, seed=0, m=2, spacing=100):
+    # Attachement préférentiel : chaque nouveau serveur est relié à m serveurs existants choisis
+    # proportionnellement à leur degré (tirage uniforme dans la liste des extrémités des liaisons)
+    rng = random.Random(seed)
+    links = []
+    endpoints = []
+    for u in range(1, n):
+        targets = set()
+        while len(targets) < min(m, u):
+            targets.add(endpoints[rng.randrange(len(endpoints))] if len(endpoints) > 0 and u > m else
+                        rng.randrange(u))
+        for v in targets:
+            links.append((u, v, rng.randint(1, 100)))
+            endpoints.append(u)
+            endpoints.append(v)
+
+    return _build(*_grid_layout(n, spacing), links)
+
+
+def grid(n, seed=0, spacing=100):
+    rng = random.Random(seed)
+    columns = max(1, math.ceil(math.sqrt(n)))
+    links = []
+    for u in range(n):
+        if u % columns + 1 < columns and u + 1 < n:
+            links.append((u, u + 1, rng.randint(1, 100)))
+        if u + columns < n:
+            links.append((u, u + columns, rng.randint(1, 100)))
+
+    return _build(*_grid_layout(n, spacing), links)
+
+
+def tree(n, seed=0, branching=2, spacing=100):
+    # Arbre complet : le parent du serveur u est (u - 1) // branching
+    rng = random.Random(seed)
+    links = [(u, (u - 1) // branching, rng.randint(1, 100)) for u in range(1, n)]
+    return _build(*_grid_layout(n, spacing), links)
+
+
+GENERATORS = {
+    "random-geometric": random_geometric,
+    "barabasi-albert": barabasi_albert,
+    "grid": grid,
+    "tree": tree
+}
+
+
+def generate(kind, n, seed=0, domains_count=100, sites_per_server=1.0, exponent=1.0):
+    if kind not in GENERATORS:
+        raise ValueError("Générateur inconnu \"{}\" (choix possibles : {})".format(kind, ", ".join(GENERATORS)))
+
+    if not isinstance(n, int) or n <= 0:
+        raise ValueError("Le nombre de serveurs doit être un entier strictement positif")
+
+    topology = GENERATORS[kind](n, seed)
+    zipf_sites(topology, domains_count, sites_per_server, exponent, seed)
+    topology.validate()
+    return topology
+
+
+# Répartit domains_count domaines sur les serveurs : le domaine de rang r est hébergé par un nombre de serveurs
+# proportionnel à 1 / r^exponent (au moins un), pour environ sites_per_server sites par serveur en moyenne
+def zipf_sites(topology, domains_count, sites_per_server=1.0, exponent=1.0, seed=0):
+    rng = random.Random(seed)
+    n = len(topology)
+    weights = [1 / rank ** exponent for rank in range(1, domains_count + 1)]
+    total = sum(weights)
+
+    sites = [[] for _ in range(n)]
+    domains = []
+    for domain_id, weight in enumerate(weights):
+        domains.append("site{}.com".format(domain_id + 1))
+        replicas = min(n, max(1, round(n * sites_per_server * weight / total)))
+        for i in rng.sample(range(n), replicas):
+            sites[i].append(domain_id)
+
+    topology.domains = domains
+    topology.sites_offsets = array("Q", [0])
+    topology.sites_domains = array("I")
+    for server_sites in sites:
+        topology.sites_domains.extend(server_sites)
+        topology.sites_offsets.append(len(topology.sites_domains))
+    return topology
+
+
+def _grid_layout(n, spacing):
+    columns = max(1, math.ceil(math.sqrt(n)))
+    centers_x = array("i", (spacing // 2 + (i % columns) * spacing for i in range(n)))
+    centers_y = array("i", (spacing // 2 + (i // columns) * spacing for i in range(n)))
+    return centers_x, centers_y
+
+
+def _build(centers_x, centers_y, links):
+    n = len(centers_x)
+    return Topology(array("I", range(_FIRST_IP_ADDRESS + 1, _FIRST_IP_ADDRESS + n + 1)), centers_x, centers_y,
+                    bytearray(b"\x01") * n, [], array("Q", [0] * (n + 1)), array("I"),
+                    array("I", (u for u, _, _ in links)), array("I", (v for _, v, _ in links)),
+                    array("i", (w for _, _, w in links)))
@@ -0,0 +1,274 @@
+import heapq
+import itertools
+import threading
+import time
+
+
+# Recherche ALT (A*, Landmarks, inégalité triangulaire) : les distances depuis quelques serveurs repères donnent,
+# pour tout couple de serveurs, une borne inférieure |d(L, u) - d(L, t)| <= d(u, t) qui guide une recherche
+# bidirectionnelle vers les serveurs hébergeurs.
+#
+# Les distances aux repères sont calculées sur tous les serveurs, actifs ou non : arrêter un serveur ne fait
+# qu'allonger les chemins, les bornes restent donc valables. Seul l'ajout d'un serveur ou d'une liaison les rend
+# caduques ; elles sont alors recalculées dans un thread, la recherche classique prenant le relais en attendant.
+class Landmarks:
+    exact_bound_limit = 32  # Au-delà, la distance aux serveurs hébergeurs est minorée repère par repère
+
+    def __init__(self, servers, count=8, rebuild_delay=0.2):
+        if not isinstance(count, int) or count <= 0:
+            raise ValueError("Le nombre de repères doit être un entier strictement positif")
+
+        self.__servers = servers  # Liste des serveurs du réseau (tenue à jour par Network)
+        self.count = count
+        self.rebuild_delay = rebuild_delay  # Délai sans modification du graphe avant de lancer le recalcul
+        self.landmarks = []
+        self.__distances = None  # Serveur -> tuple des distances à chaque repère (-1 s'il est inaccessible)
+        self.__enabled = False
+
+        self.__lock = threading.Lock()
+        self.__generation = 0  # Incrémentée à chaque modification de la structure du graphe
+        self.__built_generation = -1
+        self.__last_change = 0.0
+        self.__thread = None
+
+    @property
+    def enabled(self):
+        return self.__enabled
+
+    @enabled.setter
+    def enabled(self, enabled):
+        if not isinstance(enabled, bool):
+            raise TypeError("enabled doit être de type \"bool\"")
+
+        self.__enabled = enabled
+        if enabled is True and not self.is_ready():
+            self.rebuild_in_background()
+
+    def is_ready(self):
+        return self.__built_generation == self.__generation
+
+    # Appelée par Network à chaque ajout de serveur ou de liaison
+    def invalidate(self):
+        with self.__lock:
+            self.__generation += 1
+            self.__last_change = time.monotonic()
+        if self.__enabled is True:
+            self.rebuild_in_background()
+
+    def build(self):
+        with self.__lock:
+            generation = self.__generation
+        landmarks, distances = self.__compute(list(self.__servers))
+        with self.__lock:
+            self.__publish(generation, landmarks, distances)
+
+    def rebuild_in_background(self):
+        with self.__lock:
+            # Un recalcul déjà en cours remarquera le changement de génération et recommencera
+            if self.__thread is not None:
+                return
+            self.__thread = threading.Thread(target=self.__rebuild_loop, daemon=True)
+            self.__thread.start()
+
+    def wait(self, timeout=None):
+        thread = self.__thread
+        if thread is not None:
+            thread.join(timeout)
+
+    def __rebuild_loop(self):
+        while True:
+            # On attend que le graphe ne change plus (import d'une topologie, liaisons ajoutées en série)
+            delay = self.__last_change + self.rebuild_delay - time.monotonic()
+            if delay > 0:
+                time.sleep(delay)
+                continue
+
+            generation = self.__generation
+            landmarks, distances = self.__compute(list(self.__servers))
+            with self.__lock:
+                if self.__publish(generation, landmarks, distances):
+                    self.__thread = None
+                    return
+
+    def __publish(self, generation, landmarks, distances):
+        if generation != self.__generation:
+            return False  # Le graphe a changé pendant le calcul : les distances sont déjà périmées
+
+        self.landmarks = landmarks
+        self.__distances = distances
+        self.__built_generation = generation
+        return True
+
+    # Repères choisis par le point le plus éloigné dans la plus grande composante connexe : chacun maximise sa
+    # distance aux repères déjà choisis. Les serveurs des autres composantes n'ont pas de borne (Dijkstra simple).
+    def __compute(self, servers):
+        if len(servers) == 0:
+            return [], {}
+
+        largest_component = max(Landmarks.__components(servers), key=len)
+        landmarks = []
+        distances_by_landmark = []
+        closest = dict.fromkeys(largest_component, float("inf"))  # Distance au repère le plus proche
+        candidate = max(Landmarks.__all_distances(largest_component[0]).items(), key=lambda item: item[1])[0]
+        while len(landmarks) < min(self.count, len(largest_component)):
+            landmarks.append(candidate)
+            distances = Landmarks.__all_distances(candidate)
+            distances_by_landmark.append(distances)
+            for server, distance in distances.items():
+                if distance < closest[server]:
+                    closest[server] = distance
+            candidate = max(closest, key=closest.get)
+            if closest[candidate] == 0:
+                break  # Tous les serveurs sont déjà des repères
+
+        return landmarks, {server: tuple(distances.get(server, -1) for distances in distances_by_landmark)
+                           for server in servers}
+
+    @staticmethod
+    def __components(servers):
+        components = []
+        seen = set()
+        for server in servers:
+            if server in seen:
+                continue
+
+            seen.add(server)
+            component = [server]
+            stack = [server]
+            while stack:
+                for v, _ in stack.pop().get_neighbours():
+                    if v not in seen:
+                        seen.add(v)
+                        component.append(v)
+                        stack.append(v)
+            components.append(component)
+
+        return components
+
+    @staticmethod
+    def __all_distances(source):
+        distances = {source: 0}
+        counter = itertools.count()
+        heap = [(0, next(counter), source)]
+        while heap:
+            distance, _, u = heapq.heappop(heap)
+            if distance > distances[u]:
+                continue
+
+            for v, w in u.get_neighbours():
+                if distance + w < distances.get(v, float("inf")):
+                    distances[v] = distance + w
+                    heapq.heappush(heap, (distance + w, next(counter), v))
+
+        return distances
+
+    # Recherche bidirectionnelle guidée par le potentiel moyen p = (pi_t - pi_s) / 2, où pi_t minore la distance
+    # aux serveurs hébergeurs et pi_s la distance au point de départ. Avec ce potentiel, la longueur d'un chemin
+    # passant par v est la somme des clés de v dans les deux tas, d'où le critère d'arrêt. Renvoie le chemin
+    # (du serveur hébergeur jusqu'au point de départ) et sa longueur, comme Network.shortest_path.
+    def shortest_path(self, starting_point, hosting_servers, metrics=None):
+        distances = self.__distances
+        hosting_servers = set(hosting_servers)
+        if starting_point in hosting_servers:
+            return [starting_point], 0
+
+        if starting_point.is_active() is False or len(hosting_servers) == 0:
+            return None, None
+
+        potential = self.__potential_function(distances, starting_point, hosting_servers)
+        potentials = {}
+        counter = itertools.count()
+        forward_distances = {starting_point: 0}
+        predecessors = {starting_point: None}
+        backward_distances = {t: 0 for t in hosting_servers}
+        successors = {t: None for t in hosting_servers}
+        forward_heap = [(potential(starting_point, potentials), next(counter), starting_point)]
+        backward_heap = [(-potential(t, potentials), next(counter), t) for t in hosting_servers]
+        heapq.heapify(backward_heap)
+        forward_settled, backward_settled = set(), set()
+        best, meeting_server = float("inf"), None
+
+        while forward_heap and backward_heap and forward_heap[0][0] + backward_heap[0][0] < best:
+            forward = forward_heap[0][0] <= backward_heap[0][0]
+            heap, settled = (forward_heap, forward_settled) if forward else (backward_heap, backward_settled)
+            labels, other_labels = ((forward_distances, backward_distances) if forward else
+                                    (backward_distances, forward_distances))
+            links = predecessors if forward else successors
+            sign = 1 if forward else -1
+
+            _, _, u = heapq.heappop(heap)
+            if u in settled:
+                continue
+            settled.add(u)
+
+            for v, w in u.get_neighbours():
+                # Seuls les serveurs actifs transmettent (les serveurs hébergeurs sont tous actifs)
+                if v.is_active() is False:
+                    continue
+
+                distance = labels[u] + w
+                if distance < labels.get(v, float("inf")):
+                    labels[v] = distance
+                    links[v] = u
+                    heapq.heappush(heap, (distance + sign * potential(v, potentials), next(counter), v))
+                    if v in other_labels and distance + other_labels[v] < best:
+                        best, meeting_server = distance + other_labels[v], v
+
+        if metrics is not None and metrics.enabled:
+            metrics.observe("nodes_settled", len(forward_settled) + len(backward_settled))
+
+        if meeting_server is None:
+            return None, None
+
+        # Du serveur hébergeur jusqu'au point de rencontre, puis jusqu'au point de départ
+        shortest_path = []
+        server = successors[meeting_server]
+        while server is not None:
+            shortest_path.append(server)
+            server = successors[server]
+        shortest_path.reverse()
+        server = meeting_server
+        while server is not None:
+            shortest_path.append(server)
+            server = predecessors[server]
+
+        return shortest_path, best
+
+    @staticmethod
+    def __potential_function(distances, starting_point, hosting_servers):
+        source_distances = distances[starting_point]
+        landmarks_range = range(len(source_distances))
+
+        if len(hosting_servers) <= Landmarks.exact_bound_limit:
+            targets_distances = [distances[t] for t in hosting_servers]
+
+            def lower_bound_to_targets(u_distances):
+                return min(max((abs(a - b) for a, b in zip(u_distances, t_distances) if a >= 0 and b >= 0),
+                               default=0) for t_distances in targets_distances)
+        else:
+            # Beaucoup de serveurs hébergeurs : pour chaque repère, la distance à n'importe lequel d'entre eux est
+            # minorée par l'écart entre d(L, u) et l'intervalle [min d(L, t), max d(L, t)]
+            intervals = []
+            for i in landmarks_range:
+                values = [distances[t][i] for t in hosting_servers if distances[t][i] >= 0]
+                if len(values) > 0:
+                    intervals.append((i, min(values), max(values)))
+
+            def lower_bound_to_targets(u_distances):
+                bound = 0
+                for i, low, high in intervals:
+                    d = u_distances[i]
+                    if d >= 0:
+                        bound = max(bound, low - d, d - high)
+                return bound
+
+        def potential(u, cache):
+            value = cache.get(u)
+            if value is None:
+                u_distances = distances[u]
+                to_source = max((abs(a - b) for a, b in zip(u_distances, source_distances) if a >= 0 and b >= 0),
+                                default=0)
+                value = cache[u] = (lower_bound_to_targets(u_distances) - to_source) / 2
+            return value
+
+        return potential
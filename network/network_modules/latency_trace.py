@@ -0,0 +1,278 @@
+import bisect
+import heapq
+import ipaddress
+import itertools
+import mmap
+import struct
+import sys
+
+# Format binaire (petit-boutiste), lu par projection en mémoire sans jamais être chargé en entier :
+#   en-tête : MAGIC, puis nombre de liaisons et nombre d'échantillons (2 x uint64)
+#   liaisons : clés (uint64, adresse IP la plus petite << 32 | la plus grande), triées, puis offsets (uint64, un de
+#   plus que de liaisons) : les échantillons de la liaison i sont aux positions offsets[i]:offsets[i + 1]
+#   échantillons : instants (int64, croissants pour chaque liaison), puis latences (int32)
+# Toutes les sections commencent sur un multiple de 8 octets.
+MAGIC = b"NETTR\x00\x00\x01"
+_HEADER = struct.Struct("<QQ")
+
+
+def _check_byteorder():
+    if sys.byteorder != "little":
+        raise RuntimeError("Les traces de latences ne sont projetées en mémoire que sur une machine petit-boutiste")
+
+
+def _link_key(packed_ip_address1, packed_ip_address2):
+    if packed_ip_address1 > packed_ip_address2:
+        packed_ip_address1, packed_ip_address2 = packed_ip_address2, packed_ip_address1
+    return packed_ip_address1 << 32 | packed_ip_address2
+
+
+# Échantillons (ligne, instant, clé de la liaison, latence) d'un fichier CSV "instant,ip1,ip2,latence", lu ligne à
+# ligne. Une première ligne qui ne commence pas par un chiffre est un en-tête ; les lignes vides et celles qui
+# commencent par "#" sont ignorées.
+def _read_samples(source_path):
+    packed_ip_addresses = {}  # Les mêmes adresses reviennent à chaque ligne : elles ne sont analysées qu'une fois
+
+    def pack(ip_address):
+        packed_ip_address = packed_ip_addresses.get(ip_address)
+        if packed_ip_address is None:
+            packed_ip_address = packed_ip_addresses[ip_address] = int(ipaddress.IPv4Address(ip_address.strip()))
+        return packed_ip_address
+
+    with open(source_path, encoding="utf-8") as file:
+        for line_number, line in enumerate(file, 1):
+            line = line.strip()
+            if not line or line.startswith("#") or (line_number == 1 and not line[0].isdigit() and line[0] != "-"):
+                continue
+
+            fields = line.split(",")
+            if len(fields) != 4:
+                raise ValueError("Ligne {} : 4 champs attendus (instant, ip1, ip2, latence)".format(line_number))
+            try:
+                time, latency = int(fields[0]), int(fields[3])
+                packed_ip_address1 = pack(fields[1])
+                packed_ip_address2 = pack(fields[2])
+            except ValueError as e:
+                raise ValueError("Ligne {} : {}".format(line_number, e))
+
+            if latency <= 0:
+                raise ValueError("Ligne {} : la latence doit être strictement positive".format(line_number))
+            if packed_ip_address1 == packed_ip_address2:
+                raise ValueError("Ligne {} : une liaison relie deux serveurs différents".format(line_number))
+
+            yield line_number, time, _link_key(packed_ip_address1, packed_ip_address2), latency
+
+
+# Convertit un fichier CSV de mesures en trace binaire, en deux lectures du fichier : la première compte et vérifie
+# les échantillons de chaque liaison, la seconde les écrit directement à leur place dans la trace projetée en
+# mémoire. Seul un compteur par liaison est gardé en mémoire, quelle que soit la taille du fichier. Les mesures
+# d'une même liaison doivent être dans l'ordre chronologique (celles des différentes liaisons peuvent être
+# mêlées), et respecter la propriété FIFO : partir plus tard ne fait jamais arriver plus tôt. Entre deux mesures,
+# la latence est interpolée linéairement : elle ne peut donc pas baisser plus vite que le temps ne passe.
+def convert_trace(source_path, path):
+    _check_byteorder()
+
+    last_samples = {}  # Clé de la liaison -> (instant, latence, nombre d'échantillons)
+    for line_number, time, key, latency in _read_samples(source_path):
+        last_sample = last_samples.get(key)
+        if last_sample is None:
+            last_samples[key] = (time, latency, 1)
+            continue
+
+        last_time, last_latency, count = last_sample
+        if time <= last_time:
+            raise ValueError("Ligne {} : les mesures d'une liaison doivent être dans l'ordre chronologique".format(
+                line_number))
+        if time + latency < last_time + last_latency:
+            raise ValueError("Ligne {} : la latence baisse plus vite que le temps ne passe (liaison non FIFO)".format(
+                line_number))
+        last_samples[key] = (time, latency, count + 1)
+
+    keys = sorted(last_samples)
+    links_count = len(keys)
+    samples_count = sum(count for _, _, count in last_samples.values())
+    cursors = {}  # Clé de la liaison -> position du prochain échantillon
+    position = 0
+    for key in keys:
+        cursors[key] = position
+        position += last_samples[key][2]
+    del last_samples
+
+    size = len(MAGIC) + _HEADER.size + 8 * links_count + 8 * (links_count + 1) + 12 * samples_count
+    with open(path, "w+b") as file:
+        file.write(MAGIC)
+        file.write(_HEADER.pack(links_count, samples_count))
+        file.truncate(size)
+        file.flush()
+        with mmap.mmap(file.fileno(), size) as projection:
+            view = memoryview(projection)
+            keys_view, offsets, times, latencies = _sections(view, links_count, samples_count)
+            for i, key in enumerate(keys):
+                keys_view[i] = key
+                offsets[i] = cursors[key]
+            offsets[links_count] = samples_count
+
+            for _, time, key, latency in _read_samples(source_path):
+                position = cursors[key]
+                times[position] = time
+                latencies[position] = latency
+                cursors[key] = position + 1
+
+            for section in (keys_view, offsets, times, latencies, view):
+                section.release()
+            projection.flush()
+
+
+def _sections(view, links_count, samples_count):
+    start = len(MAGIC) + _HEADER.size
+    sections = []
+    for typecode, count in [("Q", links_count), ("Q", links_count + 1), ("q", samples_count),
+                            ("i", samples_count)]:
+        end = start + struct.calcsize(typecode) * count
+        sections.append(view[start:end].cast(typecode))
+        start = end
+    return sections
+
+
+# Latences variables des liaisons, lues dans une trace projetée en mémoire : seules les pages consultées sont
+# chargées, par le système, et partagées entre les processus qui lisent la même trace. Une liaison absente de la
+# trace garde le temps de réponse fixe du réseau.
+class LatencyTrace:
+    def __init__(self, path):
+        _check_byteorder()
+
+        self.path = path
+        self.__file = open(path, "rb")
+        try:
+            self.__projection = mmap.mmap(self.__file.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            self.__file.close()
+            raise ValueError("Le fichier de trace est vide")
+
+        self.__view = memoryview(self.__projection)
+        self.__sections = []
+        try:
+            if self.__view[:len(MAGIC)] != MAGIC:
+                raise ValueError("Le fichier n'est pas une trace de latences")
+            if len(self.__view) < len(MAGIC) + _HEADER.size:
+                raise ValueError("Le fichier de trace est tronqué")
+
+            links_count, samples_count = _HEADER.unpack_from(self.__view, len(MAGIC))
+            if len(self.__view) != len(MAGIC) + _HEADER.size + 16 * links_count + 8 + 12 * samples_count:
+                raise ValueError("Le fichier de trace est tronqué")
+
+            self.__sections = _sections(self.__view, links_count, samples_count)
+            self.__keys, self.__offsets, self.__times, self.__latencies = self.__sections
+            if self.__offsets[links_count] != samples_count:
+                raise ValueError("Le fichier de trace est incohérent")
+        except ValueError:
+            self.close()
+            raise
+
+        self.__packed_ip_addresses = {}  # Adresse IP -> adresse IP empaquetée
+
+    def close(self):
+        # Les vues doivent être libérées avant de fermer la projection
+        for section in self.__sections:
+            section.release()
+        self.__sections = []
+        self.__view.release()
+        self.__projection.close()
+        self.__file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exception):
+        self.close()
+
+    def __len__(self):
+        return len(self.__keys)
+
+    @property
+    def samples_count(self):
+        return len(self.__times)
+
+    # Indice de la liaison entre deux serveurs dans la trace, -1 si elle n'y figure pas
+    def link_index(self, server1, server2):
+        key = _link_key(self.__packed_ip_address(server1), self.__packed_ip_address(server2))
+        index = bisect.bisect_left(self.__keys, key)
+        return index if index < len(self.__keys) and self.__keys[index] == key else -1
+
+    def __packed_ip_address(self, server):
+        # Indexé par l'adresse et non par le serveur : aucun serveur n'est retenu et un changement d'adresse est
+        # pris en compte
+        ip_address = server.ip_address
+        packed_ip_address = self.__packed_ip_addresses.get(ip_address)
+        if packed_ip_address is None:
+            packed_ip_address = self.__packed_ip_addresses[ip_address] = int(ipaddress.IPv4Address(ip_address))
+        return packed_ip_address
+
+    # Latence de la liaison à l'instant time : interpolée entre les deux mesures qui l'encadrent, celle de la
+    # première (ou de la dernière) mesure avant (ou après) la trace. L'arrondi par défaut préserve la propriété
+    # FIFO.
+    def latency_at(self, index, time):
+        start, end = self.__offsets[index], self.__offsets[index + 1]
+        times, latencies = self.__times, self.__latencies
+        position = bisect.bisect_right(times, time, start, end)
+        if position == start:
+            return latencies[start]
+        if position == end:
+            return latencies[end - 1]
+
+        time1, time2 = times[position - 1], times[position]
+        latency1, latency2 = latencies[position - 1], latencies[position]
+        return (latency1 * (time2 - time) + latency2 * (time - time1)) // (time2 - time1)
+
+    # Latence de la liaison entre deux serveurs voisins à l'instant time (response_time si elle n'est pas tracée)
+    def latency(self, server1, server2, response_time, time):
+        index = self.link_index(server1, server2)
+        return response_time if index < 0 else self.latency_at(index, time)
+
+    # Dijkstra dépendant du temps : le serveur est fixé à son heure d'arrivée au plus tôt, et chaque liaison est
+    # parcourue avec sa latence à l'instant où on l'emprunte. Comme les liaisons sont FIFO, attendre n'est jamais
+    # utile et l'algorithme reste exact. Renvoie le chemin du serveur hébergeur jusqu'au point de départ et le temps
+    # de trajet, ou (None, None).
+    def shortest_path(self, starting_point, hosting_servers, departure_time, cancelled=None):
+        destination_server = None
+        arrivals = {starting_point: departure_time}
+        predecessors = {starting_point: None}
+        settled = set()
+        counter = itertools.count()
+        heap = [(departure_time, next(counter), starting_point)]
+
+        while heap:
+            arrival, _, u = heapq.heappop(heap)
+            if u in settled:
+                continue
+            settled.add(u)
+
+            if u in hosting_servers:
+                destination_server = u
+                break
+
+            if cancelled is not None and len(settled) % 1024 == 0 and cancelled.is_set():
+                break
+
+            if u.is_active() is False:
+                continue
+
+            for v, w in u.get_neighbours():
+                if v in settled:
+                    continue
+
+                v_arrival = arrival + self.latency(u, v, w, arrival)
+                if v_arrival < arrivals.get(v, float("inf")):
+                    arrivals[v] = v_arrival
+                    predecessors[v] = u
+                    heapq.heappush(heap, (v_arrival, next(counter), v))
+
+        if destination_server is None:
+            return None, None
+
+        shortest_path = []
+        server = destination_server
+        while server is not None:
+            shortest_path.append(server)
+            server = predecessors[server]
+        return shortest_path, arrivals[destination_server] - departure_time
@@ -0,0 +1,293 @@
+import math
+import queue
+import threading
+from array import array
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+
+# Disposition automatique par forces (Fruchterman–Reingold) : les serveurs se repoussent deux à deux et chaque
+# liaison les rapproche comme un ressort de longueur idéale k. Calculée paire par paire, la répulsion coûte O(n²) ;
+# elle est approchée à la manière de Barnes–Hut sur un quadtree construit niveau par niveau avec numpy.bincount
+# (nombre de serveurs et barycentre de chaque cellule). À chaque niveau, une cellule subit en bloc les cellules qui
+# ne touchent pas la sienne mais touchaient sa cellule parente ; au dernier niveau, chaque serveur subit en plus
+# les 9 cellules qui l'entourent. Chaque cellule compte ainsi une seule fois, au niveau le plus grossier où elle est
+# assez loin. Les calculs portent sur des tableaux de coordonnées, sans boucle Python sur les serveurs.
+class ForceLayout:
+    iterations = 100
+    __min_distance = 0.01  # En fraction de k : deux serveurs confondus ne se repoussent pas à l'infini
+    __max_level = 10  # Au plus 1024 x 1024 cellules au dernier niveau
+    __length_ratio = 4.0  # Les longueurs pondérées restent entre k / 4 et 4 k
+
+    # Les serveurs restent dans le rectangle [margin, width - margin] x [margin, height - margin]. Avec
+    # links_weights (les temps de réponse, par exemple), la longueur idéale d'une liaison est proportionnelle à son
+    # poids, k étant la longueur d'une liaison de poids moyen.
+    def __init__(self, centers_x, centers_y, links_sources, links_targets, width, height, margin=0,
+                 links_weights=None, seed=None):
+        if numpy is None:
+            raise RuntimeError("La disposition automatique nécessite le module numpy")
+        if width - 2 * margin <= 0 or height - 2 * margin <= 0:
+            raise ValueError("La zone de disposition est trop petite")
+
+        self.__positions = numpy.column_stack((numpy.asarray(centers_x, dtype=float),
+                                               numpy.asarray(centers_y, dtype=float)))
+        self.__sources = numpy.asarray(links_sources, dtype=numpy.int64)
+        self.__targets = numpy.asarray(links_targets, dtype=numpy.int64)
+        n = len(self.__positions)
+        if len(self.__sources) != len(self.__targets):
+            raise ValueError("Les tableaux des liaisons doivent avoir la même longueur")
+        if len(self.__sources) > 0 and (max(self.__sources.max(), self.__targets.max()) >= n or
+                                        min(self.__sources.min(), self.__targets.min()) < 0):
+            raise ValueError("Une liaison fait référence à un serveur inconnu")
+
+        self.__low = numpy.array([margin, margin], dtype=float)
+        self.__high = numpy.array([width - margin, height - margin], dtype=float)
+        self.ideal_length = math.sqrt((width - 2 * margin) * (height - 2 * margin) / max(n, 1))
+        self.__levels = min(ForceLayout.__max_level, max(2, math.ceil(math.log(max(n, 1), 4))))
+
+        self.__lengths = numpy.full(len(self.__sources), self.ideal_length)
+        if links_weights is not None:
+            weights = numpy.asarray(links_weights, dtype=float)
+            if len(weights) != len(self.__sources):
+                raise ValueError("Il faut un poids par liaison")
+            if len(weights) > 0 and weights.min() <= 0:
+                raise ValueError("Les poids des liaisons doivent être strictement positifs")
+            if len(weights) > 0:
+                self.__lengths = self.ideal_length * numpy.clip(weights / weights.mean(),
+                                                                1 / ForceLayout.__length_ratio,
+                                                                ForceLayout.__length_ratio)
+
+        # Des serveurs tous au même endroit (une topologie sans coordonnées) sont d'abord dispersés au hasard ;
+        # sinon, un léger bruit sépare les serveurs confondus
+        rng = numpy.random.default_rng(seed)
+        if n > 1 and numpy.ptp(self.__positions, axis=0).max() == 0:
+            self.__positions = rng.uniform(self.__low, self.__high, size=(n, 2))
+        else:
+            self.__positions += rng.uniform(-0.5, 0.5, size=(n, 2))
+
+    @classmethod
+    def from_topology(cls, topology, width, height, margin=0, weighted=False, seed=None):
+        return cls(topology.centers_x, topology.centers_y, topology.links_sources, topology.links_targets, width,
+                   height, margin, topology.links_response_times if weighted else None, seed)
+
+    def __len__(self):
+        return len(self.__positions)
+
+    # Coordonnées entières des serveurs, au format des topologies. Les itérations se font sans bornes : la
+    # répulsion cumulée de tous les serveurs pousse vers l'extérieur, et des bords fixes y entasseraient la plupart
+    # d'entre eux. La disposition obtenue est ramenée dans le rectangle, proportions conservées.
+    def get_centers(self):
+        positions = self.__positions
+        if len(positions) == 0:
+            return array("i"), array("i")
+
+        low = positions.min(axis=0)
+        extent = numpy.maximum(positions.max(axis=0) - low, 1e-9)
+        available = self.__high - self.__low
+        if len(positions) == 1:
+            centers = numpy.rint(self.__low + available / 2)[numpy.newaxis, :].astype(numpy.int32)
+        else:
+            centers = numpy.rint((positions - low) * (available / extent) + self.__low).astype(numpy.int32)
+        return array("i", centers[:, 0].tolist()), array("i", centers[:, 1].tolist())
+
+    def __repulsion(self, positions):
+        min_distance2 = (ForceLayout.__min_distance * self.ideal_length) ** 2
+        # Le quadtree couvre le carré qui contient tous les serveurs
+        origin = positions.min(axis=0)
+        side = max(float(numpy.ptp(positions, axis=0).max()), self.ideal_length) * (1 + 1e-9)
+        positions = positions - origin
+        previous = None
+
+        for level in range(2, self.__levels + 1):
+            cells_count = 1 << level
+            # Les cellules sont entourées de deux rangées vides pour que les voisines existent toujours
+            stride = cells_count + 4
+            size = stride * stride
+            cells = numpy.clip((positions * (cells_count / side)).astype(numpy.int64), 0, cells_count - 1)
+            indexes = (cells[:, 0] + 2) * stride + cells[:, 1] + 2
+            masses = numpy.bincount(indexes, minlength=size).astype(float)
+            centroids_x = numpy.bincount(indexes, weights=positions[:, 0], minlength=size)
+            centroids_y = numpy.bincount(indexes, weights=positions[:, 1], minlength=size)
+            numpy.divide(centroids_x, masses, out=centroids_x, where=masses > 0)
+            numpy.divide(centroids_y, masses, out=centroids_y, where=masses > 0)
+
+            occupied = numpy.flatnonzero(masses)
+            slots = numpy.full(size, -1, dtype=numpy.int64)  # Cellule -> rang parmi les cellules occupées
+            slots[occupied] = numpy.arange(len(occupied))
+            columns, rows = numpy.divmod(occupied, stride)
+            columns -= 2
+            rows -= 2
+            x = centroids_x[occupied]
+            y = centroids_y[occupied]
+
+            # La force subie dans une cellule est développée au premier ordre autour de son barycentre :
+            # F(p) = F + J (p - barycentre). Le développement de la cellule parente est déplacé vers ses filles.
+            if previous is None:
+                forces_x, forces_y = numpy.zeros(len(occupied)), numpy.zeros(len(occupied))
+                jacobian_xx, jacobian_xy, jacobian_yy = (numpy.zeros(len(occupied)) for _ in range(3))
+            else:
+                parent_slots, parent_x, parent_y, parent_forces_x, parent_forces_y, parent_jacobian_xx, \
+                    parent_jacobian_xy, parent_jacobian_yy = previous
+                parents = parent_slots[(columns // 2 + 2) * (cells_count // 2 + 4) + rows // 2 + 2]
+                shift_x = x - parent_x[parents]
+                shift_y = y - parent_y[parents]
+                jacobian_xx = parent_jacobian_xx[parents]
+                jacobian_xy = parent_jacobian_xy[parents]
+                jacobian_yy = parent_jacobian_yy[parents]
+                forces_x = parent_forces_x[parents] + jacobian_xx * shift_x + jacobian_xy * shift_y
+                forces_y = parent_forces_y[parents] + jacobian_xy * shift_x + jacobian_yy * shift_y
+
+            # Cellules filles des voisines de la cellule parente qui ne touchent pas la cellule : la liste ne
+            # dépend que de la parité de la cellule, les cellules sont donc traitées par parité
+            bases = (columns - columns % 2 + 2) * stride + rows - rows % 2 + 2
+            parities = (columns % 2) * 2 + rows % 2
+            for parity in range(4):
+                selection = numpy.flatnonzero(parities == parity)
+                if len(selection) == 0:
+                    continue
+
+                column_parity, row_parity = divmod(parity, 2)
+                offsets = numpy.array([a * stride + b for a in range(-2, 4) for b in range(-2, 4)
+                                       if abs(a - column_parity) > 1 or abs(b - row_parity) > 1])
+                sources = bases[selection, numpy.newaxis] + offsets
+                forces = _interactions(x[selection], y[selection], masses, centroids_x, centroids_y, sources,
+                                       min_distance2, True)
+                forces_x[selection] += forces[0]
+                forces_y[selection] += forces[1]
+                jacobian_xx[selection] += forces[2]
+                jacobian_xy[selection] += forces[3]
+                jacobian_yy[selection] += forces[4]
+
+            previous = (slots, x, y, forces_x, forces_y, jacobian_xx, jacobian_xy, jacobian_yy)
+
+        # Cellules éloignées : développement de la cellule du serveur
+        own = slots[indexes]
+        dx = positions[:, 0] - x[own]
+        dy = positions[:, 1] - y[own]
+        forces = numpy.column_stack((forces_x[own] + jacobian_xx[own] * dx + jacobian_xy[own] * dy,
+                                     forces_y[own] + jacobian_xy[own] * dx + jacobian_yy[own] * dy))
+
+        # Cellules proches : les 8 cellules autour du serveur, puis la sienne sans lui-même
+        offsets = numpy.array([a * stride + b for a in range(-1, 2) for b in range(-1, 2) if a != 0 or b != 0])
+        near_x, near_y = _interactions(positions[:, 0], positions[:, 1], masses, centroids_x, centroids_y,
+                                       indexes[:, numpy.newaxis] + offsets, min_distance2)
+        forces[:, 0] += near_x
+        forces[:, 1] += near_y
+
+        mass = masses[indexes] - 1
+        with numpy.errstate(invalid="ignore", divide="ignore"):
+            dx = numpy.where(mass > 0, (positions[:, 0] - centroids_x[indexes]) * (mass + 1) / mass, 0)
+            dy = numpy.where(mass > 0, (positions[:, 1] - centroids_y[indexes]) * (mass + 1) / mass, 0)
+        scale = mass / (dx * dx + dy * dy + min_distance2)
+        forces[:, 0] += scale * dx
+        forces[:, 1] += scale * dy
+
+        return forces * self.ideal_length ** 2
+
+    def __attraction(self, positions):
+        n = len(positions)
+        delta = positions[self.__targets] - positions[self.__sources]
+        # Force d² / k le long de la liaison, appliquée dans un sens à la source et dans l'autre à la cible
+        scale = numpy.sqrt((delta * delta).sum(axis=1)) / self.__lengths
+        forces_x = scale * delta[:, 0]
+        forces_y = scale * delta[:, 1]
+        return numpy.column_stack((
+            numpy.bincount(self.__sources, weights=forces_x, minlength=n) -
+            numpy.bincount(self.__targets, weights=forces_x, minlength=n),
+            numpy.bincount(self.__sources, weights=forces_y, minlength=n) -
+            numpy.bincount(self.__targets, weights=forces_y, minlength=n)))
+
+    # Une itération : chaque serveur se déplace dans le sens de la force qu'il subit, d'au plus temperature
+    def step(self, temperature):
+        positions = self.__positions
+        if len(positions) == 0:
+            return
+
+        # La gravité ramène vers le barycentre ; avec un coefficient π, elle compense exactement la poussée d'un
+        # disque uniforme d'un serveur par k², et retient les composantes non connexes
+        forces = self.__repulsion(positions) + self.__attraction(positions) - \
+            math.pi * (positions - positions.mean(axis=0))
+        norms = numpy.sqrt((forces * forces).sum(axis=1))
+        with numpy.errstate(invalid="ignore", divide="ignore"):
+            scale = numpy.where(norms > 0, numpy.minimum(norms, temperature) / norms, 0)
+        positions += forces * scale[:, numpy.newaxis]
+
+    # La température décroît linéairement : les grands mouvements du début laissent place aux ajustements.
+    # callback(layout, iteration) est appelé toutes les batch itérations ; cancelled est un threading.Event.
+    def run(self, iterations=None, batch=None, callback=None, cancelled=None):
+        iterations = ForceLayout.iterations if iterations is None else iterations
+        initial_temperature = max(self.__high - self.__low) / 10
+        for iteration in range(iterations):
+            if cancelled is not None and cancelled.is_set():
+                return False
+
+            self.step(initial_temperature * (1 - iteration / iterations))
+            if callback is not None and batch is not None and (iteration + 1) % batch == 0 and \
+                    iteration + 1 < iterations:
+                callback(self, iteration + 1)
+
+        if callback is not None:
+            callback(self, iterations)
+        return True
+
+
+# Répulsion exercée sur les points (x, y) par les cellules sources (une ligne par point, une colonne par cellule),
+# chacune réduite à sa masse en son barycentre. Avec jacobian, renvoie aussi les dérivées de la force par rapport à
+# la position du point (xx, xy, yy), pour la développer au premier ordre.
+def _interactions(x, y, masses, centroids_x, centroids_y, sources, min_distance2, jacobian=False):
+    dx = x[:, numpy.newaxis] - centroids_x[sources]
+    dy = y[:, numpy.newaxis] - centroids_y[sources]
+    dx2 = dx * dx
+    dy2 = dy * dy
+    distances2 = dx2 + dy2
+    distances2 += min_distance2
+    scale = masses[sources] / distances2
+    forces_x = numpy.einsum("ij,ij->i", scale, dx)
+    forces_y = numpy.einsum("ij,ij->i", scale, dy)
+    if not jacobian:
+        return forces_x, forces_y
+
+    # Dérivées de m r / |r|² : m (I |r|² - 2 r rᵀ) / |r|⁴
+    total = scale.sum(axis=1)
+    scale /= distances2
+    dx *= dy
+    return (forces_x, forces_y, total - 2 * numpy.einsum("ij,ij->i", scale, dx2),
+            -2 * numpy.einsum("ij,ij->i", scale, dx), total - 2 * numpy.einsum("ij,ij->i", scale, dy2))
+
+
+# Fait tourner la disposition dans un thread, pour que la boucle de tkinter ne se fige pas. Toutes les batch
+# itérations, les coordonnées sont publiées ; poll(), appelée depuis after(), renvoie les plus récentes.
+class LayoutWorker:
+    def __init__(self, layout, iterations=None, batch=10):
+        self.__layout = layout
+        self.__iterations = iterations
+        self.__batch = batch
+        self.__centers = queue.Queue()
+        self.__cancelled = threading.Event()
+        self.__thread = threading.Thread(target=self.__run, daemon=True)
+
+    def start(self):
+        self.__thread.start()
+
+    def cancel(self):
+        self.__cancelled.set()
+
+    def is_running(self):
+        return self.__thread.is_alive() and not self.__cancelled.is_set()
+
+    # (centers_x, centers_y) les plus récents, ou None si rien de nouveau n'a été publié
+    def poll(self):
+        centers = None
+        while True:
+            try:
+                centers = self.__centers.get_nowait()
+            except queue.Empty:
+                return None if self.__cancelled.is_set() else centers
+
+    def __run(self):
+        # La conversion en entiers est faite ici, hors de la boucle de tkinter
+        self.__layout.run(self.__iterations, self.__batch,
+                          lambda layout, iteration: self.__centers.put(layout.get_centers()), self.__cancelled)
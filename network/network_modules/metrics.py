@@ -0,0 +1,98 @@
+import bisect
+import json
+import time
+
+# Bornes des histogrammes : de 1 µs à environ 16 s pour les durées, de 1 à environ 16 millions pour les compteurs
+# par recherche (tas, relâchements, serveurs fixés), en doublant à chaque seau
+TIME_BUCKETS = tuple(1e-6 * 2 ** i for i in range(25))
+COUNT_BUCKETS = tuple(float(2 ** i) for i in range(25))
+
+
+class Histogram:
+    __slots__ = ("bounds", "counts", "sum", "count")
+
+    def __init__(self, bounds):
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)  # Le dernier seau reçoit les valeurs au-delà de la plus grande borne
+        self.sum = 0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.bounds, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def to_dict(self):
+        return {
+            "buckets": [[bound, count] for bound, count in zip(list(self.bounds) + ["+Inf"], self.counts)],
+            "sum": self.sum,
+            "count": self.count
+        }
+
+
+# Mesures des recherches : durée de chaque phase et travail effectué par Dijkstra. Lorsqu'elles sont désactivées,
+# start() et stop() reviennent immédiatement et Dijkstra ne compte rien. Les recherches qui lisent un arbre des
+# plus courts chemins ou les tables de routage ne parcourent pas le graphe : elles n'ont que leur durée et un
+# compteur (tree_searches, routing_table_searches), sans histogrammes de tas, relâchements ni serveurs fixés.
+class Metrics:
+    def __init__(self, enabled=False, prefix="network_search"):
+        self.enabled = enabled
+        self.prefix = prefix
+        self.histograms = {}
+        self.counters = {}
+
+    def start(self):
+        return time.perf_counter() if self.enabled else 0.0
+
+    def stop(self, name, start):
+        if self.enabled:
+            self.observe(name + "_seconds", time.perf_counter() - start)
+
+    def observe(self, name, value):
+        histogram = self.histograms.get(name)
+        if histogram is None:
+            histogram = self.histograms[name] = Histogram(TIME_BUCKETS if name.endswith("_seconds") else
+                                                          COUNT_BUCKETS)
+        histogram.observe(value)
+
+    def increment(self, name, value=1):
+        self.counters[name] = self.counters.get(name, 0) + value
+
+    def reset(self):
+        self.histograms.clear()
+        self.counters.clear()
+
+    def to_dict(self):
+        return {
+            "counters": dict(self.counters),
+            "histograms": {name: histogram.to_dict() for name, histogram in self.histograms.items()}
+        }
+
+    # Format d'exposition texte de Prometheus (seaux cumulés)
+    def to_prometheus(self):
+        lines = []
+        for name, value in sorted(self.counters.items()):
+            metric = "{}_{}_total".format(self.prefix, name)
+            lines.append("# TYPE {} counter".format(metric))
+            lines.append("{} {}".format(metric, value))
+
+        for name, histogram in sorted(self.histograms.items()):
+            metric = "{}_{}".format(self.prefix, name)
+            lines.append("# TYPE {} histogram".format(metric))
+            cumulative = 0
+            for bound, count in zip(list(histogram.bounds) + ["+Inf"], histogram.counts):
+                cumulative += count
+                lines.append("{}_bucket{{le=\"{}\"}} {}".format(metric, bound if bound == "+Inf" else repr(bound),
+                                                               cumulative))
+            lines.append("{}_sum {}".format(metric, histogram.sum))
+            lines.append("{}_count {}".format(metric, histogram.count))
+
+        return "\n".join(lines) + "\n"
+
+    # Le format est choisi d'après l'extension : JSON pour ".json", texte Prometheus sinon
+    def dump(self, path):
+        with open(path, "w", encoding="utf-8") as file:
+            if path.lower().endswith(".json"):
+                json.dump(self.to_dict(), file, indent=2)
+            else:
+                file.write(self.to_prometheus())
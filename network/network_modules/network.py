@@ -0,0 +1,422 @@
+import heapq
+import itertools
+import re
+import sys
+
+from network_modules.backup_paths import BackupPaths
+from network_modules.connectivity import ConnectivityIndex
+from network_modules.domain_index import DomainIndex, DomainTrie
+from network_modules.landmarks import Landmarks
+from network_modules.metrics import Metrics
+from network_modules.route_cache import RouteCache
+from network_modules.routing_table import RoutingTables
+from network_modules.shortest_path_tree import ShortestPathTrees
+
+
+# Modèle de données d'un serveur, sans aucune dépendance à tkinter : c'est Server qui se charge de l'affichage
+class Node:
+    __slots__ = ("__network", "__center_x", "__center_y", "__ip_address", "__sites", "__neighbours", "__is_active")
+    __ip_address_pattern = re.compile(
+        r"^(?:(?:25[0-5]|2[0-4][0-9]|[01]?[0-9][0-9]?)\.){3}(?:25[0-5]|2[0-4][0-9]|[01]?[0-9][0-9]?)$")
+
+    def __init__(self, network, ip_address, center_x=0, center_y=0):
+        self.__set_network(network)
+        self.center_x = center_x
+        self.center_y = center_y
+        self.ip_address = ip_address
+
+        self.__sites = set()
+        self.__neighbours = []  # Liste de Tuples contenant le serveur voisin et le temps de réponse(poids)
+        self.__is_active = True  # Actif ou pas
+
+    def __set_network(self, network):
+        if not isinstance(network, Network):
+            raise TypeError("network doit être une instance de \"Network\"")
+
+        self.__network = network
+
+    @property
+    def network(self):
+        return self.__network
+
+    @property
+    def center_x(self):
+        return self.__center_x
+
+    @center_x.setter
+    def center_x(self, center_x):
+        if not isinstance(center_x, int):
+            raise TypeError("center_x doit être de type \"int\"")
+
+        self.__center_x = center_x
+
+    @property
+    def center_y(self):
+        return self.__center_y
+
+    @center_y.setter
+    def center_y(self, center_y):
+        if not isinstance(center_y, int):
+            raise TypeError("center_y doit être de type \"int\"")
+
+        self.__center_y = center_y
+
+    # Déplacement sans contrôle des bornes, utilisé pendant le glisser-déposer
+    def move(self, dx, dy):
+        self.__center_x += dx
+        self.__center_y += dy
+
+    @property
+    def ip_address(self):
+        return self.__ip_address
+
+    @ip_address.setter
+    def ip_address(self, ip_address):
+        if not Node.__ip_address_pattern.match(ip_address):
+            raise ValueError("L'adresse IP fournie \"{}\" est invalide".format(ip_address))
+
+        self.__ip_address = ip_address.strip()
+
+    @property
+    def sites(self):
+        return self.__sites
+
+    @sites.setter
+    def sites(self, sites):
+        if not isinstance(sites, str):
+            raise TypeError("L'argument sites doit être une chaîne de caractères")
+
+        if not sites.strip():
+            raise ValueError("La chaîne de sites ne peut pas être vide")
+
+        # Un site est un nom exact ou une zone "*.domaine" ; tous sont vérifiés avant d'en ajouter un seul. Les
+        # chaînes sont partagées entre les serveurs qui hébergent les mêmes zones.
+        added_sites = [sys.intern(site.strip()) for site in sites.split(";") if site.strip()]
+        for site in added_sites:
+            DomainTrie.labels(site)
+        self.__sites.update(added_sites)
+
+        self.__network.sites_added(self, added_sites)
+
+    # Retire des sites, dans le même format que l'ajout ; les sites que le serveur n'héberge pas sont ignorés
+    def remove_sites(self, sites):
+        if not isinstance(sites, str):
+            raise TypeError("L'argument sites doit être une chaîne de caractères")
+
+        removed_sites = [site.strip() for site in sites.split(";") if site.strip() in self.__sites]
+        if len(removed_sites) == 0:
+            return
+
+        self.__sites.difference_update(removed_sites)
+        self.__network.sites_removed(self, removed_sites)
+
+    def add_neighbour(self, neighbour, response_time):
+        if not isinstance(neighbour, Node):
+            raise TypeError("Le voisin d'un serveur doit être également un serveur")
+        if isinstance(response_time, str):
+            if not response_time.isdigit():
+                raise TypeError("Le temps de réponse doit être un nombre entier")
+            response_time = int(response_time)
+        elif not isinstance(response_time, int):
+            raise TypeError("Le temps de réponse doit être un nombre entier")
+
+        if any(n is neighbour for n, _ in self.__neighbours):
+            raise ValueError("Les deux serveurs sont déjà des voisins")
+
+        if response_time <= 0:
+            raise ValueError("Le temps de réponse ne peut pas être négatif ou nul")
+
+        self.__neighbours.append((neighbour, response_time))
+        neighbour.__neighbours.append((self, response_time))
+
+        self.__network.link_added(self, neighbour, response_time)
+
+    def get_neighbours(self):
+        return self.__neighbours
+
+    def start(self):
+        if self.__is_active is False:
+            self.__is_active = True
+            self.__network.server_started(self)
+
+    def stop(self):
+        if self.__is_active is True:
+            self.__is_active = False
+            self.__network.server_stopped(self)
+
+    def is_active(self):
+        return self.__is_active
+
+    def __str__(self):
+        return self.__ip_address
+
+
+# Résultat d'une recherche de domaine depuis un point de départ
+class Route:
+    FOUND = "found"
+    NOT_HOSTED = "not-hosted"
+    UNREACHABLE = "unreachable"
+
+    def __init__(self, status, path=None, response_time=None):
+        self.status = status
+        self.path = path  # Du serveur hébergeur jusqu'au point de départ
+        self.response_time = response_time
+
+
+# Le réseau et son moteur de routage, utilisables sans interface graphique
+class Network:
+    def __init__(self):
+        self.servers = []
+        self.__servers_by_ip = {}
+        self.__version = 0  # Incrémentée à chaque modification du réseau
+
+        self.domain_index = DomainIndex()  # Index inversé : domaine -> serveurs actifs qui l'hébergent
+        self.connectivity = ConnectivityIndex(self.servers)  # Composantes connexes des serveurs actifs
+        self.route_cache = RouteCache()  # Routes déjà calculées, invalidées à chaque modification du réseau
+        self.routing_tables = RoutingTables()  # Prochains sauts précalculés, utilisés en mode "tables de routage"
+        self.shortest_path_trees = ShortestPathTrees()  # Arbres réparés à chaque modification du réseau
+        self.backup_paths = BackupPaths()  # Chemins de secours des couples protégés
+        self.landmarks = Landmarks(self.servers)  # Recherche ALT, désactivée par défaut
+        self.contraction_hierarchy = None  # Hiérarchie de contraction du graphe actuel, facultative
+        # Latences variables (LatencyTrace) : avec une heure de départ, les recherches donnent le chemin le plus
+        # rapide en partant à cette heure, sans cache ni précalcul, qui supposent des temps de réponse fixes
+        self.latency_trace = None
+        self.departure_time = None
+        self.metrics = Metrics()  # Durée des phases de recherche, désactivées par défaut
+
+    @property
+    def version(self):
+        return self.__version
+
+    def add_server(self, server):
+        if not isinstance(server, Node):
+            raise TypeError("server doit être une instance de \"Node\"")
+
+        if server.network is not self:
+            raise ValueError("Le serveur {} appartient à un autre réseau".format(server))
+
+        if server.ip_address in self.__servers_by_ip:
+            raise ValueError("Un serveur possède déjà l'adresse IP {}".format(server.ip_address))
+
+        self.servers.append(server)
+        self.__servers_by_ip[server.ip_address] = server
+        self.connectivity.server_added(server)
+        self.landmarks.invalidate()
+        self.contraction_hierarchy = None
+
+    def get_server(self, ip_address):
+        return self.__servers_by_ip.get(ip_address)
+
+    def __changed(self):
+        self.__version += 1
+        self.route_cache.invalidate()
+
+    # Notifications envoyées par les serveurs à chaque modification
+    def sites_added(self, server, sites):
+        # Seuls les serveurs actifs figurent dans l'index des domaines
+        if server.is_active() is True:
+            for site in sites:
+                self.domain_index.add(site, server)
+        self.__changed()
+        self.backup_paths.sites_added(server, sites)
+
+    def sites_removed(self, server, sites):
+        if server.is_active() is True:
+            for site in sites:
+                self.domain_index.remove(site, server)
+        self.__changed()
+        self.backup_paths.sites_removed(server, sites)
+
+    def link_added(self, server1, server2, response_time):
+        self.__changed()
+        self.connectivity.link_added(server1, server2)
+        self.landmarks.invalidate()
+        self.contraction_hierarchy = None
+        self.backup_paths.topology_changed()
+        self.shortest_path_trees.link_added(server1, server2, response_time)
+
+    def server_started(self, server):
+        self.domain_index.add_server(server)
+        self.__changed()
+        self.connectivity.server_started(server)
+        self.backup_paths.server_started(server)
+        self.shortest_path_trees.server_started(server)
+
+    def server_stopped(self, server):
+        self.domain_index.remove_server(server)
+        self.__changed()
+        self.connectivity.server_stopped(server)
+        self.backup_paths.server_stopped(server)
+        self.shortest_path_trees.server_stopped(server)
+
+    def is_time_dependent(self):
+        return self.latency_trace is not None and self.departure_time is not None
+
+    def track_starting_point(self, server):
+        return self.shortest_path_trees.track(server)
+
+    def get_hosting_servers(self, domain):
+        return list(self.domain_index.get_servers(domain))
+
+    def search(self, starting_point, domain, use_routing_tables=False):
+        if self.metrics.enabled:
+            self.metrics.increment("searches")
+
+        route = self.known_route(starting_point, domain)
+        if route is RouteCache.MISSING:
+            route = self.find_route(starting_point, domain, use_routing_tables)
+            if not self.is_time_dependent():
+                self.route_cache.put(starting_point, domain, route)
+        elif self.metrics.enabled:
+            self.metrics.increment("cache_hits")
+
+        return route
+
+    # Route obtenue sans parcourir le graphe, RouteCache.MISSING sinon. Sans refresh_backup_paths, des chemins de
+    # secours à recalculer sont ignorés au lieu d'être recalculés sur place.
+    def known_route(self, starting_point, domain, refresh_backup_paths=True):
+        time_dependent = self.is_time_dependent()
+        # Couple protégé : le meilleur chemin précalculé encore intact. Le principal est le plus court tant qu'il
+        # est intact ; ensuite, le chemin de secours choisi est le plus court des k chemins précalculés.
+        if not time_dependent and (starting_point, domain) in self.backup_paths:
+            best_path = self.backup_paths.best_path(starting_point, domain, refresh_backup_paths)
+            if best_path is not RouteCache.MISSING:
+                return Route(Route.FOUND, *best_path)
+
+        route = RouteCache.MISSING if time_dependent else self.route_cache.get(starting_point, domain)
+        if route is not RouteCache.MISSING:
+            return route
+
+        # Domaine hébergé nulle part, ou seulement hors de la composante du point de départ : la réponse est connue
+        # sans rien parcourir
+        hosting_servers = self.domain_index.get_servers(domain)
+        if len(hosting_servers) == 0:
+            return Route(Route.NOT_HOSTED)
+        if not self.connectivity.reaches_any(starting_point, hosting_servers):
+            return Route(Route.UNREACHABLE)
+
+        return RouteCache.MISSING
+
+    # Calcul de la route sans passer par le cache ; cancelled (threading.Event) permet d'interrompre Dijkstra
+    # lorsque la recherche est lancée depuis un autre thread
+    def find_route(self, starting_point, domain, use_routing_tables=False, cancelled=None):
+        start = self.metrics.start()
+        hosting_servers = self.get_hosting_servers(domain)
+        self.metrics.stop("host_lookup", start)
+        if len(hosting_servers) == 0:
+            return Route(Route.NOT_HOSTED)
+
+        # Seuls les serveurs hébergeurs de la composante du point de départ peuvent être atteints
+        hosting_servers = self.connectivity.reachable_servers(starting_point, hosting_servers)
+        if len(hosting_servers) == 0:
+            return Route(Route.UNREACHABLE)
+
+        start = self.metrics.start()
+        shortest_path, response_time = self.shortest_path(starting_point, hosting_servers, use_routing_tables,
+                                                          cancelled)
+        self.metrics.stop("shortest_path", start)
+        if shortest_path is None:
+            return Route(Route.UNREACHABLE)
+
+        return Route(Route.FOUND, shortest_path, response_time)
+
+    def shortest_path(self, starting_point, hosting_servers, use_routing_tables=False, cancelled=None):
+        if self.is_time_dependent():
+            return self.latency_trace.shortest_path(starting_point, set(hosting_servers), self.departure_time,
+                                                    cancelled)
+
+        if use_routing_tables is True:
+            # Les tables ne sont recalculées que si le réseau a changé depuis leur construction
+            if not self.routing_tables.is_up_to_date(self.__version):
+                self.routing_tables.build(self.servers, self.__version)
+            if self.metrics.enabled:
+                self.metrics.increment("routing_table_searches")
+            shortest_path = self.routing_tables.shortest_path(starting_point, hosting_servers)
+            if shortest_path is None:
+                return None, None
+            return shortest_path, self.routing_tables.distance(starting_point, shortest_path[0])
+
+        # Le point de départ a déjà son arbre des plus courts chemins : il est tenu à jour, il suffit de le lire.
+        # ALT, lorsqu'il est coché et que ses repères sont prêts, passe avant l'arbre : c'est lui que l'on veut
+        # mesurer.
+        use_landmarks = self.landmarks.enabled and self.landmarks.is_ready()
+        tree = None if use_landmarks else self.shortest_path_trees.get(starting_point)
+        if tree is not None:
+            if self.metrics.enabled:
+                self.metrics.increment("tree_searches")
+            shortest_path = tree.shortest_path(hosting_servers)
+            if shortest_path is None:
+                return None, None
+            return shortest_path, tree.distance(shortest_path[0])
+
+        # Hiérarchie calculée pour ce graphe ; elle renvoie None (Dijkstra prend le relais) si son chemin traverse
+        # un serveur arrêté ou si le domaine est hébergé par trop de serveurs
+        hierarchy = self.contraction_hierarchy
+        if hierarchy is not None:
+            result = hierarchy.shortest_path(starting_point, hosting_servers, self.metrics)
+            if result is not None:
+                return result
+
+        # Les distances aux repères sont recalculées en arrière-plan après chaque ajout : en attendant, Dijkstra
+        if use_landmarks:
+            return self.landmarks.shortest_path(starting_point, hosting_servers, self.metrics)
+
+        destination_server, predecessors, distances = self.dijkstra(starting_point, set(hosting_servers),
+                                                                    self.metrics, cancelled)
+        if destination_server is None:
+            return None, None
+
+        # Le chemin va du serveur hébergeur jusqu'au point de départ
+        start = self.metrics.start()
+        shortest_path = []
+        curr_server = destination_server
+        while curr_server is not None:
+            shortest_path.append(curr_server)
+            curr_server = predecessors[curr_server]
+        self.metrics.stop("path_reconstruction", start)
+
+        return shortest_path, distances[destination_server]
+
+    @staticmethod
+    def dijkstra(starting_point, hosting_servers, metrics=None, cancelled=None):
+        # Dijkstra à partir du point de départ avec un tas binaire ; on s'arrête dès que le premier serveur
+        # hébergeur est fixé puisque c'est forcément le plus proche
+        destination_server = None
+        distances = {starting_point: 0}
+        predecessors = {starting_point: None}
+        settled = set()
+        counter = itertools.count()  # Départage les distances égales, les serveurs n'étant pas comparables
+        heap = [(0, next(counter), starting_point)]
+
+        while heap:
+            distance, _, u = heapq.heappop(heap)
+            if u in settled:
+                continue
+            settled.add(u)
+
+            if u in hosting_servers:
+                destination_server = u
+                break
+
+            # Recherche abandonnée : on ne consulte l'événement que de temps en temps
+            if cancelled is not None and len(settled) % 1024 == 0 and cancelled.is_set():
+                break
+
+            if u.is_active() is False:
+                continue
+
+            for v, w in u.get_neighbours():
+                if v not in settled and distance + w < distances.get(v, float("inf")):
+                    distances[v] = distance + w
+                    predecessors[v] = u
+                    heapq.heappush(heap, (distance + w, next(counter), v))
+
+        # Le travail effectué se déduit de l'état final : rien n'est compté dans la boucle. Chaque relâchement
+        # réussi ajoute une entrée au tas, en plus de celle du point de départ.
+        if metrics is not None and metrics.enabled:
+            heap_pushes = next(counter)
+            metrics.observe("heap_pushes", heap_pushes)
+            metrics.observe("nodes_settled", len(settled))
+            metrics.observe("edges_relaxed", heap_pushes - 1)
+
+        return destination_server, predecessors, distances
@@ -0,0 +1,428 @@
+import heapq
+import math
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+from network_modules.domain_index import DomainTrie
+from network_modules.topology import Topology
+
+MEAN = "mean"
+P99 = "p99"
+
+_arrays = None  # (offsets, targets, weights, active, distances) du processus courant
+_adjacency = None  # (tableaux, voisins actifs de chaque serveur), construits par _neighbours
+_block_size = 1 << 22  # Nombre de distances copiées à la fois pour évaluer les candidats
+_blocks = []  # Blocs de mémoire partagée ouverts par le processus, gardés ouverts jusqu'à sa fin
+
+
+# Tableau numpy en mémoire partagée, rempli avec values ou laissé à remplir par les processus
+def _share(shape, dtype, values=None):
+    dtype = numpy.dtype(dtype)
+    block = shared_memory.SharedMemory(create=True, size=max(1, math.prod(shape) * dtype.itemsize))
+    if values is not None:
+        numpy.ndarray(shape, dtype, buffer=block.buf)[...] = values
+    return (block.name, shape, dtype.str), block
+
+
+def _attach(descriptor):
+    name, shape, dtype = descriptor
+    block = shared_memory.SharedMemory(name=name)
+    _blocks.append(block)
+    return numpy.ndarray(shape, numpy.dtype(dtype), buffer=block.buf)
+
+
+def _init_worker(descriptors):
+    global _arrays
+    _arrays = tuple(_attach(descriptor) for descriptor in descriptors)
+
+
+# Voisins actifs de chaque serveur, [(voisin, temps de réponse), ...] : les listes Python se parcourent bien plus vite
+# que les tableaux numpy élément par élément. Construits une fois par processus.
+def _neighbours(arrays):
+    global _adjacency
+    if _adjacency is None or _adjacency[0] is not arrays:
+        offsets, targets, weights, active = (values.tolist() for values in arrays[:4])
+        _adjacency = (arrays, [[(v, w) for v, w in zip(targets[offsets[u]:offsets[u + 1]],
+                                                       weights[offsets[u]:offsets[u + 1]]) if active[v] == 1]
+                               for u in range(len(active))])
+    return _adjacency[1]
+
+
+# Temps de réponse depuis chaque point de départ vers tous les serveurs actifs, écrits dans les colonnes first à
+# first + count de la matrice des distances (infini si le serveur n'est pas accessible). Un serveur arrêté ne
+# transmet rien, comme avec Server.stop() ; les points de départ sont tous actifs.
+def _compute_distances(first, count, sources, arrays=None):
+    arrays = _arrays if arrays is None else arrays
+    neighbours = _neighbours(arrays)
+    candidates = numpy.flatnonzero(arrays[3])
+    for column, source in zip(range(first, first + count), sources):
+        source_distances = [math.inf] * len(neighbours)
+        source_distances[source] = 0
+        heap = [(0, source)]
+        while heap:
+            distance, u = heapq.heappop(heap)
+            if distance > source_distances[u]:
+                continue
+
+            for v, w in neighbours[u]:
+                if distance + w < source_distances[v]:
+                    source_distances[v] = distance + w
+                    heapq.heappush(heap, (distance + w, v))
+
+        arrays[4][:, column] = numpy.array(source_distances)[candidates]
+
+
+# Pour chaque ligne de distances (un candidat), la demande qui n'atteint aucun réplica, puis l'objectif et le temps
+# de réponse moyen de la demande servie, si ce candidat s'ajoute aux réplicas dont current donne déjà les distances
+def _evaluate(current, distances, weights, total, objective):
+    candidate_distances = numpy.minimum(current, distances)
+    reached = numpy.isfinite(candidate_distances)
+    unreached = total - reached @ weights
+    served = numpy.maximum(total - unreached, 1e-300)
+    mean = numpy.where(reached, candidate_distances, 0) @ weights / served
+    if objective == MEAN:
+        return unreached, mean, mean
+
+    # 99e centile pondéré : la plus petite distance sous laquelle se trouve 99 % de la demande servie
+    candidates = numpy.arange(len(candidate_distances))
+    order = numpy.argsort(candidate_distances, axis=1)
+    cumulated = numpy.cumsum(weights[order], axis=1)
+    positions = numpy.minimum((cumulated < 0.99 * served[:, numpy.newaxis] * (1 - 1e-12)).sum(axis=1),
+                              len(weights) - 1)
+    p99 = candidate_distances[candidates, order[candidates, positions]]
+    return unreached, numpy.where(numpy.isfinite(p99), p99, 0), mean
+
+
+# Coût de chaque candidat, évalué par blocs pour ne pas copier plus de block_size distances à la fois
+def _costs(current, distances, sources, weights, total, objective):
+    candidates = distances.shape[0]
+    step = max(1, _block_size // max(1, len(weights)))
+    costs = [numpy.empty(candidates) for _ in range(3)]
+    for start in range(0, candidates, step):
+        end = min(start + step, candidates)
+        for cost, values in zip(costs, _evaluate(current, distances[start:end, sources], weights, total, objective)):
+            cost[start:end] = values
+    return costs
+
+
+def _best(costs, excluded=()):
+    unreached, primary, secondary = costs
+    # Les écarts d'arrondi entre deux candidats équivalents ne départagent pas les candidats
+    unreached = numpy.round(unreached, 9)
+    if len(excluded) > 0:
+        unreached = unreached.copy()
+        unreached[list(excluded)] = numpy.inf
+    candidate = int(numpy.lexsort((secondary, primary, unreached))[0])
+    return candidate, (unreached[candidate], primary[candidate], secondary[candidate])
+
+
+def _is_better(cost, other):
+    for value, other_value in zip(cost, other):
+        tolerance = 1e-9 * max(1.0, abs(other_value))
+        if value < other_value - tolerance:
+            return True
+        if value > other_value + tolerance:
+            return False
+    return False
+
+
+def _nearest(distances, sources, replicas, count):
+    if len(replicas) == 0:
+        return numpy.full(count, numpy.inf)
+    return distances[replicas][:, sources].min(axis=0).astype(float)
+
+
+# Demande servie, temps de réponse moyen et 99e centile pondérés avec les réplicas donnés (indices des candidats)
+def _statistics(distances, sources, weights, replicas):
+    nearest = _nearest(distances, sources, replicas, len(weights))
+    total = float(weights.sum())
+    unreached, p99, mean = (float(values[0]) for values in _evaluate(
+        nearest, numpy.full((1, len(weights)), numpy.inf), weights, total, P99))
+    served = total - unreached
+    return {
+        "served_demand": served / total if total > 0 else None,
+        "mean": mean if served > 0 else None,
+        "p99": p99 if served > 0 else None
+    }
+
+
+# k-médiane d'un domaine : ajout glouton du candidat qui améliore le plus l'objectif, puis échanges (Teitz et Bart)
+# d'un réplica contre un autre candidat tant qu'un échange l'améliore. Renvoie les indices des candidats choisis.
+def _place(sources, weights, budget, objective, max_passes, distances):
+    # Les colonnes de la demande du domaine sont copiées une fois pour toutes si elles tiennent dans un bloc
+    if distances.shape[0] * len(sources) <= _block_size:
+        distances, sources = numpy.ascontiguousarray(distances[:, sources]), slice(None)
+
+    total = float(weights.sum())
+    replicas = []
+    current = numpy.full(len(weights), numpy.inf)
+    for _ in range(min(budget, distances.shape[0])):
+        candidate, _ = _best(_costs(current, distances, sources, weights, total, objective), replicas)
+        replicas.append(candidate)
+        current = numpy.minimum(current, distances[candidate, sources])
+
+    for _ in range(max_passes):
+        improved = False
+        for position in range(len(replicas)):
+            others = replicas[:position] + replicas[position + 1:]
+            costs = _costs(_nearest(distances, sources, others, len(weights)), distances, sources, weights, total,
+                           objective)
+            candidate, cost = _best(costs, others)
+            kept_cost = tuple(values[replicas[position]] for values in costs)
+            kept_cost = (numpy.round(kept_cost[0], 9),) + kept_cost[1:]
+            if candidate != replicas[position] and _is_better(cost, kept_cost):
+                replicas[position] = candidate
+                improved = True
+        if not improved:
+            break
+
+    return sorted(replicas)
+
+
+def _place_domains(tasks, objective, max_passes, arrays=None):
+    distances = (_arrays if arrays is None else arrays)[4]
+    results = []
+    for domain, sources, weights, budget, current_replicas in tasks:
+        replicas = _place(sources, weights, budget, objective, max_passes, distances)
+        results.append((domain, replicas, _statistics(distances, sources, weights, replicas),
+                        _statistics(distances, sources, weights, current_replicas)))
+    return results
+
+
+# Remplace les serveurs qui hébergent chaque domaine du placement (domaine -> adresses IP) dans le réseau, par
+# Server.sites et Node.remove_sites. Toutes les adresses sont vérifiées avant de modifier un seul serveur.
+def apply_placement(network, placement):
+    hosts = {}
+    for domain, ip_addresses in placement.items():
+        DomainTrie.labels(domain)
+        hosts[domain] = set()
+        for ip_address in ip_addresses:
+            server = network.get_server(ip_address)
+            if server is None:
+                raise ValueError("Le serveur {} est inconnu".format(ip_address))
+            hosts[domain].add(server)
+
+    for domain, servers in hosts.items():
+        for server in network.servers:
+            if domain in server.sites and server not in servers:
+                server.remove_sites(domain)
+        for server in servers:
+            if domain not in server.sites:
+                server.sites = domain
+
+
+# Copie de la topologie dont les sites suivent le placement (domaine -> adresses IP)
+def placed_topology(topology, placement):
+    indexes = {topology.ip_address(i): i for i in range(len(topology))}
+    hosts = [[] for _ in range(len(topology))]
+    for domain, ip_addresses in placement.items():
+        DomainTrie.labels(domain)
+        for ip_address in ip_addresses:
+            if ip_address not in indexes:
+                raise ValueError("Le serveur {} est inconnu".format(ip_address))
+            hosts[indexes[ip_address]].append(domain)
+
+    servers_records = ({
+        "ip_address": topology.ip_address(i),
+        "center_x": topology.centers_x[i],
+        "center_y": topology.centers_y[i],
+        "sites": [site for site in topology.get_sites(i) if site not in placement] + hosts[i],
+        "active": topology.active[i] == 1
+    } for i in range(len(topology)))
+    links_records = ((topology.ip_address(u), topology.ip_address(v), w) for u, v, w in topology.get_links())
+    return Topology.from_records(servers_records, links_records)
+
+
+class PlacementReport:
+    def __init__(self, objective, placement, statistics, current_statistics, ignored_demand):
+        self.objective = objective
+        self.placement = placement  # Domaine -> adresses IP des serveurs choisis
+        self.statistics = statistics  # Domaine -> demande servie, moyenne et 99e centile avec ce placement
+        self.current_statistics = current_statistics  # Les mêmes avec les serveurs qui hébergent déjà le domaine
+        self.ignored_demand = ignored_demand  # Demande partie de serveurs arrêtés, qu'aucun placement ne sert
+
+    def apply(self, network):
+        apply_placement(network, self.placement)
+
+    def to_dict(self):
+        return {
+            "objective": self.objective,
+            "ignored_demand": self.ignored_demand,
+            "domains": {domain: {
+                "replicas": replicas,
+                **self.statistics[domain],
+                "current": self.current_statistics[domain]
+            } for domain, replicas in self.placement.items()}
+        }
+
+
+# Placement des réplicas des domaines : pour une demande (point de départ, domaine, poids) et un nombre de réplicas
+# par domaine, choisit parmi les serveurs actifs ceux qui minimisent le temps de réponse moyen ou le 99e centile
+# de la demande (k-médiane, approchée par un ajout glouton puis des échanges). Les temps de réponse de chaque point
+# de départ vers tous les serveurs sont calculés une seule fois pour tous les domaines, dans une matrice numpy
+# (serveurs actifs x points de départ, float32) : sa taille limite le nombre de points de départ distincts. Avec
+# plusieurs processus, le graphe et la matrice sont placés en mémoire partagée ; les points de départ, puis les
+# domaines, sont répartis entre les processus.
+class ReplicaPlacement:
+    max_passes = 10  # Nombre maximal de passes d'échanges par domaine
+
+    def __init__(self, topology, objective=MEAN, replicas=3):
+        if numpy is None:
+            raise RuntimeError("Le placement des réplicas nécessite le module numpy")
+
+        if objective not in [MEAN, P99]:
+            raise ValueError("Objectif inconnu \"{}\"".format(objective))
+
+        self.topology = topology
+        self.objective = objective
+        self.replicas = ReplicaPlacement.__check_replicas(replicas)
+        self.__indexes = {topology.ip_address(i): i for i in range(len(topology))}
+        self.__demand = {}  # Domaine -> {point de départ: poids}
+        self.__budgets = {}  # Domaine -> nombre de réplicas, s'il diffère de replicas
+
+    @staticmethod
+    def __check_replicas(replicas):
+        if not isinstance(replicas, int) or isinstance(replicas, bool) or replicas <= 0:
+            raise ValueError("Le nombre de réplicas doit être un entier strictement positif")
+        return replicas
+
+    def __len__(self):
+        return len(self.__demand)
+
+    def add_demand(self, starting_ip, domain, weight=1):
+        starting_point = self.__indexes.get(starting_ip.strip() if isinstance(starting_ip, str) else starting_ip)
+        if starting_point is None:
+            raise ValueError("Le serveur {} est inconnu".format(starting_ip))
+
+        if not isinstance(domain, str) or not domain.strip():
+            raise ValueError("Le domaine d'une requête ne peut pas être vide")
+        DomainTrie.labels(domain)
+
+        if not isinstance(weight, (int, float)) or isinstance(weight, bool) or not 0 < weight < math.inf:
+            raise ValueError("Le poids d'une requête doit être strictement positif")
+
+        demand = self.__demand.setdefault(domain.strip(), {})
+        demand[starting_point] = demand.get(starting_point, 0) + weight
+
+    def set_budget(self, domain, replicas):
+        if not isinstance(domain, str) or not domain.strip():
+            raise ValueError("Le domaine ne peut pas être vide")
+        self.__budgets[domain.strip()] = ReplicaPlacement.__check_replicas(replicas)
+
+    # Demande tirée uniformément parmi les serveurs et les domaines de la topologie
+    def sample_demand(self, count, seed=None):
+        if len(self.topology) == 0 or len(self.topology.domains) == 0:
+            return
+
+        rng = numpy.random.default_rng(seed)
+        starting_points = rng.integers(len(self.topology), size=count)
+        domains = rng.integers(len(self.topology.domains), size=count)
+        for starting_point, domain in zip(starting_points.tolist(), domains.tolist()):
+            self.add_demand(self.topology.ip_address(starting_point), self.topology.domains[domain])
+
+    def __build_arrays(self):
+        topology = self.topology
+        n = len(topology)
+        # Liaisons au format CSR, chacune des deux côtés
+        sources = numpy.concatenate((numpy.asarray(topology.links_sources, dtype=numpy.int64),
+                                     numpy.asarray(topology.links_targets, dtype=numpy.int64)))
+        targets = numpy.concatenate((sources[len(sources) // 2:], sources[:len(sources) // 2]))
+        weights = numpy.tile(numpy.asarray(topology.links_response_times, dtype=numpy.int64), 2)
+        order = numpy.argsort(sources, kind="stable")
+        offsets = numpy.zeros(n + 1, dtype=numpy.int64)
+        numpy.cumsum(numpy.bincount(sources, minlength=n), out=offsets[1:])
+        active = numpy.frombuffer(bytes(topology.active), dtype=numpy.uint8)
+        return offsets, targets[order], weights[order], active
+
+    # Indices (parmi les candidats) des serveurs actifs qui hébergent déjà chaque domaine demandé, pour le motif le
+    # plus spécifique qui le couvre
+    def __current_hosts(self, candidate_indexes):
+        hosts = DomainTrie()
+        for server in range(len(self.topology)):
+            if candidate_indexes[server] >= 0:
+                for site in self.topology.get_sites(server):
+                    hosts.setdefault(site, []).append(int(candidate_indexes[server]))
+        return {domain: next(hosts.matches(domain), []) for domain in self.__demand}
+
+    def run(self, workers=1, chunk_size=16):
+        if not isinstance(workers, int) or workers <= 0:
+            raise ValueError("Le nombre de processus doit être un entier strictement positif")
+
+        if not isinstance(chunk_size, int) or chunk_size <= 0:
+            raise ValueError("La taille des paquets doit être un entier strictement positif")
+
+        offsets, targets, weights, active = self.__build_arrays()
+        candidates = numpy.flatnonzero(active)
+        candidate_indexes = numpy.full(len(self.topology), -1, dtype=numpy.int64)
+        candidate_indexes[candidates] = numpy.arange(len(candidates))
+
+        # Une colonne de la matrice par point de départ actif ; la demande des serveurs arrêtés n'est jamais
+        # servie, et un domaine qui n'a que celle-là garde ses serveurs
+        current_hosts = self.__current_hosts(candidate_indexes)
+        source_indexes = {}
+        tasks = []
+        ignored_demand = {}
+        for domain, demand in self.__demand.items():
+            domain_sources, domain_weights = [], []
+            for starting_point, weight in demand.items():
+                if active[starting_point] == 0:
+                    ignored_demand[domain] = ignored_demand.get(domain, 0) + weight
+                    continue
+                domain_sources.append(source_indexes.setdefault(starting_point, len(source_indexes)))
+                domain_weights.append(weight)
+            if len(domain_sources) > 0:
+                tasks.append((domain, numpy.array(domain_sources, dtype=numpy.int64),
+                              numpy.array(domain_weights, dtype=float), self.__budgets.get(domain, self.replicas),
+                              current_hosts[domain]))
+
+        if len(tasks) == 0:
+            return PlacementReport(self.objective, {}, {}, {}, ignored_demand)
+
+        sources = list(source_indexes)
+        distances_chunks = [(first, min(chunk_size, len(sources) - first), sources[first:first + chunk_size])
+                            for first in range(0, len(sources), chunk_size)]
+        domains_chunks = [tasks[first:first + chunk_size] for first in range(0, len(tasks), chunk_size)]
+        shape = (len(candidates), len(sources))
+        results = []
+        if workers == 1:
+            arrays = (offsets, targets, weights, active, numpy.empty(shape, dtype=numpy.float32))
+            for chunk in distances_chunks:
+                _compute_distances(*chunk, arrays)
+            for chunk in domains_chunks:
+                results.extend(_place_domains(chunk, self.objective, ReplicaPlacement.max_passes, arrays))
+        else:
+            descriptors, blocks = [], []
+            for values in [offsets, targets, weights, active]:
+                descriptor, block = _share(values.shape, values.dtype, values)
+                descriptors.append(descriptor)
+                blocks.append(block)
+            descriptor, block = _share(shape, numpy.float32)
+            descriptors.append(descriptor)
+            blocks.append(block)
+            try:
+                with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                         initargs=(descriptors,)) as executor:
+                    # Toutes les distances sont écrites avant de placer le premier domaine
+                    for _ in executor.map(_compute_distances, *zip(*distances_chunks)):
+                        pass
+                    for chunk_results in executor.map(_place_domains, domains_chunks,
+                                                      [self.objective] * len(domains_chunks),
+                                                      [ReplicaPlacement.max_passes] * len(domains_chunks)):
+                        results.extend(chunk_results)
+            finally:
+                for block in blocks:
+                    block.close()
+                    block.unlink()
+
+        placement, statistics, current_statistics = {}, {}, {}
+        for domain, replicas, domain_statistics, domain_current_statistics in results:
+            placement[domain] = [self.topology.ip_address(int(candidates[replica])) for replica in replicas]
+            statistics[domain] = domain_statistics
+            current_statistics[domain] = domain_current_statistics
+
+        return PlacementReport(self.objective, placement, statistics, current_statistics, ignored_demand)
@@ -0,0 +1,75 @@
+from collections import OrderedDict
+
+
+class RouteCache:
+    MISSING = object()  # Renvoyé par get() lorsque la route n'est pas (ou plus) en cache
+
+    def __init__(self, max_size=1024):
+        self.max_size = max_size
+
+        self.__entries = OrderedDict()  # (point de départ, domaine) -> (version du réseau, chemin)
+        self.__version = 0
+        self.__hits = 0
+        self.__misses = 0
+
+    @property
+    def max_size(self):
+        return self.__max_size
+
+    @max_size.setter
+    def max_size(self, max_size):
+        if not isinstance(max_size, int):
+            raise TypeError("max_size doit être de type \"int\"")
+
+        if max_size <= 0:
+            raise ValueError("max_size doit être strictement positif")
+
+        self.__max_size = max_size
+
+    @property
+    def version(self):
+        return self.__version
+
+    @property
+    def hits(self):
+        return self.__hits
+
+    @property
+    def misses(self):
+        return self.__misses
+
+    # Toute modification du réseau rend obsolètes les routes calculées auparavant. Les entrées ne sont pas
+    # parcourues ici : elles sont écartées au moment où on les relit avec une ancienne version.
+    def invalidate(self):
+        self.__version += 1
+
+    def get(self, starting_point, domain):
+        key = (starting_point, domain)
+        entry = self.__entries.get(key)
+        if entry is None or entry[0] != self.__version:
+            if entry is not None:
+                del self.__entries[key]
+            self.__misses += 1
+            return RouteCache.MISSING
+
+        self.__entries.move_to_end(key)
+        self.__hits += 1
+        return entry[1]
+
+    # Le chemin peut être None : un domaine inaccessible depuis le point de départ est aussi mis en cache
+    def put(self, starting_point, domain, path):
+        key = (starting_point, domain)
+        self.__entries[key] = (self.__version, path)
+        self.__entries.move_to_end(key)
+
+        while len(self.__entries) > self.__max_size:
+            self.__entries.popitem(last=False)
+
+    def clear(self):
+        self.__entries.clear()
+
+    def __len__(self):
+        return len(self.__entries)
+
+    def __str__(self):
+        return f"{self.__hits} succès, {self.__misses} échecs, {len(self.__entries)}/{self.__max_size} routes"
@@ -0,0 +1,153 @@
+import heapq
+import itertools
+
+try:
+    import numpy
+except ImportError:  # NumPy est facultatif : sans lui les tables sont construites avec Dijkstra
+    numpy = None
+
+
+# Vue sur la table de routage d'un serveur : prochain saut et distance vers chacun des autres serveurs
+class RoutingTable:
+
+    def __init__(self, routing_tables, index):
+        self.__routing_tables = routing_tables
+        self.__index = index
+
+    def next_hop(self, destination):
+        return self.__routing_tables.next_hop(self.__routing_tables.servers[self.__index], destination)
+
+    def distance(self, destination):
+        return self.__routing_tables.distance(self.__routing_tables.servers[self.__index], destination)
+
+
+class RoutingTables:
+    # Au-delà de cette densité (liaisons / serveurs²), Floyd–Warshall vectorisé bat les Dijkstra successifs
+    dense_threshold = 0.05
+
+    def __init__(self):
+        self.servers = []
+        self.version = None  # Version du réseau pour laquelle les tables ont été calculées
+
+        self.__indexes = {}  # Serveur -> indice de ligne/colonne dans les tables
+        self.__distances = []
+        self.__next_hops = []  # Indice du prochain saut, -1 si la destination est inaccessible
+
+    def build(self, servers, version=None, method="auto"):
+        if method not in ["auto", "floyd-warshall", "dijkstra"]:
+            raise ValueError("La méthode doit être \"auto\", \"floyd-warshall\" ou \"dijkstra\"")
+
+        # Un serveur arrêté ne relaie rien et n'héberge rien : il n'a pas sa place dans les tables
+        self.servers = [s for s in servers if s.is_active() is True]
+        self.__indexes = {s: i for i, s in enumerate(self.servers)}
+
+        adjacency = [{} for _ in self.servers]
+        for i, u in enumerate(self.servers):
+            for v, w in u.get_neighbours():
+                j = self.__indexes.get(v)
+                if j is not None and w < adjacency[i].get(j, float("inf")):
+                    adjacency[i][j] = w
+
+        if method == "auto":
+            n = len(self.servers)
+            edges_count = sum(len(neighbours) for neighbours in adjacency)
+            dense = n > 0 and edges_count / (n * n) >= RoutingTables.dense_threshold
+            method = "floyd-warshall" if numpy is not None and dense else "dijkstra"
+
+        if method == "floyd-warshall":
+            self.__floyd_warshall(adjacency)
+        else:
+            self.__repeated_dijkstra(adjacency)
+
+        self.version = version
+
+    def __floyd_warshall(self, adjacency):
+        if numpy is None:
+            raise RuntimeError("Floyd–Warshall nécessite le module numpy")
+
+        n = len(adjacency)
+        distances = numpy.full((n, n), numpy.inf)
+        next_hops = numpy.full((n, n), -1, dtype=numpy.int64)
+        numpy.fill_diagonal(distances, 0)
+        numpy.fill_diagonal(next_hops, numpy.arange(n))
+        for i, neighbours in enumerate(adjacency):
+            for j, w in neighbours.items():
+                distances[i, j] = w
+                next_hops[i, j] = j
+
+        for k in range(n):
+            # Toutes les paires (i, j) sont relâchées en même temps à travers k
+            via_k = distances[:, k, numpy.newaxis] + distances[numpy.newaxis, k, :]
+            shorter = via_k < distances
+            numpy.minimum(distances, via_k, out=distances)
+            next_hops = numpy.where(shorter, next_hops[:, k, numpy.newaxis], next_hops)
+
+        self.__distances = distances
+        self.__next_hops = next_hops
+
+    def __repeated_dijkstra(self, adjacency):
+        n = len(adjacency)
+        self.__distances = []
+        self.__next_hops = []
+
+        for source in range(n):
+            distances = [float("inf")] * n
+            next_hops = [-1] * n
+            distances[source] = 0
+            next_hops[source] = source
+            counter = itertools.count()
+            heap = [(0, next(counter), source)]
+
+            while heap:
+                distance, _, u = heapq.heappop(heap)
+                if distance > distances[u]:
+                    continue
+
+                for v, w in adjacency[u].items():
+                    if distance + w < distances[v]:
+                        distances[v] = distance + w
+                        # Le premier saut est hérité de u, sauf pour les voisins directs de la source
+                        next_hops[v] = v if u == source else next_hops[u]
+                        heapq.heappush(heap, (distance + w, next(counter), v))
+
+            self.__distances.append(distances)
+            self.__next_hops.append(next_hops)
+
+    def is_up_to_date(self, version):
+        return self.version is not None and self.version == version
+
+    def table(self, server):
+        index = self.__indexes.get(server)
+        return None if index is None else RoutingTable(self, index)
+
+    def distance(self, source, destination):
+        i = self.__indexes.get(source)
+        j = self.__indexes.get(destination)
+        if i is None or j is None:
+            return float("inf")
+
+        return float(self.__distances[i][j])
+
+    def next_hop(self, source, destination):
+        i = self.__indexes.get(source)
+        j = self.__indexes.get(destination)
+        if i is None or j is None or self.__next_hops[i][j] == -1:
+            return None
+
+        return self.servers[self.__next_hops[i][j]]
+
+    # Même résultat que la recherche par Dijkstra : le chemin va du serveur hébergeur jusqu'au point de départ
+    def shortest_path(self, starting_point, hosting_servers):
+        destination_server = min(hosting_servers, key=lambda s: self.distance(starting_point, s), default=None)
+        if destination_server is None or self.distance(starting_point, destination_server) == float("inf"):
+            return None
+
+        i = self.__indexes[starting_point]
+        j = self.__indexes[destination_server]
+        shortest_path = [starting_point]
+        while i != j:
+            i = int(self.__next_hops[i][j])
+            shortest_path.append(self.servers[i])
+
+        shortest_path.reverse()
+        return shortest_path
@@ -0,0 +1,112 @@
+import queue
+import threading
+
+from network_modules.shortest_path_tree import ShortestPathTree
+
+
+class SearchRequest:
+    __slots__ = ("network", "starting_point", "domain", "use_routing_tables", "track", "protect", "version",
+                 "departure_time", "cancelled", "route", "tree", "backup_paths", "error")
+
+    def __init__(self, network, starting_point, domain, use_routing_tables=False, track=False, protect=False):
+        self.network = network
+        self.starting_point = starting_point
+        self.domain = domain
+        self.use_routing_tables = use_routing_tables
+        self.track = track  # Construire l'arbre des plus courts chemins du point de départ
+        self.protect = protect  # Calculer les chemins de secours du couple (point de départ, domaine)
+        self.version = network.version  # Version du réseau au moment de la demande
+        self.departure_time = network.departure_time  # Heure de départ, avec des latences variables
+        self.cancelled = threading.Event()
+        # Renseignés par le thread de recherche ; route vaut None si le calcul a échoué, error donnant la cause
+        self.route = None
+        self.tree = None
+        self.backup_paths = None
+        self.error = None
+
+
+# Exécute les recherches dans un thread pour que la boucle de tkinter ne se fige jamais. Le thread lit le graphe
+# sans verrou : une route calculée alors que le réseau a changé (version différente) est jetée et la recherche
+# relancée, ce qui revient à chercher sur un instantané du graphe. Seule la dernière demande compte : soumettre
+# une recherche annule la précédente. Les résultats sont récupérés par poll(), appelée depuis after(). Le thread
+# construit aussi l'arbre du point de départ et les chemins de secours demandés, sans rien modifier : poll() les
+# enregistre dans le réseau, depuis le thread de tkinter.
+class SearchWorker:
+    def __init__(self):
+        self.__requests = queue.Queue()
+        self.__results = queue.Queue()
+        self.__current = None
+        self.__thread = None
+
+    def is_busy(self):
+        return self.__current is not None
+
+    def submit(self, network, starting_point, domain, use_routing_tables=False, track=False, protect=False):
+        self.cancel()
+        self.__current = SearchRequest(network, starting_point, domain, use_routing_tables, track, protect)
+        if self.__thread is None:
+            self.__thread = threading.Thread(target=self.__run, daemon=True)
+            self.__thread.start()
+        self.__requests.put(self.__current)
+        return self.__current
+
+    def cancel(self):
+        if self.__current is not None:
+            self.__current.cancelled.set()
+            self.__current = None
+
+    # Renvoie la demande en cours si elle est terminée (route dans request.route, None si elle a échoué alors que le
+    # réseau n'a pas changé), None sinon
+    def poll(self):
+        while True:
+            try:
+                request = self.__results.get_nowait()
+            except queue.Empty:
+                return None
+
+            if request is not self.__current:
+                continue  # Demande annulée ou remplacée entre-temps
+
+            network = request.network
+            if request.version != network.version or request.departure_time != network.departure_time:
+                # Le réseau (ou l'heure de départ) a changé pendant le calcul, ce qui explique aussi une lecture
+                # qui a échoué : on recommence sur le nouvel état
+                self.submit(network, request.starting_point, request.domain, request.use_routing_tables,
+                            request.track, request.protect)
+                continue
+
+            self.__current = None
+            if request.route is None:
+                return request
+
+            if request.tree is not None:
+                network.shortest_path_trees.add(request.tree)
+            if request.backup_paths is not None:
+                network.backup_paths.protect(request.starting_point, request.domain, paths=request.backup_paths)
+            if not network.is_time_dependent():
+                network.route_cache.put(request.starting_point, request.domain, request.route)
+            return request
+
+    def __run(self):
+        while True:
+            request = self.__requests.get()
+            if request.cancelled.is_set():
+                continue
+
+            network = request.network
+            try:
+                if request.track:
+                    request.tree = ShortestPathTree(request.starting_point)
+                if request.protect:
+                    request.backup_paths = network.backup_paths.compute_paths(request.starting_point, request.domain)
+                request.route = network.find_route(request.starting_point, request.domain,
+                                                   request.use_routing_tables, request.cancelled)
+            except Exception as e:
+                # Structure modifiée par l'interface pendant sa lecture (la demande sera relancée), ou erreur
+                # (signalée) : le thread doit survivre et la demande recevoir une réponse
+                request.route = None
+                request.error = e
+
+            # Toujours transmise : poll() ignore les demandes annulées ou remplacées
+            self.__results.put(request)
+
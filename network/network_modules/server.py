@@ -1,32 +1,39 @@
-import re
+from network_modules.network import Node
 
 
-class Server:
+# Représentation graphique (tkinter) d'un serveur du réseau
+class Server(Node):
+    __slots__ = ("__app", "__tag", "__ip_address_tag", "__sites_list_tag", "__line_tags", "__start_x", "__start_y",
+                 "__is_moving", "__pending_dx", "__pending_dy", "__redraw_id")
     half_side = 35
-    __ip_address_pattern = re.compile(
-        r"^(?:(?:25[0-5]|2[0-4][0-9]|[01]?[0-9][0-9]?)\.){3}(?:25[0-5]|2[0-4][0-9]|[01]?[0-9][0-9]?)$")
     __sites_list_padding = 5
     __response_time_container_padding = 3
+    __frame_delay = 16  # En millisecondes : au plus un rafraîchissement par image à 60 fps pendant un déplacement
+    # Tags du canvas qui portent l'état des serveurs : réinitialiser tout le canvas se fait en un nombre constant
+    # d'appels à Tk, qui ne repeint que les serveurs concernés
+    __active_tag = "active"
+    __stopped_tag = "stopped"
+    __on_path_tag = "on-path"
 
     def __init__(self, app, center_x, center_y, ip_address):
         self.__set_app(app)
-        self.center_x = center_x
-        self.center_y = center_y
-        self.ip_address = ip_address
-
-        self.__sites = []
-        self.__neighbours = []  # Liste de Tuples contenant le serveur voisin et le temps de réponse(poids)
-        self.__is_active = True  # Actif ou pas
+        super().__init__(app.network, ip_address, center_x, center_y)
 
         self.__tag = None  # Le rectangle qui représente le serveur sur le UI
         self.__ip_address_tag = None
         self.__sites_list_tag = None
+        # Tuples (voisin, ligne, temps de réponse, fond du temps de réponse, position du fond par rapport au
+        # milieu de la ligne) : l'encombrement du texte est mesuré à la création, puis à chaque changement de texte
         self.__line_tags = []
 
         # Pour le mécanisme de déplacement
         self.__start_x = None
         self.__start_y = None
         self.__is_moving = False
+        # Les mouvements de souris sont cumulés puis appliqués en une seule fois à chaque image
+        self.__pending_dx = 0
+        self.__pending_dy = 0
+        self.__redraw_id = None
 
     def __set_app(self, app):
         from network_modules.app import Application
@@ -38,57 +45,31 @@ class Server:
 
     @property
     def center_x(self):
-        return self.__center_x
+        return Node.center_x.fget(self)
 
     @center_x.setter
     def center_x(self, center_x):
         if not isinstance(center_x, int):
             raise TypeError("center_x doit être de type \"int\"")
 
-        if center_x < 0 or center_x > self.__app.window_width:
-            raise ValueError("center_x doit être compris entre 0 et {}".format(self.__app.window_width))
+        if center_x < 0 or center_x > self.__app.world_width:
+            raise ValueError("center_x doit être compris entre 0 et {}".format(self.__app.world_width))
 
-        self.__center_x = center_x
+        Node.center_x.fset(self, center_x)
 
     @property
     def center_y(self):
-        return self.__center_y
+        return Node.center_y.fget(self)
 
     @center_y.setter
     def center_y(self, center_y):
         if not isinstance(center_y, int):
             raise TypeError("center_y doit être de type \"int\"")
 
-        if center_y < 0 or center_y > self.__app.window_height:
-            raise ValueError("center_y doit être compris entre 0 et {}".format(self.__app.window_height))
-
-        self.__center_y = center_y
-
-    @property
-    def ip_address(self):
-        return self.__ip_address
-
-    @ip_address.setter
-    def ip_address(self, ip_address):
-        if not Server.__ip_address_pattern.match(ip_address):
-            raise ValueError("L'adresse IP fournie \"{}\" est invalide".format(ip_address))
-
-        self.__ip_address = ip_address.strip()
-
-    @property
-    def sites(self):
-        return self.__sites
-
-    @sites.setter
-    def sites(self, sites):
-        if not isinstance(sites, str):
-            raise TypeError("L'argument sites doit être une chaîne de caractères")
+        if center_y < 0 or center_y > self.__app.world_height:
+            raise ValueError("center_y doit être compris entre 0 et {}".format(self.__app.world_height))
 
-        if not sites.strip():
-            raise ValueError("La chaîne de sites ne peut pas être vide")
-
-        for site in sites.split(";"):
-            self.__sites.append(site.strip())
+        Node.center_y.fset(self, center_y)
 
     def add_neighbour(self, neighbour, response_time, canvas):
         if not isinstance(neighbour, Server):
@@ -96,34 +77,33 @@ class Server:
         if not isinstance(response_time, str):
             raise TypeError("Le temps de réponse bien qu'il soit un entier doit être représenté sous forme de chaîne "
                             "de caratères")
-        if not response_time.isdigit():
-            raise TypeError("Le temps de réponse doit être un nombre entier")
-
-        if neighbour in self.__neighbours:
-            raise ValueError("Les deux serveurs sont déjà des voisins")
-
-        response_time_int = int(response_time)
-        if response_time_int <= 0:
-            raise ValueError("Le temps de réponse ne peut pas être négatif ou nul")
-
-        self.__neighbours.append((neighbour, response_time_int))
-        neighbour.__neighbours.append((self, response_time_int))
 
-        self.__draw_connection_line(canvas, neighbour, response_time_int)
+        super().add_neighbour(neighbour, response_time)
 
-    def get_neighbours(self):
-        return self.__neighbours
+        # Une liaison n'est dessinée que lorsque ses deux serveurs le sont
+        if self.is_drawn() and neighbour.is_drawn():
+            self.__draw_connection_line(canvas, neighbour, int(response_time))
 
+    # Seuls les serveurs qui changent d'état sont repeints
     def start(self, canvas):
-        self.__is_active = True
-        canvas.itemconfig(self.__tag, fill="blue")
+        if self.is_active() is True:
+            return
+
+        super().start()
+        if self.is_drawn():
+            canvas.dtag(self.__tag, Server.__stopped_tag)
+            canvas.addtag_withtag(Server.__active_tag, self.__tag)
+            canvas.itemconfig(self.__tag, fill="blue")
 
     def stop(self, canvas):
-        self.__is_active = False
-        canvas.itemconfig(self.__tag, fill="red")
+        if self.is_active() is False:
+            return
 
-    def is_active(self):
-        return self.__is_active
+        super().stop()
+        if self.is_drawn():
+            canvas.dtag(self.__tag, Server.__active_tag)
+            canvas.addtag_withtag(Server.__stopped_tag, self.__tag)
+            canvas.itemconfig(self.__tag, fill="red")
 
     # Vérifie si des coordonnées (x, y) se chevauchent avec le serveur
     def is_within_bounds(self, x, y):
@@ -142,33 +122,55 @@ class Server:
 
     def __drag(self, event, canvas):
         if self.__is_moving:
-            dx = event.x - self.__start_x
-            dy = event.y - self.__start_y
-            canvas.move(self.__tag, dx, dy)
-            canvas.move(self.__ip_address_tag, dx, dy)
-
-            for line_tag in self.__line_tags:
-                l_tag, response_time_tag, background_tag = line_tag
-                x1, y1, x2, y2 = canvas.coords(l_tag)
-                if x1 == self.__center_x and y1 == self.__center_y:
-                    canvas.coords(l_tag, x1 + dx, y1 + dy, x2, y2)
-                else:
-                    canvas.coords(l_tag, x1, y1, x2 + dx, y2 + dy)
-                canvas.coords(response_time_tag, (x1 + x2) / 2, (y1 + y2) / 2)
-                bbox = canvas.bbox(response_time_tag)
-                canvas.coords(
-                    background_tag,
-                    bbox[0] - Server.__response_time_container_padding, bbox[1],
-                    bbox[2] + Server.__response_time_container_padding, bbox[3]
-                )
-
-            self.__center_x += dx
-            self.__center_y += dy
+            self.__pending_dx += event.x - self.__start_x
+            self.__pending_dy += event.y - self.__start_y
 
             self.__start_x = event.x
             self.__start_y = event.y
 
+            if self.__redraw_id is None:
+                self.__redraw_id = canvas.after(Server.__frame_delay, lambda: self.__redraw_drag(canvas))
+
+    def __redraw_drag(self, canvas):
+        self.__redraw_id = None
+        dx, dy = self.__pending_dx, self.__pending_dy
+        if dx == 0 and dy == 0:
+            return
+
+        self.__pending_dx = 0
+        self.__pending_dy = 0
+        self.place(self.center_x + dx, self.center_y + dy, canvas)
+
+    # Place le serveur en (center_x, center_y), qu'il soit dessiné ou non (disposition automatique)
+    def place(self, center_x, center_y, canvas):
+        dx, dy = center_x - self.center_x, center_y - self.center_y
+        if dx == 0 and dy == 0:
+            return
+
+        if self.is_drawn():
+            canvas.move(self.__tag, dx, dy)
+            canvas.move(self.__ip_address_tag, dx, dy)
+        self.move(dx, dy)
+        self.__app.spatial_index.move(self)
+        self.__redraw_lines(canvas)
+
+    def __redraw_lines(self, canvas):
+        # La géométrie des liaisons est recalculée à partir du modèle, sans relire le canvas
+        for neighbour, line_tag, response_time_tag, background_tag, background_offsets in self.__line_tags:
+            middle_x = (self.center_x + neighbour.center_x) / 2
+            middle_y = (self.center_y + neighbour.center_y) / 2
+            canvas.coords(line_tag, self.center_x, self.center_y, neighbour.center_x, neighbour.center_y)
+            canvas.coords(response_time_tag, middle_x, middle_y)
+            canvas.coords(background_tag,
+                          middle_x + background_offsets[0], middle_y + background_offsets[1],
+                          middle_x + background_offsets[2], middle_y + background_offsets[3])
+
     def __stop_drag(self, canvas):
+        # Le dernier mouvement en attente est appliqué tout de suite
+        if self.__redraw_id is not None:
+            canvas.after_cancel(self.__redraw_id)
+            self.__redraw_drag(canvas)
+
         self.__is_moving = False
 
         self.__start_x = None
@@ -199,14 +201,14 @@ class Server:
         canvas.tag_bind(tag, '<ButtonRelease-1>', lambda event: self.__stop_drag(canvas))
 
     def __create_sites_list_tag(self, canvas):
-        if len(self.__sites) == 0:
+        if len(self.sites) == 0:
             text = "Aucun site pour le moment"
         else:
-            text = "Liste des sites :\n" + "\n".join(["- " + site for site in self.__sites])
+            text = "Liste des sites :\n" + "\n".join(["- " + site for site in sorted(self.sites)])
 
         sites_tag = canvas.create_text(
-            self.__center_x + Server.half_side + 10 + Server.__sites_list_padding,
-            self.__center_y - Server.half_side + 15 + Server.__sites_list_padding,
+            self.center_x + Server.half_side + 10 + Server.__sites_list_padding,
+            self.center_y - Server.half_side + 15 + Server.__sites_list_padding,
             text=text,
             anchor='nw',
             fill="black"
@@ -235,19 +237,19 @@ class Server:
 
     def __draw_connection_line(self, canvas, neighbour, response_time):
         # La ligne entre les deux serveurs
-        line_tag = canvas.create_line(self.__center_x, self.__center_y,
-                                      neighbour.__center_x, neighbour.__center_y, width=1.5)
+        line_tag = canvas.create_line(self.center_x, self.center_y,
+                                      neighbour.center_x, neighbour.center_y, width=1.5)
         # Affichage du temps de réponse au milieu de la ligne
-        response_time_tag = canvas.create_text((self.__center_x + neighbour.__center_x) / 2,
-                                               (self.__center_y + neighbour.__center_y) / 2,
-                                               text=f"{response_time}", font=("Helvetica", 10, "bold"), fill="white")
-        bbox = canvas.bbox(response_time_tag)
-        background_tag = canvas.create_rectangle(bbox[0] - Server.__response_time_container_padding, bbox[1],
-                                                 bbox[2] + Server.__response_time_container_padding, bbox[3],
-                                                 fill="black", outline="white")
-
-        self.__line_tags.append((line_tag, response_time_tag, background_tag))
-        neighbour.__line_tags.append((line_tag, response_time_tag, background_tag))
+        response_time_tag = canvas.create_text((self.center_x + neighbour.center_x) / 2,
+                                               (self.center_y + neighbour.center_y) / 2,
+                                               text=self.__app.link_label(self, neighbour, response_time),
+                                               font=("Helvetica", 10, "bold"), fill="white")
+        background_tag = canvas.create_rectangle(0, 0, 0, 0, fill="black", outline="white")
+        # Partagée par les deux serveurs et modifiée sur place si le texte change
+        background_offsets = [0, 0, 0, 0]
+        self.__fit_background(canvas, neighbour, response_time_tag, background_tag, background_offsets)
+        self.__line_tags.append((neighbour, line_tag, response_time_tag, background_tag, background_offsets))
+        neighbour.__line_tags.append((self, line_tag, response_time_tag, background_tag, background_offsets))
 
         canvas.tag_raise(background_tag)
         canvas.tag_raise(response_time_tag)
@@ -256,16 +258,58 @@ class Server:
         canvas.tag_raise(neighbour.__tag)
         canvas.tag_raise(neighbour.__ip_address_tag)
 
-    def reset(self, canvas):
-        color = None
-        if self.__is_active is True:
-            color = "blue"
-        else:
-            color = "red"
-        canvas.itemconfig(self.__tag, fill=f"{color}")
-
-    def change_color(self, canvas):
-        canvas.itemconfig(self.__tag, fill="green")
+    def __fit_background(self, canvas, neighbour, response_time_tag, background_tag, background_offsets):
+        bbox = canvas.bbox(response_time_tag)
+        middle_x = (self.center_x + neighbour.center_x) / 2
+        middle_y = (self.center_y + neighbour.center_y) / 2
+        background_offsets[:] = (bbox[0] - Server.__response_time_container_padding - middle_x, bbox[1] - middle_y,
+                                 bbox[2] + Server.__response_time_container_padding - middle_x, bbox[3] - middle_y)
+        canvas.coords(background_tag,
+                      middle_x + background_offsets[0], middle_y + background_offsets[1],
+                      middle_x + background_offsets[2], middle_y + background_offsets[3])
+
+    # Réécrit le texte des liaisons dessinées (les latences variables changent avec l'heure affichée)
+    def refresh_link_labels(self, canvas):
+        response_times = dict(self.get_neighbours())
+        for neighbour, _, response_time_tag, background_tag, background_offsets in self.__line_tags:
+            canvas.itemconfig(response_time_tag,
+                              text=self.__app.link_label(self, neighbour, response_times[neighbour]))
+            self.__fit_background(canvas, neighbour, response_time_tag, background_tag, background_offsets)
+
+    # Remet leur couleur aux serveurs d'un chemin mis en évidence
+    @staticmethod
+    def reset_all(canvas):
+        canvas.itemconfig(f"{Server.__on_path_tag}&&{Server.__active_tag}", fill="blue")
+        canvas.itemconfig(f"{Server.__on_path_tag}&&{Server.__stopped_tag}", fill="red")
+        canvas.dtag(Server.__on_path_tag, Server.__on_path_tag)
+
+    def mark_on_path(self, canvas):
+        if self.is_drawn():
+            canvas.addtag_withtag(Server.__on_path_tag, self.__tag)
+
+    # Repeint en un seul appel les serveurs marqués par mark_on_path()
+    @staticmethod
+    def highlight_path(canvas):
+        canvas.itemconfig(f"{Server.__on_path_tag}&&{Server.__active_tag}", fill="green")
+
+    # Colorie la liaison vers neighbour (chemins principal et de secours) ; color=None rétablit son aspect d'origine
+    def color_link(self, neighbour, canvas, color=None):
+        for n, line_tag, _, _, _ in self.__line_tags:
+            if n is neighbour:
+                canvas.itemconfig(line_tag, fill="black" if color is None else color, width=1.5 if color is None else 4)
+
+    # Mise en évidence des serveurs sélectionnés au rectangle de sélection
+    def select(self, canvas):
+        if self.is_drawn():
+            canvas.itemconfig(self.__tag, width=3, outline="orange")
+
+    def unselect(self, canvas):
+        if self.is_drawn():
+            canvas.itemconfig(self.__tag, width=1, outline="black")
+
+    # Les serveurs d'une topologie importée ne sont dessinés qu'une fois visibles sur le canvas
+    def is_drawn(self):
+        return self.__tag is not None
 
     def draw(self, canvas):
         from tkinter import Canvas
@@ -274,21 +318,23 @@ class Server:
             raise TypeError("L'argument canvas doit être un objet de type Canvas du module tkinter")
 
         self.__tag = canvas.create_rectangle(
-            self.__center_x - Server.half_side,
-            self.__center_y - Server.half_side,
-            self.__center_x + Server.half_side,
-            self.__center_y + Server.half_side,
-            fill="blue"
+            self.center_x - Server.half_side,
+            self.center_y - Server.half_side,
+            self.center_x + Server.half_side,
+            self.center_y + Server.half_side,
+            fill="blue" if self.is_active() is True else "red",
+            tags=(Server.__active_tag if self.is_active() is True else Server.__stopped_tag,)
         )
         self.__ip_address_tag = canvas.create_text(
-            self.__center_x,
-            self.__center_y,
-            text=self.__ip_address,
+            self.center_x,
+            self.center_y,
+            text=self.ip_address,
             fill="white"
         )
 
         self.__bind_events(canvas, self.__tag)
         self.__bind_events(canvas, self.__ip_address_tag)
 
-    def __str__(self):
-        return self.__ip_address
+        for neighbour, response_time in self.get_neighbours():
+            if neighbour.is_drawn():
+                self.__draw_connection_line(canvas, neighbour, response_time)
@@ -0,0 +1,178 @@
+import heapq
+import itertools
+from collections import OrderedDict
+
+
+# Arbre des plus courts chemins depuis un point de départ, réparé localement (à la Ramalingam–Reps) lorsqu'un
+# serveur s'arrête, redémarre ou qu'une liaison est ajoutée, au lieu d'être recalculé entièrement
+class ShortestPathTree:
+    def __init__(self, root):
+        self.root = root
+
+        self.__distances = {}
+        self.__parents = {}
+        self.__children = {}
+        self.__counter = itertools.count()  # Départage les distances égales dans le tas
+
+        self.build()
+
+    def build(self):
+        self.__distances = {self.root: 0}
+        self.__parents = {self.root: None}
+        self.__children = {}
+        self.__propagate([(0, next(self.__counter), self.root)])
+
+    def distance(self, server):
+        return self.__distances.get(server, float("inf"))
+
+    # Dijkstra à partir des serveurs dont la distance vient de diminuer : seuls ceux qui en profitent sont visités
+    def __propagate(self, heap):
+        heapq.heapify(heap)
+        while heap:
+            distance, _, u = heapq.heappop(heap)
+            if distance > self.__distances.get(u, float("inf")) or u.is_active() is False:
+                continue
+
+            for v, w in u.get_neighbours():
+                if v.is_active() is True and distance + w < self.__distances.get(v, float("inf")):
+                    self.__distances[v] = distance + w
+                    self.__set_parent(v, u)
+                    heapq.heappush(heap, (distance + w, next(self.__counter), v))
+
+    def __set_parent(self, server, parent):
+        old_parent = self.__parents.get(server)
+        if old_parent is not None:
+            self.__children[old_parent].discard(server)
+
+        self.__parents[server] = parent
+        if parent is not None:
+            self.__children.setdefault(parent, set()).add(server)
+
+    # Retire du graphe le sous-arbre enraciné en server et renvoie les serveurs qui le composaient
+    def __detach_subtree(self, server):
+        self.__set_parent(server, None)
+
+        subtree = []
+        stack = [server]
+        while stack:
+            u = stack.pop()
+            subtree.append(u)
+            stack.extend(self.__children.pop(u, ()))
+            del self.__distances[u]
+            del self.__parents[u]
+
+        return subtree
+
+    # Meilleure distance d'un serveur d'après ses voisins encore présents dans l'arbre
+    def __best_parent(self, server):
+        best_distance, best_parent = float("inf"), None
+        for u, w in server.get_neighbours():
+            distance = self.__distances.get(u)
+            if distance is not None and u.is_active() is True and distance + w < best_distance:
+                best_distance, best_parent = distance + w, u
+
+        return best_distance, best_parent
+
+    def server_stopped(self, server):
+        if server not in self.__distances:
+            return
+
+        if server is self.root:
+            self.build()
+            return
+
+        # Seuls les serveurs qui passaient par le serveur arrêté perdent leur distance : on les raccroche au
+        # reste de l'arbre par leurs voisins non touchés, puis on propage
+        heap = []
+        for v in self.__detach_subtree(server):
+            if v is server:
+                continue
+
+            distance, parent = self.__best_parent(v)
+            if parent is not None:
+                self.__distances[v] = distance
+                self.__set_parent(v, parent)
+                heap.append((distance, next(self.__counter), v))
+
+        self.__propagate(heap)
+
+    def server_started(self, server):
+        if server is self.root:
+            self.build()
+            return
+
+        distance, parent = self.__best_parent(server)
+        if parent is not None and distance < self.distance(server):
+            self.__distances[server] = distance
+            self.__set_parent(server, parent)
+            self.__propagate([(distance, next(self.__counter), server)])
+
+    def link_added(self, server1, server2, response_time):
+        heap = []
+        for u, v in [(server1, server2), (server2, server1)]:
+            if u in self.__distances and u.is_active() is True and v.is_active() is True:
+                distance = self.__distances[u] + response_time
+                if distance < self.distance(v):
+                    self.__distances[v] = distance
+                    self.__set_parent(v, u)
+                    heap.append((distance, next(self.__counter), v))
+
+        self.__propagate(heap)
+
+    # Même résultat que la recherche par Dijkstra : le chemin va du serveur hébergeur jusqu'au point de départ
+    def shortest_path(self, hosting_servers):
+        destination_server = min(hosting_servers, key=self.distance, default=None)
+        if destination_server is None or self.distance(destination_server) == float("inf"):
+            return None
+
+        shortest_path = []
+        curr_server = destination_server
+        while curr_server is not None:
+            shortest_path.append(curr_server)
+            curr_server = self.__parents[curr_server]
+
+        return shortest_path
+
+
+# Arbres maintenus pour les derniers points de départ utilisés
+class ShortestPathTrees:
+    def __init__(self, max_trees=8):
+        if not isinstance(max_trees, int):
+            raise TypeError("max_trees doit être de type \"int\"")
+
+        if max_trees <= 0:
+            raise ValueError("max_trees doit être strictement positif")
+
+        self.max_trees = max_trees
+        self.__trees = OrderedDict()  # Point de départ -> arbre
+
+    def track(self, root):
+        tree = self.__trees.get(root)
+        if tree is None:
+            return self.add(ShortestPathTree(root))
+
+        self.__trees.move_to_end(root)
+        return tree
+
+    # Arbre construit ailleurs (dans le thread de recherche) sur l'état actuel du réseau
+    def add(self, tree):
+        self.__trees[tree.root] = tree
+        self.__trees.move_to_end(tree.root)
+        while len(self.__trees) > self.max_trees:
+            self.__trees.popitem(last=False)
+        return tree
+
+    def get(self, root):
+        return self.__trees.get(root)
+
+    def server_stopped(self, server):
+        for tree in self.__trees.values():
+            tree.server_stopped(server)
+
+    def server_started(self, server):
+        for tree in self.__trees.values():
+            tree.server_started(server)
+
+    def link_added(self, server1, server2, response_time):
+        for tree in self.__trees.values():
+            tree.link_added(server1, server2, response_time)
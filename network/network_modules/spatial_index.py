@@ -0,0 +1,77 @@
+import math
+
+
+# Grille uniforme sur les centres des serveurs : chaque cellule mesure la largeur d'un serveur, un point du
+# canvas ne peut donc tomber que sur les serveurs des 4 cellules qui l'entourent
+class SpatialIndex:
+    def __init__(self, half_side):
+        if not isinstance(half_side, int):
+            raise TypeError("half_side doit être de type \"int\"")
+
+        if half_side <= 0:
+            raise ValueError("half_side doit être strictement positif")
+
+        self.half_side = half_side
+        self.__cell_size = 2 * half_side
+        self.__cells = {}  # (colonne, ligne) -> ensemble des serveurs dont le centre est dans la cellule
+        self.__cell_of = {}  # Serveur -> sa cellule actuelle
+
+    def __cell(self, x, y):
+        return math.floor(x / self.__cell_size), math.floor(y / self.__cell_size)
+
+    def insert(self, server):
+        cell = self.__cell(server.center_x, server.center_y)
+        self.__cells.setdefault(cell, set()).add(server)
+        self.__cell_of[server] = cell
+
+    def remove(self, server):
+        cell = self.__cell_of.pop(server, None)
+        if cell is None:
+            return
+
+        servers = self.__cells[cell]
+        servers.discard(server)
+        if len(servers) == 0:
+            del self.__cells[cell]
+
+    # À appeler après chaque déplacement d'un serveur
+    def move(self, server):
+        if self.__cell_of.get(server) != self.__cell(server.center_x, server.center_y):
+            self.remove(server)
+            self.insert(server)
+
+    def __servers_in_cells(self, x1, y1, x2, y2):
+        column1, row1 = self.__cell(x1, y1)
+        column2, row2 = self.__cell(x2, y2)
+        for column in range(column1, column2 + 1):
+            for row in range(row1, row2 + 1):
+                yield from self.__cells.get((column, row), ())
+
+    # Serveurs dont le carré contient le point (x, y)
+    def query_point(self, x, y):
+        h = self.half_side
+        return [s for s in self.__servers_in_cells(x - h, y - h, x + h, y + h)
+                if abs(s.center_x - x) <= h and abs(s.center_y - y) <= h]
+
+    def find(self, x, y):
+        servers = self.query_point(x, y)
+        return servers[0] if len(servers) > 0 else None
+
+    # Serveurs dont le centre est dans le rectangle (utilisé pour la sélection à la souris)
+    def query_rectangle(self, x1, y1, x2, y2):
+        x1, x2 = min(x1, x2), max(x1, x2)
+        y1, y2 = min(y1, y2), max(y1, y2)
+        return [s for s in self.__servers_in_cells(x1, y1, x2, y2)
+                if x1 <= s.center_x <= x2 and y1 <= s.center_y <= y2]
+
+    # Vérifie si un serveur centré en (x, y) chevaucherait un serveur existant
+    def overlaps(self, x, y, ignored_server=None):
+        side = 2 * self.half_side
+        for s in self.__servers_in_cells(x - side, y - side, x + side, y + side):
+            if s is not ignored_server and abs(s.center_x - x) < side and abs(s.center_y - y) < side:
+                return True
+
+        return False
+
+    def __len__(self):
+        return len(self.__cell_of)
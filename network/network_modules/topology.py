@@ -0,0 +1,335 @@
+import ipaddress
+import itertools
+import json
+import struct
+import sys
+from array import array
+
+from network_modules.compact_graph import CompactGraph
+from network_modules.network import Network, Node
+
+# Format binaire (petit-boutiste) :
+#   en-tête : MAGIC, puis nombre de serveurs, de liaisons et de domaines distincts (3 x uint64)
+#   serveurs : adresses IP (uint32), center_x (int32), center_y (int32), actif (1 octet) ; un tableau par champ
+#   domaines : longueurs (uint32) puis noms UTF-8 concaténés
+#   sites : offsets (uint64, un de plus que de serveurs) puis identifiants de domaines (uint32), au format CSR
+#   liaisons : indices des deux serveurs (uint32) puis temps de réponse (int32) ; un tableau par champ
+MAGIC = b"NETTOPO\x01"
+_HEADER = struct.Struct("<QQQ")
+
+# Format JSON, plus lisible mais plus lent :
+# {
+#     "servers": [{"ip_address": "192.168.1.1", "center_x": 90, "center_y": 80, "sites": ["wikipedia.org"],
+#                  "active": true}, ...],
+#     "links": [["192.168.1.1", "192.168.1.2", 5], ...]
+# }
+
+
+# Topologie complète d'un réseau sous forme de tableaux typés, indépendante de Network et de l'affichage. Les
+# serveurs sont désignés par leur indice, dans l'ordre du fichier.
+class Topology:
+    batch_size = 10000  # Nombre d'enregistrements validés à la fois
+
+    def __init__(self, ip_addresses, centers_x, centers_y, active, domains, sites_offsets, sites_domains,
+                 links_sources, links_targets, links_response_times):
+        self.ip_addresses = ip_addresses  # array("I") d'adresses IPv4 empaquetées
+        self.centers_x = centers_x
+        self.centers_y = centers_y
+        self.active = active  # bytearray, 1 si le serveur est actif
+        self.domains = domains  # Liste des domaines distincts
+        self.sites_offsets = sites_offsets  # Les sites du serveur i sont sites_domains[offsets[i]:offsets[i + 1]]
+        self.sites_domains = sites_domains
+        self.links_sources = links_sources
+        self.links_targets = links_targets
+        self.links_response_times = links_response_times
+
+    def __len__(self):
+        return len(self.ip_addresses)
+
+    @property
+    def links_count(self):
+        return len(self.links_sources)
+
+    def ip_address(self, index):
+        return str(ipaddress.IPv4Address(self.ip_addresses[index]))
+
+    def get_sites(self, index):
+        return [self.domains[d] for d in self.sites_domains[self.sites_offsets[index]:self.sites_offsets[index + 1]]]
+
+    def get_links(self):
+        return zip(self.links_sources, self.links_targets, self.links_response_times)
+
+    def get_extent(self):
+        if len(self) == 0:
+            return 0, 0
+        return max(self.centers_x), max(self.centers_y)
+
+    # Validation par lots : chaque contrôle parcourt un tableau entier d'un coup au lieu d'un champ à la fois
+    def validate(self):
+        n = len(self.ip_addresses)
+        for name, values in [("center_x", self.centers_x), ("center_y", self.centers_y), ("actif", self.active)]:
+            if len(values) != n:
+                raise ValueError("Le champ {} doit avoir une valeur par serveur".format(name))
+
+        if len(self.sites_offsets) != n + 1 or (n > 0 and self.sites_offsets[n] != len(self.sites_domains)):
+            raise ValueError("Les offsets des sites ne correspondent pas au nombre de serveurs")
+
+        for start in range(0, n, Topology.batch_size):
+            end = min(start + Topology.batch_size, n)
+            if min(self.centers_x[start:end]) < 0 or min(self.centers_y[start:end]) < 0:
+                index = next(i for i in range(start, end) if self.centers_x[i] < 0 or self.centers_y[i] < 0)
+                raise ValueError("Le serveur {} a des coordonnées négatives".format(self.ip_address(index)))
+
+        if len(set(self.ip_addresses)) != n:
+            seen = set()
+            for i, ip_address in enumerate(self.ip_addresses):
+                if ip_address in seen:
+                    raise ValueError("Un serveur possède déjà l'adresse IP {}".format(self.ip_address(i)))
+                seen.add(ip_address)
+
+        if len(self.sites_domains) > 0 and max(self.sites_domains) >= len(self.domains):
+            raise ValueError("Un site fait référence à un domaine inconnu")
+
+        m = len(self.links_sources)
+        if len(self.links_targets) != m or len(self.links_response_times) != m:
+            raise ValueError("Chaque liaison doit avoir deux serveurs et un temps de réponse")
+
+        links = set()
+        for start in range(0, m, Topology.batch_size):
+            end = min(start + Topology.batch_size, m)
+            if max(self.links_sources[start:end]) >= n or max(self.links_targets[start:end]) >= n:
+                raise ValueError("Une liaison fait référence à un serveur inconnu")
+            if min(self.links_response_times[start:end]) <= 0:
+                raise ValueError("Le temps de réponse ne peut pas être négatif ou nul")
+
+            for u, v in zip(self.links_sources[start:end], self.links_targets[start:end]):
+                if u == v:
+                    raise ValueError("Le serveur {} ne peut pas être relié à lui-même".format(self.ip_address(u)))
+
+                link = (u, v) if u < v else (v, u)
+                if link in links:
+                    raise ValueError("Les serveurs {} et {} sont déjà des voisins".format(self.ip_address(u),
+                                                                                         self.ip_address(v)))
+                links.add(link)
+
+    @classmethod
+    def from_records(cls, servers_records, links_records):
+        ip_addresses, centers_x, centers_y, active = array("I"), array("i"), array("i"), bytearray()
+        domains, domain_ids = [], {}
+        sites_offsets, sites_domains = array("Q", [0]), array("I")
+        indexes = {}
+
+        servers_records = iter(servers_records)
+        while True:
+            batch = list(itertools.islice(servers_records, Topology.batch_size))
+            if not batch:
+                break
+
+            for record in batch:
+                try:
+                    packed_ip_address = CompactGraph.pack_ip_address(record["ip_address"])
+                    center_x = record.get("center_x", 0)
+                    center_y = record.get("center_y", 0)
+                    if not isinstance(center_x, int) or not isinstance(center_y, int):
+                        raise TypeError("Les coordonnées doivent être de type \"int\"")
+                    sites = record.get("sites", [])
+                    if not isinstance(sites, list) or not all(isinstance(site, str) for site in sites):
+                        raise TypeError("Les sites doivent être une liste de chaînes de caractères")
+                except (KeyError, AttributeError, TypeError, ValueError) as e:
+                    raise ValueError("Serveur n°{} invalide : {}".format(len(ip_addresses) + 1, e))
+
+                indexes[record["ip_address"].strip()] = len(ip_addresses)
+                ip_addresses.append(packed_ip_address)
+                centers_x.append(center_x)
+                centers_y.append(center_y)
+                active.append(0 if record.get("active", True) is False else 1)
+
+                for site in sites:
+                    domain_id = domain_ids.get(site)
+                    if domain_id is None:
+                        domain_id = domain_ids[site] = len(domains)
+                        domains.append(site)
+                    sites_domains.append(domain_id)
+                sites_offsets.append(len(sites_domains))
+
+        links_sources, links_targets, links_response_times = array("I"), array("I"), array("i")
+        for ip_address1, ip_address2, response_time in links_records:
+            if ip_address1 not in indexes or ip_address2 not in indexes:
+                raise ValueError("La liaison {} - {} fait référence à un serveur inconnu".format(ip_address1,
+                                                                                                ip_address2))
+            if not isinstance(response_time, int):
+                raise TypeError("Le temps de réponse doit être un nombre entier")
+
+            links_sources.append(indexes[ip_address1])
+            links_targets.append(indexes[ip_address2])
+            links_response_times.append(response_time)
+
+        topology = cls(ip_addresses, centers_x, centers_y, active, domains, sites_offsets, sites_domains,
+                       links_sources, links_targets, links_response_times)
+        topology.validate()
+        return topology
+
+    @classmethod
+    def from_network(cls, network):
+        indexes = {server: i for i, server in enumerate(network.servers)}
+
+        servers_records = ({
+            "ip_address": server.ip_address,
+            "center_x": server.center_x,
+            "center_y": server.center_y,
+            "sites": sorted(server.sites),
+            "active": server.is_active()
+        } for server in network.servers)
+        # Chaque liaison est stockée des deux côtés : on ne la garde qu'une fois
+        links_records = ((server.ip_address, neighbour.ip_address, response_time)
+                         for server in network.servers
+                         for neighbour, response_time in server.get_neighbours()
+                         if indexes[server] < indexes[neighbour])
+
+        return cls.from_records(servers_records, links_records)
+
+    def to_dict(self):
+        return {
+            "servers": [{
+                "ip_address": self.ip_address(i),
+                "center_x": self.centers_x[i],
+                "center_y": self.centers_y[i],
+                "sites": self.get_sites(i),
+                "active": self.active[i] == 1
+            } for i in range(len(self))],
+            "links": [[self.ip_address(u), self.ip_address(v), w] for u, v, w in self.get_links()]
+        }
+
+    # Construit le réseau ; server_factory(network, ip_address, center_x, center_y) permet de créer des Server
+    # au lieu de simples Node. Les données ayant été validées par lots, les liaisons sont ajoutées au niveau du
+    # modèle, sans rien dessiner.
+    def to_network(self, network=None, server_factory=None):
+        network = Network() if network is None else network
+        if server_factory is None:
+            server_factory = Node
+
+        servers = []
+        for i in range(len(self)):
+            server = server_factory(network, self.ip_address(i), self.centers_x[i], self.centers_y[i])
+            network.add_server(server)
+            sites = self.get_sites(i)
+            if len(sites) > 0:
+                server.sites = ";".join(sites)
+            servers.append(server)
+
+        for u, v, response_time in self.get_links():
+            Node.add_neighbour(servers[u], servers[v], response_time)
+
+        # Les serveurs ne sont arrêtés qu'une fois le réseau entièrement construit
+        for i, server in enumerate(servers):
+            if self.active[i] == 0:
+                Node.stop(server)
+
+        return network
+
+    def to_compact_graph(self):
+        return CompactGraph(self.ip_addresses, self.links_sources, self.links_targets, self.links_response_times,
+                            ((i, self.get_sites(i)) for i in range(len(self))), self.active)
+
+
+def _to_little_endian(values):
+    if sys.byteorder == "big":
+        values = array(values.typecode, values)
+        values.byteswap()
+    return values
+
+
+def _read_array(file, typecode, count):
+    values = array(typecode)
+    values.frombytes(file.read(values.itemsize * count))
+    if len(values) != count:
+        raise ValueError("Le fichier de topologie est tronqué")
+
+    if sys.byteorder == "big":
+        values.byteswap()
+    return values
+
+
+def write_binary(topology, file):
+    encoded_domains = [domain.encode("utf-8") for domain in topology.domains]
+
+    file.write(MAGIC)
+    file.write(_HEADER.pack(len(topology), topology.links_count, len(encoded_domains)))
+    for values in [topology.ip_addresses, topology.centers_x, topology.centers_y]:
+        file.write(_to_little_endian(values).tobytes())
+    file.write(bytes(topology.active))
+    file.write(_to_little_endian(array("I", [len(domain) for domain in encoded_domains])).tobytes())
+    file.write(b"".join(encoded_domains))
+    for values in [topology.sites_offsets, topology.sites_domains, topology.links_sources, topology.links_targets,
+                   topology.links_response_times]:
+        file.write(_to_little_endian(values).tobytes())
+
+
+def read_binary(file):
+    if file.read(len(MAGIC)) != MAGIC:
+        raise ValueError("Le fichier n'est pas une topologie binaire")
+
+    header = file.read(_HEADER.size)
+    if len(header) != _HEADER.size:
+        raise ValueError("Le fichier de topologie est tronqué")
+    n, m, domains_count = _HEADER.unpack(header)
+
+    ip_addresses = _read_array(file, "I", n)
+    centers_x = _read_array(file, "i", n)
+    centers_y = _read_array(file, "i", n)
+    active = bytearray(file.read(n))
+
+    domains_lengths = _read_array(file, "I", domains_count)
+    blob = file.read(sum(domains_lengths))
+    domains = []
+    position = 0
+    for length in domains_lengths:
+        domains.append(blob[position:position + length].decode("utf-8"))
+        position += length
+
+    sites_offsets = _read_array(file, "Q", n + 1)
+    sites_domains = _read_array(file, "I", sites_offsets[n])
+    links_sources = _read_array(file, "I", m)
+    links_targets = _read_array(file, "I", m)
+    links_response_times = _read_array(file, "i", m)
+
+    topology = Topology(ip_addresses, centers_x, centers_y, active, domains, sites_offsets, sites_domains,
+                        links_sources, links_targets, links_response_times)
+    topology.validate()
+    return topology
+
+
+def read_topology(path):
+    with open(path, "rb") as file:
+        if file.read(len(MAGIC)) == MAGIC:
+            file.seek(0)
+            return read_binary(file)
+
+    with open(path, encoding="utf-8") as file:
+        data = json.load(file)
+
+    if not isinstance(data, dict):
+        raise TypeError("La topologie doit être un objet JSON")
+    return Topology.from_records(data.get("servers", []), data.get("links", []))
+
+
+# Le format est choisi d'après l'extension : JSON pour ".json", binaire sinon
+def write_topology(topology, path):
+    if path.lower().endswith(".json"):
+        with open(path, "w", encoding="utf-8") as file:
+            json.dump(topology.to_dict(), file, ensure_ascii=False)
+    else:
+        with open(path, "wb") as file:
+            write_binary(topology, file)
+
+
+def save_topology(network, path):
+    write_topology(Topology.from_network(network), path)
+
+
+def load_topology(path):
+    return read_topology(path).to_network()
+
+
+def load_compact_topology(path):
+    return read_topology(path).to_compact_graph()
@@ -0,0 +1,216 @@
+import heapq
+import math
+import random
+
+from network_modules.network import Route
+
+
+# Flux de requêtes d'un point de départ vers un domaine, à raison de rate requêtes par unité de temps en moyenne
+# (arrivées de Poisson)
+class Flow:
+    def __init__(self, starting_point, domain, rate):
+        if not isinstance(domain, str) or not domain.strip():
+            raise ValueError("Le domaine d'un flux ne peut pas être vide")
+
+        if not isinstance(rate, (int, float)) or rate <= 0:
+            raise ValueError("Le débit d'un flux doit être strictement positif")
+
+        self.starting_point = starting_point
+        self.domain = domain.strip()
+        self.rate = rate
+
+
+class SimulationReport:
+    def __init__(self, duration, injected, completed, dropped, failed, latencies, link_loads, server_busy_times):
+        self.duration = duration
+        self.injected = injected
+        self.completed = completed
+        self.dropped = dropped  # Requêtes rejetées par un serveur dont la file était pleine
+        self.failed = failed  # Requêtes dont le domaine n'est pas hébergé ou pas accessible
+        self.latencies = latencies  # Triées par ordre croissant
+        self.link_loads = link_loads  # (ip1, ip2) -> nombre de requêtes ayant emprunté la liaison
+        self.server_busy_times = server_busy_times  # ip -> temps total passé à traiter des requêtes
+
+    @property
+    def throughput(self):
+        return self.completed / self.duration if self.duration > 0 else 0.0
+
+    def latency_percentile(self, percentile):
+        if len(self.latencies) == 0:
+            return None
+
+        rank = max(1, math.ceil(percentile / 100 * len(self.latencies)))
+        return self.latencies[rank - 1]
+
+    def hot_links(self, count=10):
+        return sorted(self.link_loads.items(), key=lambda item: item[1], reverse=True)[:count]
+
+    def to_dict(self, hot_links_count=10):
+        return {
+            "duration": self.duration,
+            "injected": self.injected,
+            "completed": self.completed,
+            "dropped": self.dropped,
+            "failed": self.failed,
+            "throughput": self.throughput,
+            "latency": {f"p{p}": self.latency_percentile(p) for p in [50, 90, 99, 100]},
+            "hot_links": [{"servers": list(link), "requests": load} for link, load in self.hot_links(hot_links_count)],
+            "utilization": {ip_address: busy_time / self.duration if self.duration > 0 else 0.0
+                            for ip_address, busy_time in self.server_busy_times.items()}
+        }
+
+
+# Simulation à événements discrets du trafic : les requêtes suivent le plus court chemin vers un serveur qui
+# héberge le domaine, les temps de réponse des liaisons servant de latence. Chaque serveur traite les requêtes
+# une à une (file FIFO) en service_time unités de temps, avec au plus queue_limit requêtes en attente ou en cours.
+class TrafficSimulation:
+    def __init__(self, network, service_time=1.0, queue_limit=100, seed=None):
+        if service_time < 0:
+            raise ValueError("Le temps de traitement ne peut pas être négatif")
+
+        if not isinstance(queue_limit, int) or queue_limit <= 0:
+            raise ValueError("La taille des files doit être un entier strictement positif")
+
+        self.network = network
+        self.service_time = service_time
+        self.queue_limit = queue_limit
+        self.flows = []
+        self.__capacities = {}  # Serveur -> (temps de traitement, taille de la file)
+        self.__random = random.Random(seed)
+
+    def set_capacity(self, server, service_time, queue_limit):
+        if service_time < 0:
+            raise ValueError("Le temps de traitement ne peut pas être négatif")
+
+        if not isinstance(queue_limit, int) or queue_limit <= 0:
+            raise ValueError("La taille des files doit être un entier strictement positif")
+
+        self.__capacities[server] = (service_time, queue_limit)
+
+    def add_flow(self, starting_point, domain, rate):
+        flow = Flow(starting_point, domain, rate)
+        self.flows.append(flow)
+        return flow
+
+    # Chemin (dans le sens du parcours) et latence de chaque saut, ou None si le domaine est inaccessible
+    def __route(self, flow):
+        route = self.network.search(flow.starting_point, flow.domain)
+        if route.status != Route.FOUND:
+            return None
+
+        path = route.path[::-1]
+        latencies = []
+        for u, v in zip(path, path[1:]):
+            latencies.append(min(w for neighbour, w in u.get_neighbours() if neighbour is v))
+        return path, latencies
+
+    def run(self, duration):
+        if duration <= 0:
+            raise ValueError("La durée de la simulation doit être strictement positive")
+
+        servers = {}  # Serveur -> indice dans les tableaux ci-dessous
+        routes = []  # Par flux : (indices des serveurs du chemin, latences) ou None
+        for flow in self.flows:
+            route = self.__route(flow)
+            if route is not None:
+                route = ([servers.setdefault(server, len(servers)) for server in route[0]], route[1])
+            routes.append(route)
+
+        indexed_servers = list(servers)
+        service_times = []
+        drop_thresholds = []
+        for server in indexed_servers:
+            service_time, queue_limit = self.__capacities.get(server, (self.service_time, self.queue_limit))
+            service_times.append(service_time)
+            # Le traitement étant FIFO et de durée fixe, un serveur occupé jusqu'à busy_until a
+            # ceil((busy_until - now) / service_time) requêtes en attente ou en cours : sa file est pleine dès que le
+            # travail restant dépasse (queue_limit - 1) traitements. Aucun événement de fin de traitement n'est
+            # donc nécessaire, la requête est directement envoyée au saut suivant.
+            drop_thresholds.append((queue_limit - 1) * service_time * (1 + 1e-9))
+        busy_until = [0.0] * len(indexed_servers)
+        busy_times = [0.0] * len(indexed_servers)
+
+        # Passages sur chaque saut de chaque flux, regroupés par liaison à la fin de la simulation
+        hops_offsets = []
+        hops_count = 0
+        for route in routes:
+            hops_offsets.append(hops_count)
+            hops_count += len(route[0]) if route is not None else 0
+        hops_loads = [0] * hops_count
+
+        rng = self.__random
+        requests_flows = []
+        requests_starts = []
+        latencies = []
+        injected = dropped = failed = 0
+
+        # Événements : (date, code). Une requête n'ayant qu'un événement en attente, code = requête * stride + saut
+        # est unique et sert aussi à départager les dates égales ; une injection pour le flux i est notée -1 - i.
+        stride = max([len(route[0]) for route in routes if route is not None], default=1)
+        rates = [flow.rate for flow in self.flows]
+        heap = [(rng.expovariate(flow.rate), -1 - flow_index) for flow_index, flow in enumerate(self.flows)]
+        heapq.heapify(heap)
+
+        # Boucle principale : les variables locales évitent les recherches d'attributs dans le chemin critique
+        heappush, heappop, expovariate = heapq.heappush, heapq.heappop, rng.expovariate
+        while heap:
+            now, code = heappop(heap)
+            if now > duration:
+                break
+
+            if code < 0:
+                flow_index = -1 - code
+                heappush(heap, (now + expovariate(rates[flow_index]), code))
+                injected += 1
+                if routes[flow_index] is None:
+                    failed += 1
+                    continue
+
+                # La requête arrive aussitôt sur son point de départ
+                request = len(requests_flows)
+                requests_flows.append(flow_index)
+                requests_starts.append(now)
+                hop = 0
+            else:
+                request, hop = divmod(code, stride)
+                flow_index = requests_flows[request]
+                hops_loads[hops_offsets[flow_index] + hop] += 1
+
+            path, hop_latencies = routes[flow_index]
+            server = path[hop]
+            end = busy_until[server]
+            if end > now:
+                if end - now > drop_thresholds[server]:
+                    dropped += 1
+                    continue
+                end += service_times[server]
+            else:
+                end = now + service_times[server]
+            busy_until[server] = end
+            busy_times[server] += service_times[server]
+
+            if hop == len(path) - 1:
+                if end <= duration:
+                    latencies.append(end - requests_starts[request])
+            else:
+                heappush(heap, (end + hop_latencies[hop], code + 1 if hop > 0 else request * stride + 1))
+
+        link_loads = {}
+        for flow_index, route in enumerate(routes):
+            if route is None:
+                continue
+            path = route[0]
+            for hop in range(1, len(path)):
+                load = hops_loads[hops_offsets[flow_index] + hop]
+                if load > 0:
+                    # Les deux sens d'une liaison sont cumulés
+                    link = (path[hop - 1], path[hop]) if path[hop - 1] < path[hop] else (path[hop], path[hop - 1])
+                    link_loads[link] = link_loads.get(link, 0) + load
+
+        latencies.sort()
+        loads_by_ip = {}
+        for (u, v), load in link_loads.items():
+            loads_by_ip[(indexed_servers[u].ip_address, indexed_servers[v].ip_address)] = load
+
+        return SimulationReport(duration, injected, len(latencies), dropped, failed, latencies, loads_by_ip,
+                                {server.ip_address: busy_times[i] for i, server in enumerate(indexed_servers)})
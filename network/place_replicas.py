@@ -0,0 +1,72 @@
+import argparse
+import json
+import sys
+import time
+
+from network_modules.replica_placement import MEAN, P99, ReplicaPlacement, placed_topology
+from network_modules.topology import read_topology, write_topology
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Choisit les serveurs qui hébergent chaque domaine pour minimiser le temps de réponse moyen ou "
+                    "le 99e centile d'une demande. Chaque ligne du fichier des requêtes est un objet JSON "
+                    "{\"starting_ip\": ..., \"domain\": ..., \"weight\": ...} (poids facultatif, 1 par défaut) ; "
+                    "sans fichier, des requêtes sont tirées au hasard. Le rapport JSON donne, pour chaque domaine, "
+                    "les serveurs choisis et le temps de réponse obtenu, comparé à celui des serveurs actuels. Le "
+                    "bouton \"Répliques\" applique ce rapport au réseau affiché.")
+    parser.add_argument("topology", help="Fichier de topologie à charger")
+    parser.add_argument("queries", nargs="?", help="Fichier JSONL des requêtes (\"-\" pour stdin)")
+    parser.add_argument("-k", "--replicas", type=int, default=3, help="Nombre de réplicas par domaine")
+    parser.add_argument("--budgets", help="Fichier JSON {domaine: nombre de réplicas} pour certains domaines")
+    parser.add_argument("--objective", choices=[MEAN, P99], default=MEAN,
+                        help="Temps de réponse moyen ou 99e centile de la demande")
+    parser.add_argument("-n", "--sample-queries", type=int, default=1000,
+                        help="Nombre de requêtes tirées au hasard en l'absence de fichier")
+    parser.add_argument("-w", "--workers", type=int, default=1, help="Nombre de processus")
+    parser.add_argument("-c", "--chunk-size", type=int, default=16,
+                        help="Nombre de points de départ, puis de domaines, par paquet")
+    parser.add_argument("--seed", type=int, default=None, help="Graine des requêtes tirées")
+    parser.add_argument("--apply", help="Enregistre la topologie dont les sites suivent le placement")
+    args = parser.parse_args()
+
+    topology = read_topology(args.topology)
+    try:
+        placement = ReplicaPlacement(topology, args.objective, args.replicas)
+    except (RuntimeError, ValueError) as e:
+        parser.error(str(e))
+
+    if args.budgets is not None:
+        with open(args.budgets, encoding="utf-8") as budgets_file:
+            for domain, replicas in json.load(budgets_file).items():
+                try:
+                    placement.set_budget(domain, replicas)
+                except ValueError as e:
+                    parser.error("{} : {}".format(domain, e))
+
+    if args.queries is None:
+        placement.sample_demand(args.sample_queries, args.seed)
+    else:
+        queries_file = sys.stdin if args.queries == "-" else open(args.queries, encoding="utf-8")
+        try:
+            for line_number, line in enumerate(queries_file, 1):
+                if not line.strip():
+                    continue
+
+                query = json.loads(line)
+                try:
+                    placement.add_demand(query.get("starting_ip"), query.get("domain"), query.get("weight", 1))
+                except ValueError as e:
+                    parser.error("ligne {} : {}".format(line_number, e))
+        finally:
+            if queries_file is not sys.stdin:
+                queries_file.close()
+
+    start = time.perf_counter()
+    report = placement.run(args.workers, args.chunk_size)
+    print("{} domaines placés en {:.1f} s".format(len(report.placement), time.perf_counter() - start),
+          file=sys.stderr)
+    if args.apply is not None:
+        write_topology(placed_topology(topology, report.placement), args.apply)
+    json.dump(report.to_dict(), sys.stdout, indent=2)
+    sys.stdout.write("\n")
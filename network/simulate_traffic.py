@@ -0,0 +1,45 @@
+import argparse
+import json
+import sys
+
+from network_modules.topology import load_topology
+from network_modules.traffic_simulation import TrafficSimulation
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Simule le trafic sur une topologie sans interface graphique. Chaque ligne du fichier des flux "
+                    "est un objet JSON {\"starting_ip\": ..., \"domain\": ..., \"rate\": ...} (requêtes par unité "
+                    "de temps) ; le rapport (débit, percentiles de latence, liaisons les plus chargées) est écrit "
+                    "en JSON.")
+    parser.add_argument("topology", help="Fichier de topologie à charger")
+    parser.add_argument("flows", nargs="?", default="-", help="Fichier JSONL des flux (\"-\" pour stdin)")
+    parser.add_argument("-d", "--duration", type=float, default=1000.0, help="Durée simulée")
+    parser.add_argument("-s", "--service-time", type=float, default=1.0,
+                        help="Temps de traitement d'une requête par un serveur")
+    parser.add_argument("-q", "--queue-limit", type=int, default=100,
+                        help="Nombre maximal de requêtes en attente ou en cours sur un serveur")
+    parser.add_argument("--seed", type=int, default=None, help="Graine du générateur aléatoire")
+    parser.add_argument("--hot-links", type=int, default=10, help="Nombre de liaisons chargées à afficher")
+    args = parser.parse_args()
+
+    network = load_topology(args.topology)
+    simulation = TrafficSimulation(network, args.service_time, args.queue_limit, args.seed)
+
+    flows_file = sys.stdin if args.flows == "-" else open(args.flows, encoding="utf-8")
+    try:
+        for line_number, line in enumerate(flows_file, 1):
+            if not line.strip():
+                continue
+
+            flow = json.loads(line)
+            starting_point = network.get_server(flow.get("starting_ip"))
+            if starting_point is None:
+                parser.error("ligne {} : le serveur {} est inconnu".format(line_number, flow.get("starting_ip")))
+            simulation.add_flow(starting_point, flow.get("domain"), flow.get("rate"))
+    finally:
+        if flows_file is not sys.stdin:
+            flows_file.close()
+
+    json.dump(simulation.run(args.duration).to_dict(args.hot_links), sys.stdout, indent=2)
+    sys.stdout.write("\n")
@@ -0,0 +1,159 @@
+import random
+
+import pytest
+
+from network_modules.backup_paths import BackupPaths
+from network_modules.contraction_hierarchy import ContractionHierarchy
+from network_modules.generators import generate
+from network_modules.network import Network, Route
+from network_modules.route_cache import RouteCache
+
+# Chaque moteur de recherche (arbres réparés, tables de routage, hiérarchie de contraction, ALT, chemins de
+# secours) doit trouver la même longueur que Dijkstra après une suite aléatoire d'arrêts, de redémarrages, d'ajouts
+# de liaisons et de changements de sites
+
+SEEDS = range(6)
+SERVERS_COUNT = 60
+OPERATIONS_COUNT = 120
+
+
+def make_network(seed):
+    topology = generate("random-geometric", SERVERS_COUNT, seed=seed, domains_count=12)
+    return topology.to_network(Network()), list(topology.domains)
+
+
+# Arrête ou redémarre un serveur, ajoute une liaison, ajoute ou retire un site
+def random_operation(network, domains, rng):
+    server = rng.choice(network.servers)
+    operation = rng.randrange(5)
+    if operation == 0:
+        server.stop()
+    elif operation == 1:
+        server.start()
+    elif operation == 2:
+        neighbour = rng.choice(network.servers)
+        if neighbour is not server and all(n is not neighbour for n, _ in server.get_neighbours()):
+            server.add_neighbour(neighbour, rng.randint(1, 50))
+    elif operation == 3:
+        server.sites = rng.choice(domains)
+    elif len(server.sites) > 0:
+        server.remove_sites(rng.choice(sorted(server.sites)))
+
+
+def operations(network, domains, seed):
+    rng = random.Random(seed)
+    for _ in range(OPERATIONS_COUNT):
+        random_operation(network, domains, rng)
+        yield rng
+
+
+def reference_distance(network, starting_point, domain):
+    destination_server, _, distances = Network.dijkstra(starting_point, set(network.get_hosting_servers(domain)))
+    return None if destination_server is None else distances[destination_server]
+
+
+# Le chemin va d'un serveur hébergeur actif jusqu'au point de départ par des liaisons existantes, et sa longueur
+# est bien celle annoncée
+def check_path(network, starting_point, domain, path, response_time):
+    assert path[-1] is starting_point
+    assert path[0] in network.get_hosting_servers(domain)
+    assert all(server.is_active() is True for server in path)
+    assert sum(min(w for v, w in u.get_neighbours() if v is next_server)
+               for u, next_server in zip(path, path[1:])) == response_time
+
+
+def check_route(network, starting_point, domain, route):
+    expected = reference_distance(network, starting_point, domain)
+    if expected is None:
+        assert route.status in [Route.NOT_HOSTED, Route.UNREACHABLE]
+    else:
+        assert route.status == Route.FOUND
+        assert route.response_time == expected
+        check_path(network, starting_point, domain, route.path, route.response_time)
+
+
+def active_servers(network, rng, count):
+    servers = [server for server in network.servers if server.is_active() is True]
+    return rng.sample(servers, min(count, len(servers)))
+
+
+@pytest.mark.parametrize("seed", SEEDS)
+def test_shortest_path_trees(seed):
+    network, domains = make_network(seed)
+    roots = network.servers[:4]
+    for root in roots:
+        network.track_starting_point(root)
+
+    for _ in operations(network, domains, seed):
+        for root in roots:
+            if root.is_active() is True:
+                for domain in domains:
+                    check_route(network, root, domain, network.find_route(root, domain))
+
+
+@pytest.mark.parametrize("seed", SEEDS)
+def test_routing_tables(seed):
+    network, domains = make_network(seed)
+    for rng in operations(network, domains, seed):
+        for starting_point in active_servers(network, rng, 3):
+            for domain in domains:
+                check_route(network, starting_point, domain, network.find_route(starting_point, domain, True))
+
+
+# La hiérarchie est abandonnée à chaque nouvelle liaison : elle est alors reconstruite
+@pytest.mark.parametrize("seed", SEEDS)
+def test_contraction_hierarchy(seed):
+    network, domains = make_network(seed)
+    for rng in operations(network, domains, seed):
+        if network.contraction_hierarchy is None:
+            network.contraction_hierarchy = ContractionHierarchy.build(network)
+
+        for starting_point in active_servers(network, rng, 3):
+            for domain in domains:
+                hosting_servers = network.connectivity.reachable_servers(starting_point,
+                                                                         network.get_hosting_servers(domain))
+                result = network.contraction_hierarchy.shortest_path(starting_point, hosting_servers)
+                if result is not None and result[0] is not None:
+                    assert result[1] == reference_distance(network, starting_point, domain)
+                    check_path(network, starting_point, domain, *result)
+                check_route(network, starting_point, domain, network.find_route(starting_point, domain))
+
+
+# Les repères sont recalculés sur place (et non en arrière-plan) dès qu'une liaison les rend périmés
+@pytest.mark.parametrize("seed", SEEDS)
+def test_landmarks(seed):
+    network, domains = make_network(seed)
+    for rng in operations(network, domains, seed):
+        if not network.landmarks.is_ready():
+            network.landmarks.build()
+
+        for starting_point in active_servers(network, rng, 3):
+            for domain in domains:
+                hosting_servers = network.get_hosting_servers(domain)
+                path, response_time = network.landmarks.shortest_path(starting_point, hosting_servers)
+                if path is None:
+                    assert reference_distance(network, starting_point, domain) is None
+                else:
+                    assert response_time == reference_distance(network, starting_point, domain)
+                    check_path(network, starting_point, domain, path, response_time)
+
+
+# Yen garde les k plus courts chemins : le premier qui reste intact est le plus court du réseau actuel. Les chemins
+# doivent être recalculés après chaque nouvelle liaison ou chaque changement de sites.
+@pytest.mark.parametrize("seed", SEEDS)
+def test_backup_paths(seed):
+    network, domains = make_network(seed)
+    pairs = [(starting_point, domain) for starting_point in network.servers[:3] for domain in domains[:4]]
+    for starting_point, domain in pairs:
+        network.backup_paths.protect(starting_point, domain, 3, BackupPaths.YEN)
+
+    for _ in operations(network, domains, seed):
+        for starting_point, domain in pairs:
+            if starting_point.is_active() is False:
+                continue
+
+            best_path = network.backup_paths.best_path(starting_point, domain)
+            if best_path is not RouteCache.MISSING:
+                assert best_path[1] == reference_distance(network, starting_point, domain)
+                check_path(network, starting_point, domain, *best_path)
+            check_route(network, starting_point, domain, network.search(starting_point, domain))